@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Standalone performance measurements; not collected by pytest
+"""
@@ -0,0 +1,132 @@
+"""
+Benchmark CLI
+
+    python -m benchmarks run [--suite ingest --suite search ...] [--out results.json]
+    python -m benchmarks compare base.json head.json [--threshold 0.10]
+
+`compare` exits non-zero when any metric regressed by more than the threshold.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+
+from benchmarks.runner import Report, compare, format_comparison, load_results
+
+SUITES = {
+    "ingest": "benchmarks.bench_ingest",
+    "search": "benchmarks.bench_search",
+    "auth": "benchmarks.bench_auth",
+    "quantization": "benchmarks.bench_quantization",
+    "startup": "benchmarks.bench_startup",
+    "reindex": "benchmarks.bench_reindex",
+    "pagination": "benchmarks.bench_pagination",
+    "feedback": "benchmarks.bench_feedback",
+    "gateway": "benchmarks.bench_gateway",
+    "llm": "benchmarks.bench_llm",
+    "postprocess": "benchmarks.bench_postprocess",
+    "snapshot": "benchmarks.bench_snapshot",
+    "query": "benchmarks.bench_query",
+}
+
+
+async def run_suites(args) -> dict:
+    report = Report()
+    for suite in args.suite:
+        module = importlib.import_module(SUITES[suite])
+        await module.run(report, args)
+    return report.to_dict(args.suite)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run benchmark suites")
+    run.add_argument(
+        "--suite", action="append", choices=sorted(SUITES), help="default: all"
+    )
+    run.add_argument("--out", help="write results JSON here (default: stdout)")
+    run.add_argument("--iterations", type=int, default=200)
+    run.add_argument("--pages", type=int, default=100, help="ingest document size")
+    run.add_argument("--copy-rounds", type=int, default=5)
+    run.add_argument(
+        "--sizes",
+        type=lambda value: [int(n) for n in value.split(",")],
+        default=[10_000, 100_000, 1_000_000],
+        help="comma-separated chunk counts for the search suite",
+    )
+    run.add_argument("--businesses", type=int, default=1)
+    run.add_argument(
+        "--queries", type=int, default=100_000, help="query suite stream length"
+    )
+    run.add_argument(
+        "--snapshot-chunks", type=int, default=50_000, help="snapshot suite size"
+    )
+    run.add_argument(
+        "--rows",
+        type=int,
+        default=1_000_000,
+        help="pagination and feedback suite table size",
+    )
+    run.add_argument(
+        "--modes",
+        type=lambda value: value.split(","),
+        default=["full", "half", "binary"],
+        help="embedding storage modes for the quantization suite",
+    )
+    run.add_argument(
+        "--reuse", action="store_true", help="reuse already seeded search schemas"
+    )
+    run.add_argument("--startup-runs", type=int, default=5)
+    run.add_argument(
+        "--serve-cmd",
+        default=None,
+        help="server command for the startup suite, with a {port} placeholder",
+    )
+    run.add_argument(
+        "--connections", type=int, default=1000, help="gateway suite socket count"
+    )
+    run.add_argument("--requests", type=int, default=200)
+    run.add_argument(
+        "--messages", type=int, default=20_000, help="postprocess suite backlog"
+    )
+    run.add_argument("--concurrency", type=int, default=16)
+
+    diff = commands.add_parser("compare", help="compare two result files")
+    diff.add_argument("base")
+    diff.add_argument("head")
+    diff.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative change that counts as a regression",
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        args.suite = args.suite or list(SUITES)
+        results = json.dumps(asyncio.run(run_suites(args)), indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(results + "\n")
+        else:
+            print(results)
+        return
+
+    rows, regressions = compare(
+        load_results(args.base), load_results(args.head), args.threshold
+    )
+    print(format_comparison(rows))
+    if regressions:
+        print(
+            f"\n{len(regressions)} metric(s) regressed by more than "
+            f"{args.threshold:.0%}: {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
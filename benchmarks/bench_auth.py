@@ -0,0 +1,181 @@
+"""
+Auth benchmark
+Password hashing cost, POST /api/v1/auth/register throughput and API-key
+verification latency (database lookup vs. the in-process cache)
+
+Requests go through the real app in-process (httpx ASGI transport), with
+get_db pointed at a throwaway `bench_auth` schema.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+
+import httpx
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.runner import (
+    Report,
+    bench_engine,
+    create_bench_tables,
+    time_async,
+    time_sync,
+)
+from kalamna.core import api_keys
+from kalamna.core.security import hash_password, verify_password
+
+SCHEMA = "bench_auth"
+PASSWORD = "Bench-Password-123!"
+
+
+def _payload() -> dict:
+    suffix = uuid.uuid4().hex
+    return {
+        "business": {
+            "name": f"Bench {suffix[:8]}",
+            "email": f"business-{suffix}@bench.example.com",
+            "industry": "Retail",
+        },
+        "owner": {
+            "full_name": "Bench Owner",
+            "email": f"owner-{suffix}@bench.example.com",
+            "password": PASSWORD,
+        },
+    }
+
+
+async def _register_load(
+    report: Report, requests: int, concurrency: int, engine
+) -> None:
+    from kalamna.core.db import get_db
+    from kalamna.main import app
+
+    # per-request INFO logs would dominate the measurement
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def bench_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = bench_db
+    latencies, failures = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(client: httpx.AsyncClient) -> None:
+        nonlocal failures
+        async with semaphore:
+            t0 = time.perf_counter()
+            response = await client.post("/api/v1/auth/register", json=_payload())
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if response.status_code != 201:
+                failures += 1
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(client) for _ in range(requests)))
+            seconds = time.perf_counter() - t0
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    if failures:
+        raise RuntimeError(f"{failures}/{requests} register requests failed")
+    report.add_throughput("auth.register.req_per_s", requests, seconds, "req/s")
+    report.add_latencies("auth.register", latencies)
+
+
+async def _api_key_lookups(report: Report, iterations: int, engine) -> None:
+    """Verify one key with every cache cold (DB hit) and with a warm cache."""
+    api_key, prefix = api_keys.generate_api_key()
+    business_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO businesses (id, name, email, embedding_storage, "
+                "created_at, updated_at) VALUES (:id, 'Bench', :email, 'FULL', "
+                "now(), now())"
+            ),
+            {"id": business_id, "email": f"{business_id}@bench.example.com"},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO credentials (id, business_id, api_key_hashed, prefix, "
+                "is_active, created_at) VALUES (:id, :business_id, :digest, "
+                ":prefix, true, now())"
+            ),
+            {
+                "id": uuid.uuid4(),
+                "business_id": business_id,
+                "digest": api_keys.key_digest(api_key),
+                "prefix": prefix,
+            },
+        )
+
+    samples = time_sync(lambda: api_keys.key_digest(api_key), iterations)
+    report.add_throughput(
+        "auth.api_key.digest.ops_per_s", len(samples), sum(samples) / 1000, "ops/s"
+    )
+
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    # no Redis: measure the database path against the in-process cache
+    redis = api_keys.get_redis_or_none
+    api_keys.get_redis_or_none = _no_redis
+    try:
+        async with sessions() as db:
+
+            async def cold():
+                api_keys.local_cache.clear()
+                assert await api_keys.authenticate_api_key(db, api_key)
+
+            async def cached():
+                assert await api_keys.authenticate_api_key(db, api_key)
+
+            report.add_latencies("auth.api_key.db", await time_async(cold, iterations))
+            report.add_latencies(
+                "auth.api_key.cached", await time_async(cached, iterations)
+            )
+    finally:
+        api_keys.get_redis_or_none = redis
+        api_keys.local_cache.clear()
+        api_keys.last_used.drain()
+
+
+async def _no_redis():
+    return None  # Redis disabled for this benchmark
+
+
+async def run(report: Report, args) -> None:
+    samples = time_sync(lambda: hash_password(PASSWORD), args.iterations)
+    report.add_throughput(
+        "auth.hash.ops_per_s", len(samples), sum(samples) / 1000, "ops/s"
+    )
+    report.add_latencies("auth.hash", samples)
+
+    hashed = hash_password(PASSWORD)
+    samples = time_sync(lambda: verify_password(PASSWORD, hashed), args.iterations)
+    report.add_throughput(
+        "auth.verify.ops_per_s", len(samples), sum(samples) / 1000, "ops/s"
+    )
+    report.add_latencies("auth.verify", samples)
+
+    engine = bench_engine(SCHEMA)
+    try:
+        await create_bench_tables(
+            engine, SCHEMA, ["businesses", "employees", "credentials"]
+        )
+        await _register_load(report, args.requests, args.concurrency, engine)
+        await _api_key_lookups(report, args.iterations * 20, engine)
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    finally:
+        await engine.dispose()
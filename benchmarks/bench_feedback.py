@@ -0,0 +1,201 @@
+"""
+Feedback dashboard benchmark
+Direct SQL (AVG / percentile_cont over feedbacks) vs merging the
+incrementally maintained feedback_aggregates rows
+
+Seeds `--rows` feedback rows (default 1M; the request's case is
+`--rows 10000000`) spread over `--businesses` into a `bench_feedback_<n>`
+schema, builds their per-day aggregates, and times one business's summary
+over each window both ways; pass --reuse to keep the schema between runs.
+"""
+
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.runner import Report, bench_engine, create_bench_tables, time_async
+from kalamna.apps.feedback.models import Feedback
+from kalamna.apps.feedback.services import merge_aggregates
+from kalamna.utils.sketches import DDSketch
+
+SEED_BATCH = 1_000_000
+WINDOWS_DAYS = (7, 30, 365)
+
+SEED_SQL = text(
+    """
+    INSERT INTO feedbacks
+        (id, business_id, end_user_id, session_id, rating, submitted_at,
+         response_time_ms)
+    SELECT
+        gen_random_uuid(),
+        ('00000000-0000-0000-0000-' || lpad((g % CAST(:businesses AS int))::text, 12, '0'))::uuid,
+        gen_random_uuid(),
+        gen_random_uuid(),
+        1 + floor(random() * 5)::int,
+        now() - random() * interval '365 days',
+        1 + floor(exp(5 + random() * 3))::int
+    FROM generate_series(CAST(:lo AS int), CAST(:hi AS int)) AS g
+"""
+)
+
+# builds the same DDSketch bins as kalamna.utils.sketches, server-side
+BUILD_AGGREGATES_SQL = text(
+    """
+    INSERT INTO feedback_aggregates
+        (business_id, bucket_date, feedback_count, rating_sum, rating_histogram,
+         response_time_sketch, updated_at)
+    SELECT s.business_id, s.d, s.cnt, s.rsum, s.hist,
+           jsonb_build_object(
+               'alpha', CAST(:alpha AS float8), 'bins', b.bins, 'zero', 0,
+               'count', s.cnt, 'sum', s.rtsum, 'min', s.rtmin, 'max', s.rtmax),
+           now()
+    FROM (
+        SELECT business_id, (submitted_at AT TIME ZONE 'UTC')::date AS d,
+               count(*) AS cnt, sum(rating) AS rsum,
+               ARRAY[count(*) FILTER (WHERE rating = 1),
+                     count(*) FILTER (WHERE rating = 2),
+                     count(*) FILTER (WHERE rating = 3),
+                     count(*) FILTER (WHERE rating = 4),
+                     count(*) FILTER (WHERE rating = 5)]::int[] AS hist,
+               sum(response_time_ms)::float8 AS rtsum,
+               min(response_time_ms) AS rtmin, max(response_time_ms) AS rtmax
+        FROM feedbacks GROUP BY 1, 2
+    ) s
+    JOIN (
+        SELECT business_id, d, jsonb_object_agg(idx, c) AS bins
+        FROM (
+            SELECT business_id, (submitted_at AT TIME ZONE 'UTC')::date AS d,
+                   ceil(ln(response_time_ms) / :log_gamma)::int AS idx,
+                   count(*) AS c
+            FROM feedbacks GROUP BY 1, 2, 3
+        ) x
+        GROUP BY 1, 2
+    ) b USING (business_id, d)
+"""
+)
+
+DIRECT_SQL = text(
+    """
+    SELECT count(*) AS feedback_count,
+           avg(rating) AS mean_rating,
+           ARRAY[count(*) FILTER (WHERE rating = 1),
+                 count(*) FILTER (WHERE rating = 2),
+                 count(*) FILTER (WHERE rating = 3),
+                 count(*) FILTER (WHERE rating = 4),
+                 count(*) FILTER (WHERE rating = 5)] AS histogram,
+           percentile_cont(ARRAY[0.5, 0.95, 0.99])
+               WITHIN GROUP (ORDER BY response_time_ms) AS response_time_pcts
+    FROM feedbacks
+    WHERE business_id = :business_id
+      AND submitted_at >= :start AND submitted_at < :end
+"""
+)
+
+AGGREGATE_SQL = text(
+    """
+    SELECT feedback_count, rating_sum, rating_histogram, response_time_sketch
+    FROM feedback_aggregates
+    WHERE business_id = :business_id
+      AND bucket_date >= :start AND bucket_date <= :end
+"""
+)
+
+
+def _business_id(n: int) -> uuid.UUID:
+    return uuid.UUID(f"00000000-0000-0000-0000-{n:012d}")
+
+
+async def row_count(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        try:
+            return await conn.scalar(select(func.count()).select_from(Feedback))
+        except ProgrammingError:  # schema not seeded yet
+            return -1
+
+
+async def seed(engine: AsyncEngine, schema: str, rows: int, businesses: int) -> None:
+    await create_bench_tables(
+        engine, schema, ["feedbacks"], like="INCLUDING DEFAULTS INCLUDING INDEXES"
+    )
+    await create_bench_tables(engine, schema, ["feedback_aggregates"])
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                f"ALTER TABLE {schema}.feedbacks "
+                "ADD COLUMN response_time_ms integer NOT NULL"
+            )
+        )
+    for lo in range(1, rows + 1, SEED_BATCH):
+        hi = min(lo + SEED_BATCH - 1, rows)
+        async with engine.begin() as conn:
+            await conn.execute(SEED_SQL, {"businesses": businesses, "lo": lo, "hi": hi})
+    sketch = DDSketch()
+    async with engine.begin() as conn:
+        await conn.execute(
+            BUILD_AGGREGATES_SQL,
+            {"alpha": sketch.relative_accuracy, "log_gamma": sketch._log_gamma},
+        )
+        await conn.execute(text(f"ANALYZE {schema}.feedbacks"))
+        await conn.execute(text(f"ANALYZE {schema}.feedback_aggregates"))
+
+
+async def _windows(
+    engine: AsyncEngine, businesses: int, iterations: int, report: Report
+) -> None:
+    today = datetime.now(timezone.utc).date()
+    midnight = datetime.min.time()
+    async with engine.connect() as conn:
+        for days in WINDOWS_DAYS:
+            start_day = today - timedelta(days=days - 1)
+
+            async def direct(start_day=start_day):
+                await conn.execute(
+                    DIRECT_SQL,
+                    {
+                        "business_id": _business_id(random.randrange(businesses)),
+                        "start": datetime.combine(start_day, midnight, timezone.utc),
+                        "end": datetime.combine(
+                            today + timedelta(days=1), midnight, timezone.utc
+                        ),
+                    },
+                )
+
+            async def merged(start_day=start_day):
+                rows = await conn.execute(
+                    AGGREGATE_SQL,
+                    {
+                        "business_id": _business_id(random.randrange(businesses)),
+                        "start": start_day,
+                        "end": today,
+                    },
+                )
+                merge_aggregates(rows.all(), start_day, today)
+
+            report.add_latencies(
+                f"feedback.{days}d.direct_sql", await time_async(direct, iterations)
+            )
+            report.add_latencies(
+                f"feedback.{days}d.aggregates", await time_async(merged, iterations)
+            )
+
+
+async def run(report: Report, args) -> None:
+    rows = args.rows
+    schema = f"bench_feedback_{rows}"
+    engine = bench_engine(schema)
+    try:
+        if not (args.reuse and await row_count(engine) == rows):
+            t0 = time.perf_counter()
+            await seed(engine, schema, rows, args.businesses)
+            report.add("feedback.seed_seconds", time.perf_counter() - t0, "s")
+        await _windows(engine, args.businesses, max(5, args.iterations // 10), report)
+        if not args.reuse:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    finally:
+        await engine.dispose()
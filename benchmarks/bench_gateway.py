@@ -0,0 +1,195 @@
+"""
+Chat gateway load test
+Connections per worker, memory per connection and cross-node fan-out latency
+
+Spawns NODES single-worker servers (`--serve-cmd` to override) sharing one
+Redis, and opens `--connections` chat WebSockets: each seeded session gets one
+socket on the first node and one on the second, so every message crosses
+nodes through Redis. Clients answer the gateway's pings like the widget does.
+
+Measures how fast the sockets connect, each server's RSS growth per socket,
+and, for `--requests` messages sent `--concurrency` at a time, the delay until
+the other node's socket receives them. The servers read the public tables, so
+the sessions are seeded there under a throwaway business and deleted after.
+Needs Redis at REDIS_URL; without it each node would only serve itself.
+"""
+
+import asyncio
+import os
+import signal
+import time
+import uuid
+from contextlib import suppress
+
+import orjson
+import websockets
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.bench_startup import SERVE_CMD, start_server
+from benchmarks.runner import Report, bench_engine
+from kalamna.apps.business.models import Business
+from kalamna.apps.rag.models import ChatMessage, ChatSession, EndUser
+from kalamna.core.redis import close_redis, get_redis
+
+NODES = 2
+SETTLE_S = 2
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError(f"no VmRSS for pid {pid}")
+
+
+class Client:
+    """A chat socket that answers pings and queues message arrival times."""
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.arrivals: asyncio.Queue[float] = asyncio.Queue()
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        with suppress(websockets.ConnectionClosed):
+            async for raw in self.socket:
+                frame = orjson.loads(raw)
+                if frame["type"] == "ping":
+                    await self.socket.send('{"type": "pong"}')
+                elif frame["type"] == "message":
+                    self.arrivals.put_nowait(time.perf_counter())
+
+    @property
+    def closed(self) -> bool:
+        return self.task.done()
+
+
+async def seed(engine: AsyncEngine, sessions: int) -> tuple[uuid.UUID, list[str]]:
+    business_id, end_user_id = uuid.uuid4(), uuid.uuid4()
+    tokens = [f"bench-{uuid.uuid4().hex}" for _ in range(sessions)]
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Business),
+            {
+                "id": business_id,
+                "name": "Gateway Bench",
+                "email": f"gateway-{business_id}@bench.example.com",
+            },
+        )
+        await conn.execute(
+            insert(EndUser), {"id": end_user_id, "business_id": business_id}
+        )
+        await conn.execute(
+            insert(ChatSession),
+            [
+                {
+                    "business_id": business_id,
+                    "end_user_id": end_user_id,
+                    "session_token": token,
+                }
+                for token in tokens
+            ],
+        )
+    return business_id, tokens
+
+
+async def cleanup(engine: AsyncEngine, business_id: uuid.UUID) -> None:
+    async with engine.begin() as conn:
+        for model in (ChatMessage, ChatSession, EndUser):
+            await conn.execute(delete(model).where(model.business_id == business_id))
+        await conn.execute(delete(Business).where(Business.id == business_id))
+
+
+async def _connect(urls: list[str], concurrency: int) -> list[Client]:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def connect(url: str) -> Client:
+        async with limit:
+            return Client(await websockets.connect(url, max_queue=None))
+
+    return await asyncio.gather(*(connect(url) for url in urls))
+
+
+async def _fan_out(
+    pairs: list[tuple[Client, Client]], requests: int, concurrency: int
+) -> list[float]:
+    samples: list[float] = []
+    frame = orjson.dumps({"type": "message", "content": "fan-out"}).decode()
+
+    # each sender owns its sessions, so one message per session is in flight
+    async def send(own: list[tuple[Client, Client]], count: int) -> None:
+        for i in range(count):
+            sender, watcher = own[i % len(own)]
+            t0 = time.perf_counter()
+            await sender.socket.send(frame)
+            arrived = await asyncio.wait_for(watcher.arrivals.get(), timeout=30)
+            await sender.arrivals.get()  # its own copy
+            samples.append((arrived - t0) * 1000)
+
+    senders = min(concurrency, len(pairs))
+    await asyncio.gather(
+        *(
+            send(pairs[k::senders], requests // senders + (k < requests % senders))
+            for k in range(senders)
+        )
+    )
+    return samples
+
+
+async def run(report: Report, args) -> None:
+    try:
+        await get_redis()
+    except RuntimeError as e:
+        raise RuntimeError("the gateway suite needs Redis at REDIS_URL") from e
+    finally:
+        await close_redis()
+
+    engine = bench_engine()
+    # the servers must read the sessions seeded here
+    env = {**os.environ, "DATABASE_URL": engine.url.render_as_string(False)}
+    business_id, tokens = await seed(engine, max(1, args.connections // NODES))
+    servers, clients = [], []
+    try:
+        for _ in range(NODES):
+            servers.append(start_server(args.serve_cmd or SERVE_CMD, env))
+        baselines = [rss_kb(process.pid) for process, _ in servers]
+        urls = [
+            f"{base_url.replace('http', 'ws', 1)}/api/v1/rag/ws?token={token}"
+            for token in tokens
+            for _, base_url in servers
+        ]
+        t0 = time.perf_counter()
+        clients = await _connect(urls, args.concurrency)
+        report.add_throughput(
+            "gateway.connect.per_s", len(clients), time.perf_counter() - t0, "conn/s"
+        )
+        await asyncio.sleep(SETTLE_S)
+        per_node = len(clients) / NODES
+        report.add("gateway.connections_per_worker", per_node, "conn", True)
+        growth = [
+            rss_kb(process.pid) - base
+            for (process, _), base in zip(servers, baselines, strict=True)
+        ]
+        report.add("gateway.rss_per_connection_kb", max(growth) / per_node, "KB")
+
+        pairs = list(zip(clients[::NODES], clients[1::NODES], strict=True))
+        samples = await _fan_out(pairs, args.requests, args.concurrency)
+        report.add_latencies("gateway.fan_out", samples)
+        report.add(
+            "gateway.dropped_connections", sum(c.closed for c in clients), "conn"
+        )
+    finally:
+        await asyncio.gather(
+            *(client.socket.close() for client in clients), return_exceptions=True
+        )
+        for process, _ in servers:
+            process.send_signal(signal.SIGTERM)
+        for process, _ in servers:
+            try:
+                process.wait(timeout=30)
+            except Exception:
+                process.kill()
+        await cleanup(engine, business_id)
+        await engine.dispose()
@@ -0,0 +1,112 @@
+"""
+Ingest benchmark
+Throughput of each document pipeline stage: parse, chunk, dedup, embed, COPY
+
+The dedup stage ingests the txt rendering of a document, then the same
+document as html and docx (an overlapping re-upload) and an unrelated one,
+and reports how many of their chunks would skip embedding.
+"""
+
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.data import make_document
+from benchmarks.runner import Report, bench_engine, create_bench_tables
+from kalamna.rag_infra.chunker import chunk_text
+from kalamna.rag_infra.dedup import LSHIndex, fingerprint_chunks
+from kalamna.rag_infra.embedder import HashEmbedder
+from kalamna.rag_infra.parser import parse_document
+from kalamna.rag_infra.vector_db import ChunkRow, copy_chunks
+
+SCHEMA = "bench_ingest"
+FILE_TYPES = ("txt", "html", "docx")
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def _dedup(report: Report, text_by_type: dict[str, str], unrelated: str) -> None:
+    index = LSHIndex()
+    chunks = chunk_text(text_by_type["txt"])
+    fingerprints, seconds = _timed(fingerprint_chunks, chunks)
+    report.add_throughput(
+        "ingest.dedup.fingerprint_chunks_per_s", len(chunks), seconds, "chunks/s"
+    )
+    index.assign([uuid.uuid4() for _ in chunks], fingerprints)
+
+    total = duplicates = 0
+    t0 = time.perf_counter()
+    for file_type in ("html", "docx"):
+        chunks = chunk_text(text_by_type[file_type])
+        matches = index.assign(
+            [uuid.uuid4() for _ in chunks], fingerprint_chunks(chunks)
+        )
+        total += len(chunks)
+        duplicates += sum(match is not None for match in matches)
+    report.add_throughput(
+        "ingest.dedup.lookup_chunks_per_s", total, time.perf_counter() - t0, "chunks/s"
+    )
+    report.add("ingest.dedup.reupload_ratio", duplicates / total, "ratio", True)
+    report.add("ingest.dedup.embeddings_saved", duplicates, "chunks", True)
+
+    chunks = chunk_text(unrelated)
+    matches = index.assign([uuid.uuid4() for _ in chunks], fingerprint_chunks(chunks))
+    false_positives = sum(match is not None for match in matches)
+    report.add("ingest.dedup.unrelated_ratio", false_positives / len(chunks), "ratio")
+
+
+async def run(report: Report, args) -> None:
+    embedder = HashEmbedder()
+    text_by_type = {}
+    for file_type in FILE_TYPES:
+        data = make_document(file_type, args.pages)
+        parsed, seconds = _timed(parse_document, data, file_type)
+        text_by_type[file_type] = parsed
+        report.add_throughput(
+            f"ingest.parse.{file_type}_mb_per_s", len(data) / 1e6, seconds, "MB/s"
+        )
+
+    chunks, seconds = _timed(chunk_text, text_by_type["txt"])
+    report.add_throughput("ingest.chunk.chunks_per_s", len(chunks), seconds, "chunks/s")
+
+    _dedup(
+        report, text_by_type, parse_document(make_document("txt", args.pages, 1), "txt")
+    )
+
+    t0 = time.perf_counter()
+    vectors = await embedder.embed(chunks)
+    report.add_throughput(
+        "ingest.embed.chunks_per_s",
+        len(chunks),
+        time.perf_counter() - t0,
+        "chunks/s",
+    )
+
+    # COPY into a copy of the real table, HNSW + GIN index maintenance included
+    engine = bench_engine(SCHEMA)
+    try:
+        await create_bench_tables(engine, SCHEMA, ["knowledge_base_chunks"])
+        business_id = uuid.uuid4()
+        total, seconds = 0, 0.0
+        async with AsyncSession(engine) as db:
+            for _ in range(args.copy_rounds):
+                kb_id = uuid.uuid4()
+                rows = [
+                    ChunkRow(kb_id, business_id, index, chunk, vectors[index])
+                    for index, chunk in enumerate(chunks)
+                ]
+                t0 = time.perf_counter()
+                total += await copy_chunks(db, rows)
+                await db.commit()
+                seconds += time.perf_counter() - t0
+        report.add_throughput("ingest.copy.rows_per_s", total, seconds, "rows/s")
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    finally:
+        await engine.dispose()
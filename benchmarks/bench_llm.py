@@ -0,0 +1,98 @@
+"""
+LLM call layer benchmark
+Tail latency, error rate and upstream calls with and without the resilience
+
+Runs `--requests` completions, `--concurrency` at a time, against fake
+providers (no network) whose latency has a slow tail: most calls take
+TYPICAL_S, but TAIL_RATE of them take TAIL_S, and ERROR_RATE fail. Each
+scenario runs twice, once through a plain client (one route, no hedging or
+coalescing) and once through the full client with a cheaper fallback route:
+
+- `tail`: both routes healthy, so only hedging changes the outcome;
+- `outage`: the main route fails every call, so the breaker and the fallback
+  decide the outcome;
+- `popular`: a quarter of the prompts repeat a few popular questions, and
+  the ones that overlap in time share an upstream call.
+"""
+
+import asyncio
+import random
+import time
+
+from benchmarks.runner import Report
+from kalamna.rag_infra.llm import FakeLLMProvider, LLMClient, LLMUnavailableError, Route
+
+TYPICAL_S = 0.04
+TAIL_S = 1.0
+TAIL_RATE = 0.03
+ERROR_RATE = 0.01
+POPULAR_QUESTIONS = 5
+
+
+def _latency(seed: int, typical: float):
+    rng = random.Random(seed)
+    return lambda: (
+        TAIL_S if rng.random() < TAIL_RATE else rng.uniform(0.5, 1.5) * typical
+    )
+
+
+def _provider(name: str, seed: int, typical: float, error_rate: float):
+    return FakeLLMProvider(name, _latency(seed, typical), error_rate, seed)
+
+
+async def _load(
+    client: LLMClient, prompts: list[str], concurrency: int
+) -> tuple[list[float], int]:
+    samples: list[float] = []
+    errors = 0
+    queue = list(reversed(prompts))
+
+    async def worker() -> None:
+        nonlocal errors
+        while queue:
+            prompt = queue.pop()
+            t0 = time.perf_counter()
+            try:
+                await client.complete([{"role": "user", "content": prompt}])
+            except LLMUnavailableError:
+                errors += 1
+            samples.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, errors
+
+
+async def _scenario(
+    report: Report, name: str, main_error_rate: float, prompts: list[str], args
+) -> None:
+    for variant in ("plain", "resilient"):
+        main = _provider("main", 1, TYPICAL_S, main_error_rate)
+        routes = [Route(main, "main")]
+        if variant == "resilient":
+            routes.append(
+                Route(_provider("cheap", 2, TYPICAL_S * 1.5, ERROR_RATE), "cheap")
+            )
+        resilient = variant == "resilient"
+        client = LLMClient(routes, hedge=resilient, coalesce=resilient)
+        samples, errors = await _load(client, prompts, args.concurrency)
+        calls = sum(route.provider.calls for route in routes)
+        report.add_latencies(f"llm.{name}.{variant}", samples)
+        report.add(f"llm.{name}.{variant}.error_rate", errors / len(prompts), "ratio")
+        report.add(
+            f"llm.{name}.{variant}.upstream_calls_per_request",
+            calls / len(prompts),
+            "calls",
+        )
+
+
+async def run(report: Report, args) -> None:
+    unique = [f"question {i}" for i in range(args.requests)]
+    await _scenario(report, "tail", ERROR_RATE, unique, args)
+    await _scenario(report, "outage", 1.0, unique, args)
+
+    rng = random.Random(3)
+    popular = [
+        f"popular {rng.randrange(POPULAR_QUESTIONS)}" if rng.random() < 0.25 else q
+        for q in unique
+    ]
+    await _scenario(report, "popular", ERROR_RATE, popular, args)
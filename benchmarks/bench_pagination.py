@@ -0,0 +1,143 @@
+"""
+Pagination benchmark
+Page-N latency (keyset vs. OFFSET) and streaming-export memory on feedbacks
+
+Seeds `--rows` feedback rows for one business (default 1M; the request's case
+is `--rows 5000000`) into a `bench_pages_<n>` schema; pass --reuse to keep it
+between runs. Page latency is measured at several depths through
+`list_feedback`, next to the OFFSET query it replaces. The export streams every
+row as NDJSON and CSV through the same code path as the export endpoints,
+recording how far the process's peak RSS grew, next to fetching the first
+MATERIALISED_ROWS rows in one go.
+"""
+
+import resource
+import time
+import uuid
+
+import orjson
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from benchmarks.runner import Report, bench_engine, create_bench_tables, time_async
+from kalamna.apps.feedback.models import Feedback
+from kalamna.apps.feedback.services import feedback_export, list_feedback
+from kalamna.core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, export_rows
+
+BUSINESS_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+PAGES = (1, 100, 10_000)
+MATERIALISED_ROWS = 500_000
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+async def row_count(engine: AsyncEngine) -> int:
+    async with AsyncSession(engine) as db:
+        try:
+            return await db.scalar(select(func.count()).select_from(Feedback))
+        except ProgrammingError:  # schema not seeded yet
+            return -1
+
+
+async def seed(engine: AsyncEngine, schema: str, rows: int) -> None:
+    # indexes are built after the load, which is far cheaper than per row
+    await create_bench_tables(
+        engine, schema, ["feedbacks"], like="INCLUDING DEFAULTS INCLUDING CONSTRAINTS"
+    )
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                f"""
+                INSERT INTO {schema}.feedbacks
+                    (id, business_id, end_user_id, session_id, rating, comment,
+                     submitted_at)
+                SELECT gen_random_uuid(), :business_id, gen_random_uuid(),
+                       gen_random_uuid(), 1 + n % 5, 'comment ' || n,
+                       now() - n * interval '1 second'
+                FROM generate_series(1, :rows) AS n
+                """
+            ),
+            {"business_id": BUSINESS_ID, "rows": rows},
+        )
+        await conn.execute(
+            text(
+                f"CREATE INDEX ix_feedbacks_business_submitted ON {schema}.feedbacks "
+                "(business_id, submitted_at, id)"
+            )
+        )
+        await conn.execute(text(f"ANALYZE {schema}.feedbacks"))
+
+
+async def _pages(db: AsyncSession, rows: int, iterations: int, report: Report):
+    newest_first = (
+        select(Feedback)
+        .where(Feedback.business_id == BUSINESS_ID)
+        .order_by(Feedback.submitted_at.desc(), Feedback.id.desc())
+    )
+    last_page = max(1, rows // DEFAULT_PAGE_SIZE)
+    for page in sorted({p for p in PAGES if p < last_page} | {last_page}):
+        offset = (page - 1) * DEFAULT_PAGE_SIZE
+        cursor = None
+        if offset:
+            before = await db.scalar(newest_first.offset(offset - 1).limit(1))
+            cursor = encode_cursor(before.submitted_at, before.id)
+
+        async def keyset(cursor=cursor):
+            await list_feedback(db, BUSINESS_ID, cursor, DEFAULT_PAGE_SIZE)
+
+        async def by_offset(offset=offset):
+            page = newest_first.offset(offset).limit(DEFAULT_PAGE_SIZE)
+            list(await db.scalars(page))
+
+        report.add_latencies(
+            f"pages.{page}.keyset", await time_async(keyset, iterations)
+        )
+        report.add_latencies(
+            f"pages.{page}.offset", await time_async(by_offset, iterations)
+        )
+
+
+async def _export(db: AsyncSession, rows: int, report: Report) -> None:
+    for fmt in ("ndjson", "csv"):
+        baseline, size = peak_rss_mb(), 0
+        t0 = time.perf_counter()
+        async for chunk in export_rows(db, feedback_export(BUSINESS_ID), fmt):
+            size += len(chunk)
+        seconds = time.perf_counter() - t0
+        report.add_throughput(f"export.{fmt}.rows_per_s", rows, seconds, "rows/s")
+        report.add(f"export.{fmt}.mb", size / 1e6, "MB")
+        report.add(f"export.{fmt}.peak_rss_growth_mb", peak_rss_mb() - baseline, "MB")
+
+    # what a non-streaming export would hold in memory, for a slice of the rows
+    limit = min(rows, MATERIALISED_ROWS)
+    baseline = peak_rss_mb()
+    result = await db.execute(feedback_export(BUSINESS_ID).limit(limit))
+    body = orjson.dumps([row._asdict() for row in result.all()], default=str)
+    report.add(
+        f"export.materialised_{limit}.peak_rss_growth_mb",
+        peak_rss_mb() - baseline,
+        "MB",
+    )
+    del body
+
+
+async def run(report: Report, args) -> None:
+    rows = args.rows
+    schema = f"bench_pages_{rows}"
+    engine = bench_engine(schema)
+    try:
+        if not (args.reuse and await row_count(engine) == rows):
+            t0 = time.perf_counter()
+            await seed(engine, schema, rows)
+            report.add("pages.seed_seconds", time.perf_counter() - t0, "s")
+        async with AsyncSession(engine) as db:
+            await _pages(db, rows, max(5, args.iterations // 10), report)
+            await _export(db, rows, report)
+        if not args.reuse:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    finally:
+        await engine.dispose()
@@ -0,0 +1,169 @@
+"""
+Chat post-processing benchmark
+Emotion labelling throughput and end-to-end lag by batch size
+
+Seeds `--messages` end-user messages into a throwaway schema and runs the
+message worker's read/label/acknowledge loop over its own Redis stream, once
+per batch size in BATCH_SIZES:
+
+- `backlog`: every message is queued first, then drained; measures messages
+  per second and the time each batch takes to classify and write;
+- `live`: a producer queues RATE messages per second for LIVE_S seconds
+  while the worker drains them; measures the lag from each message being
+  queued to its label being stored.
+
+Uses the stub classifier, so the numbers are the queue and database cost a
+real model's inference time is added to. Needs Redis at REDIS_URL.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from benchmarks.runner import Report, bench_engine, create_bench_tables
+from kalamna.core.redis import close_redis, get_redis
+from kalamna.rag_infra.emotion import StubEmotionClassifier
+from kalamna.workers.message_processor import (
+    BatchStats,
+    ensure_consumer_group,
+    handle_batch,
+    read_batch,
+)
+
+SCHEMA = "bench_postprocess"
+STREAM = "bench:chat:postprocess"
+BATCH_SIZES = (1, 32, 256)
+RATE = 1000
+LIVE_S = 5
+TICK_S = 0.01
+SAMPLES = [
+    "thanks, that was perfect",
+    "why is my order late? I don't understand",
+    "this is the worst service, unacceptable",
+    "unfortunately the item arrived broken",
+    "what are your opening hours",
+    "شكرا جدا الخدمة ممتازة",
+    "ازاي اغير العنوان",
+    "ana za3lan gedan mn el delivery",
+]
+
+
+async def seed(engine: AsyncEngine, messages: int) -> list[str]:
+    await create_bench_tables(
+        engine, SCHEMA, ["chat_messages"], like="INCLUDING DEFAULTS"
+    )
+    rng = random.Random(1)
+    ids = [uuid.uuid4() for _ in range(messages)]
+    session_id, business_id = uuid.uuid4(), uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                f"INSERT INTO {SCHEMA}.chat_messages "
+                "(id, session_id, business_id, sender_type, content, created_at) "
+                "VALUES (:id, :session_id, :business_id, 'USER', :content, now())"
+            ),
+            [
+                {
+                    "id": message_id,
+                    "session_id": session_id,
+                    "business_id": business_id,
+                    "content": rng.choice(SAMPLES),
+                }
+                for message_id in ids
+            ],
+        )
+        await conn.execute(
+            text(f"ALTER TABLE {SCHEMA}.chat_messages ADD PRIMARY KEY (id)")
+        )
+    return [str(message_id) for message_id in ids]
+
+
+async def reset(engine: AsyncEngine, redis) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(f"UPDATE {SCHEMA}.chat_messages SET emotion_detected = NULL")
+        )
+    await redis.delete(STREAM)
+    await ensure_consumer_group(redis, STREAM)
+
+
+async def enqueue(redis, message_ids: list[str]) -> None:
+    pipe = redis.pipeline(transaction=False)
+    now = f"{time.time():.6f}"
+    for message_id in message_ids:
+        pipe.xadd(STREAM, {"message_id": message_id, "created_at": now})
+    await pipe.execute()
+
+
+async def drain(
+    redis, session_factory, batch_size: int, until: asyncio.Event | None = None
+) -> list[BatchStats]:
+    """Process batches until the stream is empty (and `until` is set)."""
+    classifier = StubEmotionClassifier()
+    batches: list[BatchStats] = []
+    while True:
+        entries = await read_batch(redis, "bench", batch_size, 50, STREAM)
+        if not entries:
+            if until is None or until.is_set():
+                return batches
+            continue
+        stats = await handle_batch(redis, classifier, entries, session_factory, STREAM)
+        if stats is None:
+            raise RuntimeError("a benchmark batch failed; see the log")
+        batches.append(stats)
+
+
+async def produce(redis, message_ids: list[str], done: asyncio.Event) -> None:
+    per_tick = max(1, int(RATE * TICK_S))
+    start = time.perf_counter()
+    for tick, i in enumerate(range(0, len(message_ids), per_tick)):
+        await enqueue(redis, message_ids[i : i + per_tick])
+        await asyncio.sleep(max(0.0, start + (tick + 1) * TICK_S - time.perf_counter()))
+    done.set()
+
+
+async def run(report: Report, args) -> None:
+    try:
+        redis = await get_redis()
+    except RuntimeError as e:
+        raise RuntimeError("the postprocess suite needs Redis at REDIS_URL") from e
+
+    engine = bench_engine(SCHEMA)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        message_ids = await seed(engine, args.messages)
+        live_ids = message_ids[: RATE * LIVE_S]
+
+        for batch_size in BATCH_SIZES:
+            name = f"postprocess.batch_{batch_size}"
+
+            await reset(engine, redis)
+            await enqueue(redis, message_ids)
+            t0 = time.perf_counter()
+            batches = await drain(redis, session_factory, batch_size)
+            elapsed = time.perf_counter() - t0
+            report.add_throughput(
+                f"{name}.backlog", sum(b.size for b in batches), elapsed, "messages"
+            )
+            report.add_latencies(
+                f"{name}.batch_ms", [b.classify_ms + b.write_ms for b in batches]
+            )
+
+            await reset(engine, redis)
+            done = asyncio.Event()
+            producer = asyncio.create_task(produce(redis, live_ids, done))
+            batches = await drain(redis, session_factory, batch_size, until=done)
+            await producer
+            report.add_latencies(
+                f"{name}.live.lag", [lag for b in batches for lag in b.lags_ms]
+            )
+    finally:
+        await redis.delete(STREAM)  # and its consumer group
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+        await close_redis()
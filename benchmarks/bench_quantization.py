@@ -0,0 +1,125 @@
+"""
+Quantization benchmark
+Index size, recall@10 and latency for each embedding storage mode
+
+The same corpus is loaded once per mode (as separate businesses) into a
+`bench_quant_<n>` schema. Recall is measured against an exact scan.
+"""
+
+import time
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from benchmarks.bench_search import (
+    build_indexes,
+    business_id,
+    load_chunks,
+    make_queries,
+)
+from benchmarks.runner import Report, bench_engine
+from kalamna.apps.documents.models import EmbeddingStorage, KnowledgeBaseChunk
+from kalamna.rag_infra.vector_db import search_chunks
+
+TOP_K = 10
+MODE_INDEX = {
+    EmbeddingStorage.FULL: "ix_kb_chunks_embedding_hnsw",
+    EmbeddingStorage.HALF: "ix_kb_chunks_embedding_half_hnsw",
+    EmbeddingStorage.BINARY: "ix_kb_chunks_embedding_bit_hnsw",
+}
+
+COPY_SQL = text(
+    """
+    INSERT INTO knowledge_base_chunks
+        (id, kb_id, business_id, chunk_index, chunk_text, embedding_vector,
+         embedding_storage, created_at)
+    SELECT gen_random_uuid(), kb_id, :business_id, chunk_index, chunk_text,
+           embedding_vector, CAST(:storage AS embedding_storage_enum), created_at
+    FROM knowledge_base_chunks
+    WHERE business_id = :source
+"""
+)
+
+
+def _tenant(mode: EmbeddingStorage) -> int:
+    return list(EmbeddingStorage).index(mode)
+
+
+async def seed(
+    engine: AsyncEngine, schema: str, size: int, modes: list[EmbeddingStorage]
+) -> dict[EmbeddingStorage, float]:
+    """Load one copy of the corpus per mode; returns index build seconds."""
+    await load_chunks(engine, schema, size, businesses=1)
+    async with engine.begin() as conn:
+        for mode in modes:
+            if mode is EmbeddingStorage.FULL:
+                continue
+            await conn.execute(
+                COPY_SQL,
+                {
+                    "business_id": business_id(_tenant(mode)),
+                    "storage": mode.name,
+                    "source": business_id(0),
+                },
+            )
+    # business 0 holds the FULL copy, which is also the exact-recall reference
+    build = {}
+    for mode in modes:
+        build[mode] = await build_indexes(engine, schema, {MODE_INDEX[mode]})
+    return build
+
+
+async def _exact_top_k(db: AsyncSession, vector) -> set[tuple]:
+    """Ground truth: a sequential scan ordered by exact cosine distance."""
+    chunk = KnowledgeBaseChunk
+    async with db.begin():
+        await db.execute(select(func.set_config("enable_indexscan", "off", True)))
+        rows = await db.execute(
+            select(chunk.kb_id, chunk.chunk_index)
+            .where(chunk.business_id == business_id(0))
+            .order_by(chunk.embedding_vector.cosine_distance(vector))
+            .limit(TOP_K)
+        )
+        return {tuple(row) for row in rows}
+
+
+async def run(report: Report, args) -> None:
+    modes = [EmbeddingStorage(mode) for mode in args.modes]
+    queries, _ = make_queries(args.iterations)
+
+    for size in args.sizes:
+        schema = f"bench_quant_{size}"
+        engine = bench_engine(schema)
+        try:
+            build = await seed(engine, schema, size, modes)
+            async with AsyncSession(engine) as db:
+                truth = [await _exact_top_k(db, vector) for vector in queries]
+
+                for mode in modes:
+                    name = f"quantization.{size}.{mode.value}"
+                    report.add(f"{name}.index_build_s", build[mode], "s")
+                    index_bytes = await db.scalar(
+                        text("SELECT pg_relation_size(to_regclass(:name))"),
+                        {"name": MODE_INDEX[mode]},
+                    )
+                    report.add(f"{name}.index_mb", index_bytes / 2**20, "MB")
+
+                    tenant = business_id(_tenant(mode))
+                    samples, found = [], 0
+                    for vector, expected in zip(queries, truth, strict=True):
+                        t0 = time.perf_counter()
+                        hits = await search_chunks(db, tenant, vector, TOP_K, mode)
+                        samples.append((time.perf_counter() - t0) * 1000)
+                        await db.commit()  # end the transaction-local ef_search
+                        found += len(
+                            expected & {(h.kb_id, h.chunk_index) for h in hits}
+                        )
+                    report.add_latencies(f"{name}.search", samples)
+                    report.add(
+                        f"{name}.recall_at_10",
+                        found / (TOP_K * len(queries)),
+                        "ratio",
+                        higher_is_better=True,
+                    )
+        finally:
+            await engine.dispose()
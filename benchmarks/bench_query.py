@@ -0,0 +1,187 @@
+"""
+Query normalisation benchmark
+Cache hit rates with and without `normalize_query`, and its cost per query
+
+Generates `--queries` end-user questions (default 100k) over INTENTS support
+intents with Zipf-like popularity. Each question is written the way Egyptian
+users type: in Arabic script with random hamza, yaa and taa marbuta
+spellings, diacritics, tatweel and elongated letters; in Arabizi with one of
+several spellings per word (some outside the normaliser's word list); or in
+English; with or without trailing punctuation. The stream is replayed
+through two LRU caches keyed by the raw text and then by `query_cache_key`:
+a shared query-embedding cache (EMBEDDING_CACHE_SIZE entries) and a
+per-business answer cache (ANSWER_CACHE_SIZE entries, over BUSINESSES
+businesses). Normalisation time is measured cold (every text new to the LRU)
+and over the stream (through it).
+"""
+
+import random
+import time
+import uuid
+from collections import OrderedDict
+
+from benchmarks.runner import Report, percentile
+from kalamna.apps.rag import services
+from kalamna.apps.rag.services import normalize_query, query_cache_key
+
+INTENTS = 2_000
+BUSINESSES = 20
+EMBEDDING_CACHE_SIZE = 10_000
+ANSWER_CACHE_SIZE = 1_000
+# share of questions per script
+SCRIPTS = (("arabic", 0.5), ("arabizi", 0.35), ("english", 0.15))
+
+# (Arabic, Arabizi spellings, English): the last Arabizi spelling of each
+# word is one the normaliser's word list doesn't have
+# fmt: off
+WORDS = (
+    ("عايز", ("3ayez", "3ayz", "3aaiez"), "I want"),
+    ("اعرف", ("a3raf", "a3rf", "a3ref"), "to know"),
+    ("ازاي", ("ezay", "ezzay", "ezzai"), "how"),
+    ("فين", ("fein", "feen", "fain"), "where"),
+    ("امتى", ("emta", "imta", "emtaa"), "when"),
+    ("ليه", ("leh", "leih", "leeh"), "why"),
+    ("ممكن", ("momken", "mmkn", "mumken"), "can"),
+    ("الطلب", ("el talab", "eltalab", "el tlab"), "the order"),
+    ("التوصيل", ("el tawsil", "el tawseel", "eltawsel"), "delivery"),
+    ("الشحن", ("el sha7n", "elsha7n", "el sh7n"), "shipping"),
+    ("استرجاع", ("estrga3", "esterga3", "estergaa3"), "refund"),
+    ("الفلوس", ("el flos", "elfeloos", "el folos"), "the money"),
+    ("الحساب", ("el 7esab", "el7sab", "el 7isab"), "the account"),
+    ("بكام", ("bkam", "bekam", "b kam"), "how much"),
+    ("دلوقتي", ("delwa2ti", "dlw2ty", "dilwa2ty"), "now"),
+    ("بكرة", ("bokra", "bukra", "bokraa"), "tomorrow"),
+    ("مش", ("msh", "mesh", "mush"), "not"),
+    ("وصل", ("wesel", "wasal", "wsl"), "arrived"),
+    ("هيوصل", ("hayewsal", "haywsal", "hayewsl"), "will arrive"),
+    ("الدفع", ("el daf3", "eldaf3", "el dafa3"), "payment"),
+    ("حاجة", ("7aga", "7aja", "7ga"), "something"),
+    ("شكرا", ("shokran", "shukran", "shokrn"), "thanks"),
+)
+# fmt: on
+ARABIC_VARIANTS = {"ا": "أإ", "ي": "ى", "ة": "ه", "ه": "ة"}
+DIACRITICS = "َُِْ"
+TATWEEL = "ـ"
+
+
+def make_intents(rng: random.Random) -> list[tuple[int, ...]]:
+    return [
+        tuple(rng.sample(range(len(WORDS)), rng.randint(3, 5))) for _ in range(INTENTS)
+    ]
+
+
+def _arabic(word: str, rng: random.Random) -> str:
+    letters = list(word)
+    for i, letter in enumerate(letters):
+        if letter in ARABIC_VARIANTS and rng.random() < 0.15:
+            letters[i] = rng.choice(ARABIC_VARIANTS[letter])
+        elif rng.random() < 0.04:
+            letters[i] += rng.choice(DIACRITICS)
+    if rng.random() < 0.05:
+        i = rng.randrange(1, len(letters))
+        letters[i - 1] += TATWEEL * rng.randint(1, 3)
+    if rng.random() < 0.05:
+        letters[-1] *= rng.randint(3, 5)
+    return "".join(letters)
+
+
+def _arabizi(spellings: tuple[str, ...], rng: random.Random) -> str:
+    word = rng.choices(spellings, weights=(6, 3, 1))[0]
+    if rng.random() < 0.05:
+        word = word.upper() if rng.random() < 0.5 else word.capitalize()
+    if rng.random() < 0.05:
+        word += word[-1] * rng.randint(2, 4)
+    return word
+
+
+def make_queries(count: int, seed: int = 0) -> list[tuple[uuid.UUID, str]]:
+    """(business, question) pairs."""
+    rng = random.Random(seed)
+    intents = make_intents(rng)
+    # Zipf-like: intent i is asked about 1 / (i + 1) as often as the first
+    weights = [1 / (i + 1) for i in range(INTENTS)]
+    scripts, script_weights = zip(*SCRIPTS, strict=True)
+    queries = []
+    for intent in rng.choices(intents, weights, k=count):
+        script = rng.choices(scripts, script_weights)[0]
+        if script == "arabic":
+            words = [_arabic(WORDS[w][0], rng) for w in intent]
+        elif script == "arabizi":
+            words = [_arabizi(WORDS[w][1], rng) for w in intent]
+        else:
+            words = [WORDS[w][2] for w in intent]
+        ending = rng.choice(("", "", "?", "؟", "!!", " ?"))
+        business = uuid.UUID(int=rng.randrange(BUSINESSES))
+        queries.append((business, " ".join(words) + ending))
+    return queries
+
+
+def hit_rate(keys: list, size: int) -> float:
+    """Share of lookups an LRU of `size` entries would answer."""
+    cache: OrderedDict = OrderedDict()
+    hits = 0
+    for key in keys:
+        if key in cache:
+            hits += 1
+            cache.move_to_end(key)
+        else:
+            cache[key] = None
+            if len(cache) > size:
+                cache.popitem(last=False)
+    return hits / len(keys)
+
+
+def _micros(fn, texts: list[str]) -> list[float]:
+    samples = []
+    for text in texts:
+        t0 = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - t0) * 1_000_000)
+    return samples
+
+
+def _add_micros(report: Report, name: str, samples: list[float]) -> None:
+    for label, q in (("p50", 0.5), ("p99", 0.99)):
+        report.add(f"{name}.{label}_us", percentile(samples, q), "us")
+
+
+async def run(report: Report, args) -> None:
+    queries = make_queries(args.queries)
+    texts = [text for _, text in queries]
+
+    raw_embedding = hit_rate(texts, EMBEDDING_CACHE_SIZE)
+    raw_answer = hit_rate(queries, ANSWER_CACHE_SIZE)
+    normalized_embedding = hit_rate(
+        [query_cache_key(text) for text in texts], EMBEDDING_CACHE_SIZE
+    )
+    normalized_answer = hit_rate(
+        [query_cache_key(text, business) for business, text in queries],
+        ANSWER_CACHE_SIZE,
+    )
+    for name, value in (
+        ("query.embedding_cache.raw.hit_rate", raw_embedding),
+        ("query.embedding_cache.normalized.hit_rate", normalized_embedding),
+        ("query.answer_cache.raw.hit_rate", raw_answer),
+        ("query.answer_cache.normalized.hit_rate", normalized_answer),
+    ):
+        report.add(name, value, "ratio", higher_is_better=True)
+    report.add("query.distinct_texts.raw", len(set(texts)), "texts")
+    report.add(
+        "query.distinct_texts.normalized",
+        len({normalize_query(text) for text in texts}),
+        "texts",
+    )
+
+    distinct = list(dict.fromkeys(texts))
+    _add_micros(
+        report, "query.normalize.cold", _micros(services.normalize_text, distinct)
+    )
+    services._normalize_cached.cache_clear()
+    _add_micros(report, "query.normalize.stream", _micros(normalize_query, texts))
+    info = services._normalize_cached.cache_info()
+    report.add(
+        "query.normalize.lru_hit_rate",
+        info.hits / (info.hits + info.misses),
+        "ratio",
+        higher_is_better=True,
+    )
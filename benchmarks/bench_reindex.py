@@ -0,0 +1,106 @@
+"""
+Re-index benchmark
+Time and embedding cost of replacing a document with a 1%-edited version
+
+Indexes a `--pages` document (default 100; the request's case is
+`--pages 500`), edits 1% of its paragraphs (a changed word each, plus one
+inserted and one deleted paragraph), then re-indexes it both ways: from
+scratch into a new knowledge base, as every re-upload did before, and
+incrementally over the existing chunks. Embedding cost is counted in texts
+and API requests (batches of EMBED_BATCH_SIZE); time uses the local hash
+embedder, so it excludes the embedding API's latency.
+"""
+
+import math
+import random
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.data import paragraphs
+from benchmarks.runner import Report, bench_engine, create_bench_tables
+from kalamna.apps.documents.models import KnowledgeBase, KnowledgeBaseType
+from kalamna.rag_infra.embedder import EMBED_BATCH_SIZE, HashEmbedder
+from kalamna.workers.document_processor import ingest_text
+
+SCHEMA = "bench_reindex"
+TABLES = [
+    "businesses",
+    "knowledge_bases",
+    "knowledge_base_chunks",
+    "knowledge_base_versions",
+]
+EDIT_FRACTION = 0.01
+
+
+class CountingEmbedder(HashEmbedder):
+    """Hash embedder that counts what a paid embedding API would bill."""
+
+    def __init__(self):
+        super().__init__()
+        self.texts = 0
+        self.requests = 0
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        self.texts += len(texts)
+        self.requests += math.ceil(len(texts) / EMBED_BATCH_SIZE)
+        return await super().embed(texts)
+
+
+def edit_document(paras: list[str], fraction: float, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    edited = list(paras)
+    for i in rng.sample(range(len(edited)), max(1, int(len(edited) * fraction))):
+        words = edited[i].split()
+        words[rng.randrange(len(words))] = "revised"
+        edited[i] = " ".join(words)
+    edited.insert(rng.randrange(len(edited)), "A new paragraph added in review.")
+    del edited[rng.randrange(len(edited))]
+    return edited
+
+
+async def _ingest(db: AsyncSession, kb: KnowledgeBase, body: str, label: str, report):
+    embedder = CountingEmbedder()
+    t0 = time.perf_counter()
+    stats = await ingest_text(db, kb, body, embedder)
+    await db.commit()
+    report.add(f"reindex.{label}.seconds", time.perf_counter() - t0, "s")
+    report.add(f"reindex.{label}.embedded_chunks", embedder.texts, "chunks")
+    report.add(f"reindex.{label}.embed_requests", embedder.requests, "requests")
+    return stats
+
+
+async def run(report: Report, args) -> None:
+    paras = paragraphs(args.pages)
+    original = "\n\n".join(paras)
+    edited = "\n\n".join(edit_document(paras, EDIT_FRACTION))
+
+    engine = bench_engine(SCHEMA)
+    try:
+        await create_bench_tables(engine, SCHEMA, TABLES)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            # the from-scratch copy lives in another business, so near-duplicate
+            # detection against the original can't discount its embeddings
+            kb, scratch = (
+                KnowledgeBase(
+                    business_id=uuid.uuid4(), base_type=KnowledgeBaseType.TEXT
+                )
+                for _ in range(2)
+            )
+            db.add_all([kb, scratch])
+            await db.flush()
+            await _ingest(db, kb, original, "initial", report)
+            # what every re-upload cost before: all chunks embedded and written
+            await _ingest(db, scratch, edited, "full", report)
+            stats = await _ingest(db, kb, edited, "incremental", report)
+            report.add(
+                "reindex.incremental.reused_chunks", stats.reused, "chunks", True
+            )
+            report.add("reindex.incremental.removed_chunks", stats.removed, "chunks")
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    finally:
+        await engine.dispose()
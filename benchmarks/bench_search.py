@@ -0,0 +1,153 @@
+"""
+Search benchmark
+Vector and hybrid search latency over knowledge_base_chunks at several sizes
+
+Each size gets its own `bench_search_<n>` schema; pass --reuse to keep and
+reuse previously seeded schemas, since seeding 1M chunks takes a while.
+"""
+
+import random
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from benchmarks.data import VOCABULARY, clustered_vectors, sentence
+from benchmarks.runner import Report, bench_engine, create_bench_tables, time_async
+from kalamna.apps.documents.models import EmbeddingStorage, KnowledgeBaseChunk
+from kalamna.rag_infra.embedder import EMBEDDING_DIMENSIONS
+from kalamna.rag_infra.vector_db import (
+    ChunkRow,
+    copy_chunks,
+    hybrid_search,
+    search_chunks,
+)
+
+SEED_BATCH = 10_000
+CHUNKS_PER_KB = 500
+TOP_K = 5
+# the seeded business has no businesses row to look its storage mode up in
+STORAGE = EmbeddingStorage.FULL
+# what full-precision search uses; quantized modes are in bench_quantization
+SEARCH_INDEXES = {
+    "ix_kb_chunks_embedding_hnsw",
+    "ix_kb_chunks_tsv",
+    "ix_knowledge_base_chunks_business_id",
+}
+
+
+def business_id(n: int) -> uuid.UUID:
+    return uuid.UUID(f"00000000-0000-0000-0000-{n:012d}")
+
+
+async def row_count(engine: AsyncEngine) -> int:
+    async with AsyncSession(engine) as db:
+        try:
+            return await db.scalar(select(func.count()).select_from(KnowledgeBaseChunk))
+        except ProgrammingError:  # schema not seeded yet
+            return -1
+
+
+async def load_chunks(
+    engine: AsyncEngine, schema: str, size: int, businesses: int
+) -> None:
+    """Create an index-less copy of knowledge_base_chunks and fill it."""
+    # no indexes while loading: building HNSW once is far cheaper than per row
+    await create_bench_tables(
+        engine,
+        schema,
+        ["knowledge_base_chunks"],
+        like="INCLUDING DEFAULTS INCLUDING GENERATED",
+    )
+    rng = random.Random(size)
+    async with AsyncSession(engine) as db:
+        for start in range(0, size, SEED_BATCH):
+            count = min(SEED_BATCH, size - start)
+            vectors = clustered_vectors(count, EMBEDDING_DIMENSIONS, seed=start)
+            rows = []
+            for offset in range(count):
+                position = start + offset
+                if position % CHUNKS_PER_KB == 0:
+                    kb_id = uuid.uuid4()
+                rows.append(
+                    ChunkRow(
+                        kb_id=kb_id,
+                        business_id=business_id(position % businesses),
+                        chunk_index=position % CHUNKS_PER_KB,
+                        chunk_text=" ".join(sentence(rng) for _ in range(4)),
+                        embedding_vector=vectors[offset],
+                    )
+                )
+            await copy_chunks(db, rows)
+            await db.commit()
+
+
+async def build_indexes(
+    engine: AsyncEngine, schema: str, names: set[str] | None = None
+) -> float:
+    """Build the model's indexes (or only `names`); returns seconds taken."""
+    indexes = [
+        index
+        for index in KnowledgeBaseChunk.__table__.indexes
+        if names is None or index.name in names
+    ]
+    t0 = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(text("SET maintenance_work_mem = '1GB'"))
+        await conn.run_sync(lambda sync: [index.create(sync) for index in indexes])
+        await conn.execute(text(f"ANALYZE {schema}.knowledge_base_chunks"))
+    return time.perf_counter() - t0
+
+
+def make_queries(count: int) -> tuple[np.ndarray, list[str]]:
+    """Query vectors near the corpus clusters, plus keyword strings."""
+    rng = np.random.default_rng(7)
+    words = random.Random(7)
+    queries = clustered_vectors(count, EMBEDDING_DIMENSIONS, seed=-1)
+    queries += 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+    return queries, [" ".join(words.sample(VOCABULARY, 3)) for _ in queries]
+
+
+async def _measure(
+    report: Report, engine: AsyncEngine, size: int, queries, terms
+) -> None:
+    tenant = business_id(0)
+    pairs = list(zip(queries, terms, strict=True))
+    async with AsyncSession(engine) as db:
+        # warm the connection, plan cache and index pages
+        for vector, query_text in pairs[:5]:
+            await hybrid_search(db, tenant, vector, query_text, TOP_K, STORAGE)
+
+        vectors = iter(queries)
+        samples = await time_async(
+            lambda: search_chunks(db, tenant, next(vectors), TOP_K, STORAGE),
+            len(pairs),
+        )
+        report.add_latencies(f"search.{size}.vector", samples)
+
+        remaining = iter(pairs)
+
+        def hybrid():
+            vector, query_text = next(remaining)
+            return hybrid_search(db, tenant, vector, query_text, TOP_K, STORAGE)
+
+        samples = await time_async(hybrid, len(pairs))
+        report.add_latencies(f"search.{size}.hybrid", samples)
+
+
+async def run(report: Report, args) -> None:
+    queries, terms = make_queries(args.iterations)
+    for size in args.sizes:
+        schema = f"bench_search_{size}"
+        engine = bench_engine(schema)
+        try:
+            if not (args.reuse and await row_count(engine) == size):
+                await load_chunks(engine, schema, size, args.businesses)
+                build_s = await build_indexes(engine, schema, SEARCH_INDEXES)
+                report.add(f"search.{size}.index_build_s", build_s, "s")
+            await _measure(report, engine, size, queries, terms)
+        finally:
+            await engine.dispose()
@@ -0,0 +1,139 @@
+"""
+Vector snapshot benchmark
+In-process snapshot search vs. pgvector HNSW for one hot business
+
+Seeds `--snapshot-chunks` chunks (default 50k) for one business into a
+`bench_snapshot_<n>` schema with the HNSW index (`--reuse` keeps it), then
+times top-k vector search three ways for `--iterations` queries: pgvector's
+`search_chunks`, and a float16 and an int8 snapshot of the same chunks, each
+end to end (scan plus the primary-key lookup of the hits' texts) and scan
+only, probing IVF partitions and scanning every row. Recall@k is measured
+against an exact float32 scan. Export time and file size are reported too.
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.bench_search import (
+    SEARCH_INDEXES,
+    STORAGE,
+    build_indexes,
+    business_id,
+    load_chunks,
+    make_queries,
+    row_count,
+)
+from benchmarks.runner import Report, bench_engine, time_async, time_sync
+from kalamna.rag_infra.vector_db import fetch_hits, load_chunk_vectors, search_chunks
+from kalamna.rag_infra.vector_snapshot import VectorSnapshot, export_snapshot
+
+TOP_K = 10
+
+
+def recall(found: list[list], exact: list[list]) -> float:
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found, exact, strict=True))
+    return hits / sum(len(e) for e in exact)
+
+
+async def _measure_snapshot(
+    report: Report,
+    db: AsyncSession,
+    name: str,
+    snapshot: VectorSnapshot,
+    queries: np.ndarray,
+    exact: list[list],
+) -> None:
+    for query in queries[:5]:  # fault the pages in, as a warm worker would have
+        snapshot.search(query, TOP_K)
+    vectors = iter(queries)
+    samples = await time_async(
+        lambda: fetch_hits(db, snapshot.search(next(vectors), TOP_K)), len(queries)
+    )
+    report.add_latencies(name, samples)
+
+    vectors = iter(queries)
+    samples = time_sync(lambda: snapshot.search(next(vectors), TOP_K), len(queries))
+    report.add_latencies(f"{name}.scan", samples)
+    found = [[i for i, _ in snapshot.search(q, TOP_K)] for q in queries]
+    report.add(
+        f"{name}.recall_at_{TOP_K}",
+        recall(found, exact),
+        "ratio",
+        higher_is_better=True,
+    )
+
+
+async def run(report: Report, args) -> None:
+    size = args.snapshot_chunks
+    schema = f"bench_snapshot_{size}"
+    tenant = business_id(0)
+    queries, _ = make_queries(args.iterations)
+    engine = bench_engine(schema)
+    try:
+        if not (args.reuse and await row_count(engine) == size):
+            await load_chunks(engine, schema, size, businesses=1)
+            await build_indexes(engine, schema, SEARCH_INDEXES)
+            # load_chunks leaves out the primary key the hits' texts are read by
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        f"ALTER TABLE {schema}.knowledge_base_chunks ADD PRIMARY KEY (id)"
+                    )
+                )
+
+        async with AsyncSession(engine) as db:
+            ids, vectors = await load_chunk_vectors(db, tenant)
+            exact = [
+                [ids[i] for i in np.argsort(-(vectors @ q))[:TOP_K]] for q in queries
+            ]
+            del vectors
+
+            for query in queries[:5]:
+                await search_chunks(db, tenant, query, TOP_K, STORAGE)
+            remaining = iter(queries)
+            samples = await time_async(
+                lambda: search_chunks(db, tenant, next(remaining), TOP_K, STORAGE),
+                len(queries),
+            )
+            report.add_latencies(f"snapshot.{size}.pgvector", samples)
+            found = [
+                [hit.id for hit in await search_chunks(db, tenant, q, TOP_K, STORAGE)]
+                for q in queries
+            ]
+            report.add(
+                f"snapshot.{size}.pgvector.recall_at_{TOP_K}",
+                recall(found, exact),
+                "ratio",
+                higher_is_better=True,
+            )
+
+            for dtype in ("float16", "int8"):
+                with tempfile.TemporaryDirectory() as directory:
+                    t0 = time.perf_counter()
+                    path = await export_snapshot(db, tenant, directory, dtype)
+                    report.add(
+                        f"snapshot.{size}.{dtype}.export_s",
+                        time.perf_counter() - t0,
+                        "s",
+                    )
+                    report.add(
+                        f"snapshot.{size}.{dtype}.file_mb",
+                        sum(f.stat().st_size for f in Path(path).iterdir()) / 2**20,
+                        "MB",
+                    )
+                    snapshot = VectorSnapshot(Path(path))
+                    name = f"snapshot.{size}.{dtype}"
+                    await _measure_snapshot(
+                        report, db, f"{name}.ivf", snapshot, queries, exact
+                    )
+                    snapshot.centroids = None  # scan every row instead
+                    await _measure_snapshot(
+                        report, db, f"{name}.full_scan", snapshot, queries, exact
+                    )
+    finally:
+        await engine.dispose()
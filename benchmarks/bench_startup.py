@@ -0,0 +1,108 @@
+"""
+Startup benchmark
+Cold start, first-request latency and shutdown time of the API server
+
+Each run spawns a fresh server process, times how long it takes until
+GET / answers, then times the first and second requests to an endpoint that
+touches the database (a registration rejected for its weak password).
+"""
+
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from benchmarks.runner import Report
+
+SERVE_CMD = f"{sys.executable} -m kalamna.serve --port {{port}} --workers 1"
+READY_TIMEOUT_S = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _weak_registration() -> dict:
+    suffix = uuid.uuid4().hex
+    return {
+        "business": {
+            "name": "Startup Bench",
+            "email": f"business-{suffix}@bench.example.com",
+            "industry": "Retail",
+        },
+        "owner": {
+            "full_name": "Startup Bench",
+            "email": f"owner-{suffix}@bench.example.com",
+            "password": "weakpassword",
+        },
+    }
+
+
+def _timed_request(client: httpx.Client) -> float:
+    t0 = time.perf_counter()
+    client.post("/api/v1/auth/register", json=_weak_registration())
+    return (time.perf_counter() - t0) * 1000
+
+
+def start_server(
+    command: str, env: dict[str, str] | None = None
+) -> tuple[subprocess.Popen, str]:
+    """Spawn a server on a free port; returns once GET / answers."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    process = subprocess.Popen(
+        shlex.split(command.format(port=port)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env or os.environ.copy(),
+    )
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        while True:
+            if time.perf_counter() - t0 > READY_TIMEOUT_S or process.poll() is not None:
+                process.kill()
+                raise RuntimeError(f"server did not start: {command}")
+            try:
+                if client.get("/").status_code == 200:
+                    return process, base_url
+            except httpx.TransportError:
+                time.sleep(0.01)
+
+
+def measure_once(command: str) -> dict[str, float]:
+    t0 = time.perf_counter()
+    process, base_url = start_server(command)
+    try:
+        cold_start = (time.perf_counter() - t0) * 1000
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            first = _timed_request(client)
+            second = _timed_request(client)
+
+        t0 = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=READY_TIMEOUT_S)
+        shutdown = (time.perf_counter() - t0) * 1000
+    finally:
+        if process.poll() is None:
+            process.kill()
+    return {
+        "cold_start": cold_start,
+        "first_request": first,
+        "second_request": second,
+        "shutdown": shutdown,
+    }
+
+
+async def run(report: Report, args) -> None:
+    command = args.serve_cmd or SERVE_CMD
+    runs = [measure_once(command) for _ in range(args.startup_runs)]
+    for name in runs[0]:
+        report.add_latencies(f"startup.{name}", [run[name] for run in runs])
@@ -0,0 +1,74 @@
+"""
+Synthetic benchmark data
+Deterministic support-style documents, chunk vectors and queries
+"""
+
+import io
+import random
+
+import numpy as np
+
+# mixed English / Egyptian Arabic vocabulary, roughly what support docs hold
+VOCABULARY = (
+    "order delivery refund payment invoice account password shipping warranty "
+    "return exchange subscription plan upgrade cancel branch hours support "
+    "ticket agent price discount offer card wallet cash address phone "
+    "الطلب التوصيل استرجاع الدفع الفاتورة الحساب الباسورد الشحن الضمان "
+    "الاستبدال الاشتراك الباقة الغاء الفرع المواعيد الدعم السعر الخصم "
+    "العرض الكارت المحفظة العنوان الموبايل ازاي امتى فين عايز ممكن"
+).split()
+
+WORDS_PER_PAGE = 450
+
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(VOCABULARY, k=rng.randint(6, 18))
+    return " ".join(words).capitalize() + rng.choice((".", ".", "?", "؟"))
+
+
+def paragraphs(pages: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    out, words = [], 0
+    while words < pages * WORDS_PER_PAGE:
+        paragraph = " ".join(sentence(rng) for _ in range(rng.randint(3, 8)))
+        words += paragraph.count(" ") + 1
+        out.append(paragraph)
+    return out
+
+
+def make_document(file_type: str, pages: int, seed: int = 0) -> bytes:
+    """Render a synthetic document of roughly `pages` pages as `file_type`."""
+    paras = paragraphs(pages, seed)
+    if file_type in ("txt", "md"):
+        return "\n\n".join(paras).encode()
+    if file_type == "html":
+        body = "".join(f"<p>{p}</p>" for p in paras)
+        return f"<html><body><h1>FAQ</h1>{body}</body></html>".encode()
+    if file_type == "docx":
+        import docx
+
+        document = docx.Document()
+        for p in paras:
+            document.add_paragraph(p)
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+    raise ValueError(f"No synthetic generator for {file_type!r}")
+
+
+def clustered_vectors(
+    count: int, dimensions: int, clusters: int = 256, seed: int = 0
+) -> np.ndarray:
+    """
+    Unit vectors scattered around `clusters` fixed random centres. Real
+    embeddings are clustered by topic; uniform random vectors make ANN search
+    look unrealistically hard. Batches with different seeds share centres.
+    """
+    centres = np.random.default_rng(0).standard_normal(
+        (clusters, dimensions), dtype=np.float32
+    )
+    rng = np.random.default_rng(seed + 1)
+    vectors = centres[rng.integers(0, clusters, count)]
+    vectors += 0.6 * rng.standard_normal((count, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
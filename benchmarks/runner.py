@@ -0,0 +1,191 @@
+"""
+Benchmark runner helpers
+Metric collection, timing, JSON results and run-to-run comparison
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+
+@dataclass
+class Metric:
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+class Report:
+    """Collects named metrics for one benchmark run."""
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def add(
+        self, name: str, value: float, unit: str, higher_is_better: bool = False
+    ) -> None:
+        self.metrics[name] = Metric(round(value, 4), unit, higher_is_better)
+
+    def add_latencies(self, name: str, samples_ms: list[float]) -> None:
+        for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            self.add(f"{name}.{label}_ms", percentile(samples_ms, q), "ms")
+
+    def add_throughput(
+        self, name: str, amount: float, seconds: float, unit: str
+    ) -> None:
+        self.add(name, amount / seconds if seconds else 0.0, unit, True)
+
+    def to_dict(self, suites: list[str]) -> dict:
+        return {
+            "meta": run_metadata(suites),
+            "metrics": {name: asdict(m) for name, m in sorted(self.metrics.items())},
+        }
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not samples:
+        return math.nan
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def time_sync(fn: Callable[[], object], iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+async def time_async(
+    fn: Callable[[], Awaitable[object]], iterations: int
+) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def run_metadata(suites: list[str]) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "suites": suites,
+    }
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[dict], list[str]]:
+    """
+    Compare two result files metric by metric.
+    A metric regresses when it got worse by more than `threshold` (relative).
+    Returns (rows for display, names of regressed metrics).
+    """
+    rows, regressions = [], []
+    base_metrics, head_metrics = base["metrics"], head["metrics"]
+    for name in sorted(set(base_metrics) | set(head_metrics)):
+        old, new = base_metrics.get(name), head_metrics.get(name)
+        if old is None or new is None:
+            rows.append(
+                {
+                    "name": name,
+                    "base": old and old["value"],
+                    "head": new and new["value"],
+                    "change": None,
+                    "status": "added" if old is None else "removed",
+                }
+            )
+            continue
+
+        change = (new["value"] - old["value"]) / old["value"] if old["value"] else 0.0
+        worse = -change if new["higher_is_better"] else change
+        status = "ok"
+        if worse > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif worse < -threshold:
+            status = "improved"
+        rows.append(
+            {
+                "name": name,
+                "base": old["value"],
+                "head": new["value"],
+                "change": change,
+                "unit": new["unit"],
+                "status": status,
+            }
+        )
+    return rows, regressions
+
+
+def format_comparison(rows: list[dict]) -> str:
+    width = max((len(r["name"]) for r in rows), default=10)
+    lines = [f"{'metric':<{width}}  {'base':>12}  {'head':>12}  {'change':>8}  status"]
+    for r in rows:
+        change = f"{r['change']:+.1%}" if r["change"] is not None else "-"
+        base = "-" if r["base"] is None else f"{r['base']:.4g}"
+        head = "-" if r["head"] is None else f"{r['head']:.4g}"
+        lines.append(
+            f"{r['name']:<{width}}  {base:>12}  {head:>12}  {change:>8}  {r['status']}"
+        )
+    return "\n".join(lines)
+
+
+def bench_engine(schema: str | None = None) -> AsyncEngine:
+    """
+    Engine on BENCH_DATABASE_URL (or DATABASE_URL). With `schema`, it is put
+    first on the search_path so app tables resolve to the benchmark copies,
+    while enum types and extensions still resolve to public.
+    """
+    url = os.getenv("BENCH_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("BENCH_DATABASE_URL or DATABASE_URL must be set")
+    connect_args = (
+        {"server_settings": {"search_path": f"{schema},public"}} if schema else {}
+    )
+    return create_async_engine(url, connect_args=connect_args)
+
+
+async def create_bench_tables(
+    engine: AsyncEngine, schema: str, tables: list[str], like: str = "INCLUDING ALL"
+) -> None:
+    """
+    (Re)create `tables` in a throwaway schema as copies of the migrated public
+    tables. LIKE copies columns, defaults and indexes but not foreign keys.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+        for table in tables:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{table}"))
+            await conn.execute(
+                text(f"CREATE TABLE {schema}.{table} (LIKE public.{table} {like})")
+            )
@@ -2,3 +2,108 @@
 Analytics database models
 Usage statistics, query logs, and performance metrics
 """
+
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import BigInteger, Date, DateTime, Float, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from kalamna.db.base import Base
+
+
+class AnalyticsHourlyRollup(Base):
+    """
+    Pre-aggregated per-business counters for one hour.
+    Rows are only ever incremented by the rollup flush, or rebuilt by a backfill.
+    """
+
+    __tablename__ = "analytics_hourly_rollups"
+
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        primary_key=True,
+    )
+    bucket_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        primary_key=True,
+    )
+    total_chats: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    total_messages: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    response_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    response_time_ms_sum: Mapped[int] = mapped_column(
+        BigInteger,
+        default=0,
+        nullable=False,
+    )
+    feedback_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    rating_sum: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<AnalyticsHourlyRollup business={self.business_id} bucket={self.bucket_start}>"
+
+
+class AnalyticsReport(Base):
+    __tablename__ = "analytics_reports"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        index=True,
+        nullable=False,
+    )
+    total_chats: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+    avg_response_time: Mapped[float | None] = mapped_column(
+        Float,
+        nullable=True,
+    )
+    user_satisfaction: Mapped[float | None] = mapped_column(
+        Float,
+        nullable=True,
+    )
+    report_period_start: Mapped[date] = mapped_column(
+        Date,
+        nullable=False,
+    )
+    report_period_end: Mapped[date] = mapped_column(
+        Date,
+        nullable=False,
+    )
+    generated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<AnalyticsReport id={self.id} business={self.business_id}>"
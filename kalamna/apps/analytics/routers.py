@@ -2,3 +2,69 @@
 Analytics API routes
 Endpoints: /analytics/usage, /analytics/queries, /analytics/reports
 """
+
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.analytics.schemas import (
+    AnalyticsReportRecord,
+    AnalyticsReportResponse,
+)
+from kalamna.apps.analytics.services import generate_report, get_report
+from kalamna.apps.employees.models import Employee
+from kalamna.core.db import get_db
+from kalamna.core.dependencies import get_current_employee
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def _resolve_period(
+    start: datetime | None, end: datetime | None
+) -> tuple[datetime, datetime]:
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end",
+        )
+    return start, end
+
+
+@router.get(
+    "/reports",
+    response_model=AnalyticsReportResponse,
+    summary="Chats, response time and satisfaction for a period",
+)
+async def read_report(
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    granularity: Literal["hour", "day", "week", "month"] = "day",
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Read pre-aggregated hourly rollups for the caller's business.
+    Defaults to the last 30 days.
+    """
+    start, end = _resolve_period(start, end)
+    return await get_report(db, employee.business_id, start, end, granularity)
+
+
+@router.post(
+    "/reports",
+    response_model=AnalyticsReportRecord,
+    status_code=status.HTTP_201_CREATED,
+    summary="Generate and store an analytics report snapshot",
+)
+async def create_report(
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    start, end = _resolve_period(start, end)
+    return await generate_report(db, employee.business_id, start, end)
@@ -2,3 +2,40 @@
 Analytics Pydantic schemas
 Request/response schemas for reports and statistics
 """
+
+import uuid
+from datetime import date, datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class AnalyticsBucket(BaseModel):
+    bucket_start: datetime
+    total_chats: int
+    total_messages: int
+    avg_response_time_ms: float | None = None
+    user_satisfaction: float | None = None
+
+
+class AnalyticsReportResponse(BaseModel):
+    business_id: uuid.UUID
+    period_start: datetime
+    period_end: datetime
+    total_chats: int
+    total_messages: int
+    avg_response_time_ms: float | None = None
+    user_satisfaction: float | None = None
+    series: list[AnalyticsBucket] = []
+
+
+class AnalyticsReportRecord(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    business_id: uuid.UUID
+    total_chats: int
+    avg_response_time: float | None = None
+    user_satisfaction: float | None = None
+    report_period_start: date
+    report_period_end: date
+    generated_at: datetime
@@ -1,4 +1,376 @@
 """
 Analytics business logic
 Data aggregation, report generation, usage tracking
+
+Chat and feedback events bump per-business, per-hour counters in Redis
+(`record_*`). A periodic flush (`flush_rollups`, see
+`kalamna.workers.analytics_rollup`) upserts them additively into
+`analytics_hourly_rollups`, so reports read a handful of pre-aggregated rows
+instead of scanning chat tables. `backfill_rollups` rebuilds rows from raw data.
 """
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, literal_column, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.analytics.models import AnalyticsHourlyRollup, AnalyticsReport
+from kalamna.apps.analytics.schemas import AnalyticsBucket, AnalyticsReportResponse
+from kalamna.apps.feedback.models import Feedback
+from kalamna.apps.rag.models import ChatMessage, ChatSession
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+ROLLUP_KEY_PREFIX = "analytics:rollup"
+DIRTY_SET_KEY = "analytics:rollup:dirty"
+# counters that were never flushed (e.g. flusher down) expire instead of leaking
+ROLLUP_KEY_TTL = int(timedelta(days=7).total_seconds())
+
+COUNTER_FIELDS = (
+    "total_chats",
+    "total_messages",
+    "response_count",
+    "response_time_ms_sum",
+    "feedback_count",
+    "rating_sum",
+)
+
+
+def bucket_start(at: datetime | None = None) -> datetime:
+    """Truncate a timestamp to the start of its UTC hour."""
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_utc(unit: str, column):
+    """
+    `date_trunc(unit, column, 'UTC')` with inlined literals, so the same
+    expression can appear in both SELECT and GROUP BY.
+    """
+    return func.date_trunc(literal_column(f"'{unit}'"), column, literal_column("'UTC'"))
+
+
+def rollup_key(business_id: uuid.UUID, bucket: datetime) -> str:
+    return f"{ROLLUP_KEY_PREFIX}:{business_id}:{int(bucket.timestamp())}"
+
+
+def parse_rollup_key(key: str) -> tuple[uuid.UUID, datetime]:
+    _, _, business_id, ts = key.split(":")
+    return uuid.UUID(business_id), datetime.fromtimestamp(int(ts), tz=timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# Event recording (hot path: one pipelined round trip, no DB access)
+# ---------------------------------------------------------------------------
+
+
+async def _increment(
+    redis: Redis,
+    business_id: uuid.UUID,
+    at: datetime | None,
+    counters: dict[str, int],
+) -> None:
+    key = rollup_key(business_id, bucket_start(at))
+    pipe = redis.pipeline(transaction=False)
+    for field, amount in counters.items():
+        pipe.hincrby(key, field, amount)
+    pipe.expire(key, ROLLUP_KEY_TTL)
+    pipe.sadd(DIRTY_SET_KEY, key)
+    await pipe.execute()
+
+
+async def record_chat_started(
+    redis: Redis, business_id: uuid.UUID, at: datetime | None = None
+) -> None:
+    await _increment(redis, business_id, at, {"total_chats": 1})
+
+
+async def record_message(
+    redis: Redis,
+    business_id: uuid.UUID,
+    response_time_ms: int | None = None,
+    at: datetime | None = None,
+) -> None:
+    """Count a chat message; pass `response_time_ms` for bot replies."""
+    counters = {"total_messages": 1}
+    if response_time_ms is not None:
+        counters["response_count"] = 1
+        counters["response_time_ms_sum"] = int(response_time_ms)
+    await _increment(redis, business_id, at, counters)
+
+
+async def record_feedback(
+    redis: Redis, business_id: uuid.UUID, rating: int, at: datetime | None = None
+) -> None:
+    await _increment(
+        redis, business_id, at, {"feedback_count": 1, "rating_sum": int(rating)}
+    )
+
+
+# ---------------------------------------------------------------------------
+# Flush Redis -> Postgres
+# ---------------------------------------------------------------------------
+
+
+def _upsert_statement(rows: list[dict]):
+    stmt = insert(AnalyticsHourlyRollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            AnalyticsHourlyRollup.business_id,
+            AnalyticsHourlyRollup.bucket_start,
+        ],
+        set_={
+            field: getattr(AnalyticsHourlyRollup, field) + stmt.excluded[field]
+            for field in COUNTER_FIELDS
+        },
+    )
+
+
+async def flush_rollups(db: AsyncSession, redis: Redis, batch_size: int = 500) -> int:
+    """
+    Move up to `batch_size` dirty hourly buckets from Redis into Postgres.
+    Returns the number of buckets written.
+    """
+    keys = await redis.spop(DIRTY_SET_KEY, batch_size)
+    if not keys:
+        return 0
+
+    # read-and-clear atomically so increments landing meanwhile go to a new hash
+    pipe = redis.pipeline(transaction=True)
+    for key in keys:
+        pipe.hgetall(key)
+        pipe.delete(key)
+    results = await pipe.execute()
+
+    rows = []
+    for key, counters in zip(keys, results[::2], strict=True):
+        if not counters:
+            continue
+        business_id, bucket = parse_rollup_key(key)
+        row = {"business_id": business_id, "bucket_start": bucket}
+        row.update({f: int(counters.get(f, 0)) for f in COUNTER_FIELDS})
+        rows.append(row)
+
+    if not rows:
+        return 0
+
+    try:
+        await db.execute(_upsert_statement(rows))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        # put the counters back so the next flush retries them
+        for row in rows:
+            await _increment(
+                redis,
+                row["business_id"],
+                row["bucket_start"],
+                {f: row[f] for f in COUNTER_FIELDS if row[f]},
+            )
+        logger.exception("analytics_rollup_flush_failed", buckets=len(rows))
+        raise
+
+    logger.info("analytics_rollup_flushed", buckets=len(rows))
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Reports
+# ---------------------------------------------------------------------------
+
+
+def _ratio(numerator: int, denominator: int) -> float | None:
+    return round(numerator / denominator, 2) if denominator else None
+
+
+async def get_report(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    start: datetime,
+    end: datetime,
+    granularity: str = "day",
+) -> AnalyticsReportResponse:
+    """
+    Build a report for [start, end) from hourly rollups.
+    The cost depends on the number of buckets in range, never on chat volume.
+    """
+    if granularity not in ("hour", "day", "week", "month"):
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    period = truncate_utc(granularity, AnalyticsHourlyRollup.bucket_start)
+    stmt = (
+        select(
+            period.label("bucket"),
+            *(
+                func.sum(getattr(AnalyticsHourlyRollup, f)).label(f)
+                for f in COUNTER_FIELDS
+            ),
+        )
+        .where(
+            AnalyticsHourlyRollup.business_id == business_id,
+            AnalyticsHourlyRollup.bucket_start >= bucket_start(start),
+            AnalyticsHourlyRollup.bucket_start < end,
+        )
+        .group_by(period)
+        .order_by(period)
+    )
+    rows = (await db.execute(stmt)).mappings().all()
+
+    totals = {f: sum(int(r[f] or 0) for r in rows) for f in COUNTER_FIELDS}
+    series = [
+        AnalyticsBucket(
+            bucket_start=r["bucket"],
+            total_chats=int(r["total_chats"] or 0),
+            total_messages=int(r["total_messages"] or 0),
+            avg_response_time_ms=_ratio(
+                int(r["response_time_ms_sum"] or 0), int(r["response_count"] or 0)
+            ),
+            user_satisfaction=_ratio(
+                int(r["rating_sum"] or 0), int(r["feedback_count"] or 0)
+            ),
+        )
+        for r in rows
+    ]
+
+    return AnalyticsReportResponse(
+        business_id=business_id,
+        period_start=start,
+        period_end=end,
+        total_chats=totals["total_chats"],
+        total_messages=totals["total_messages"],
+        avg_response_time_ms=_ratio(
+            totals["response_time_ms_sum"], totals["response_count"]
+        ),
+        user_satisfaction=_ratio(totals["rating_sum"], totals["feedback_count"]),
+        series=series,
+    )
+
+
+async def generate_report(
+    db: AsyncSession, business_id: uuid.UUID, start: datetime, end: datetime
+) -> AnalyticsReport:
+    """Snapshot a report for the period into `analytics_reports`."""
+    summary = await get_report(db, business_id, start, end)
+    report = AnalyticsReport(
+        business_id=business_id,
+        total_chats=summary.total_chats,
+        avg_response_time=summary.avg_response_time_ms,
+        user_satisfaction=summary.user_satisfaction,
+        report_period_start=start.date(),
+        report_period_end=end.date(),
+    )
+    db.add(report)
+    await db.commit()
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Backfill from raw data
+# ---------------------------------------------------------------------------
+
+
+def _zero(name: str):
+    return literal_column("0").label(name)
+
+
+async def backfill_rollups(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    business_id: uuid.UUID | None = None,
+) -> int:
+    """
+    Rebuild hourly rollups for [start, end) from chat_sessions, chat_messages
+    and feedbacks in a single transaction. Returns the number of rows written.
+
+    Only backfill closed hours: counters still pending in Redis for the same
+    hours would be added on top of the rebuilt rows by the next flush.
+    """
+    start, end = bucket_start(start), bucket_start(end)
+
+    def hour(col):
+        return truncate_utc("hour", col).label("bucket_start")
+
+    sessions = select(
+        ChatSession.business_id,
+        hour(ChatSession.started_at),
+        func.count().label("total_chats"),
+        _zero("total_messages"),
+        _zero("response_count"),
+        _zero("response_time_ms_sum"),
+        _zero("feedback_count"),
+        _zero("rating_sum"),
+    ).where(ChatSession.started_at >= start, ChatSession.started_at < end)
+
+    messages = (
+        select(
+            ChatSession.business_id,
+            hour(ChatMessage.created_at),
+            _zero("total_chats"),
+            func.count().label("total_messages"),
+            func.count(ChatMessage.response_time_ms).label("response_count"),
+            func.coalesce(func.sum(ChatMessage.response_time_ms), 0).label(
+                "response_time_ms_sum"
+            ),
+            _zero("feedback_count"),
+            _zero("rating_sum"),
+        )
+        .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+        .where(ChatMessage.created_at >= start, ChatMessage.created_at < end)
+    )
+
+    feedbacks = select(
+        Feedback.business_id,
+        hour(Feedback.submitted_at),
+        _zero("total_chats"),
+        _zero("total_messages"),
+        _zero("response_count"),
+        _zero("response_time_ms_sum"),
+        func.count().label("feedback_count"),
+        func.sum(Feedback.rating).label("rating_sum"),
+    ).where(Feedback.submitted_at >= start, Feedback.submitted_at < end)
+
+    if business_id is not None:
+        sessions = sessions.where(ChatSession.business_id == business_id)
+        messages = messages.where(ChatSession.business_id == business_id)
+        feedbacks = feedbacks.where(Feedback.business_id == business_id)
+
+    parts = [
+        q.group_by(q.selected_columns[0], q.selected_columns[1])
+        for q in (sessions, messages, feedbacks)
+    ]
+    events = union_all(*parts).subquery()
+    combined = select(
+        events.c.business_id,
+        events.c.bucket_start,
+        *(func.sum(events.c[f]) for f in COUNTER_FIELDS),
+    ).group_by(events.c.business_id, events.c.bucket_start)
+
+    clear = delete(AnalyticsHourlyRollup).where(
+        AnalyticsHourlyRollup.bucket_start >= start,
+        AnalyticsHourlyRollup.bucket_start < end,
+    )
+    if business_id is not None:
+        clear = clear.where(AnalyticsHourlyRollup.business_id == business_id)
+
+    await db.execute(clear)
+    result = await db.execute(
+        insert(AnalyticsHourlyRollup).from_select(
+            ["business_id", "bucket_start", *COUNTER_FIELDS], combined
+        )
+    )
+    await db.commit()
+
+    logger.info(
+        "analytics_rollup_backfilled",
+        start=start.isoformat(),
+        end=end.isoformat(),
+        business_id=str(business_id) if business_id else None,
+        rows=result.rowcount,
+    )
+    return result.rowcount
@@ -5,7 +5,7 @@ Auth logic for registering a new business and its owner employee
 import asyncio
 
 from fastapi import BackgroundTasks
-from sqlalchemy import select
+from sqlalchemy import exists, false, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from kalamna.apps.authentication.schemas import RegisterSchema
@@ -24,26 +24,25 @@ async def register_business_and_owner(data: RegisterSchema, db: AsyncSession):
     b = data.business
     o = data.owner
 
-    # Check business email
-    existing_business = await db.scalar(
-        select(Business).where(Business.email == b.email)
-    )
-    if existing_business:
-        raise ValueError("Business email already exists")
-
-    # Check domain URL
-    if b.domain_url:
-        existing_domain = await db.scalar(
-            select(Business).where(Business.domain_url == str(b.domain_url))
+    # Check business email, domain URL and employee email in one round trip
+    business_taken, domain_taken, employee_taken = (
+        await db.execute(
+            select(
+                exists().where(Business.email == b.email),
+                (
+                    exists().where(Business.domain_url == str(b.domain_url))
+                    if b.domain_url
+                    else false()
+                ),
+                exists().where(Employee.email == o.email),
+            )
         )
-        if existing_domain:
-            raise ValueError("Business domain already exists")
-
-    # Check employee email
-    existing_employee = await db.scalar(
-        select(Employee).where(Employee.email == o.email)
-    )
-    if existing_employee:
+    ).one()
+    if business_taken:
+        raise ValueError("Business email already exists")
+    if domain_taken:
+        raise ValueError("Business domain already exists")
+    if employee_taken:
         raise ValueError("Employee email already exists")
 
     # Create Business
@@ -1,18 +1,20 @@
 """
 Businesses database models
-Businesses model with id, email, and hashed_password fields
+Businesses model with id, email, and hashed_password fields, the business's
+widget API keys (`Credential`) and its chatbot settings (`Configuration`)
 """
 
 import uuid
 from datetime import datetime, timezone
 from enum import Enum
 
-from sqlalchemy import DateTime
+from sqlalchemy import Boolean, DateTime
 from sqlalchemy import Enum as SAEnum
-from sqlalchemy import String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from kalamna.apps.documents.models import EmbeddingStorage
 from kalamna.db.base import Base
 
 
@@ -30,6 +32,12 @@ class IndustryEnum(Enum):
     OTHER = "Other"
 
 
+class BotTone(Enum):
+    FRIENDLY = "friendly"
+    FORMAL = "formal"
+    CASUAL = "casual"
+
+
 class Business(Base):
     __tablename__ = "businesses"
 
@@ -72,6 +80,13 @@ class Business(Base):
         nullable=True,
     )
 
+    embedding_storage: Mapped[EmbeddingStorage] = mapped_column(
+        SAEnum(EmbeddingStorage, name="embedding_storage_enum", native_enum=True),
+        default=EmbeddingStorage.FULL,
+        server_default=EmbeddingStorage.FULL.name,
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -91,3 +106,127 @@ class Business(Base):
 
     def __repr__(self) -> str:
         return f"<Business id={self.id} email={self.email!r}>"
+
+
+class Credential(Base):
+    """
+    A widget API key. Only the key's prefix (for lookup) and its HMAC digest
+    are stored; see `kalamna.core.api_keys`.
+    """
+
+    __tablename__ = "credentials"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        index=True,
+        nullable=False,
+    )
+    api_key_hashed: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+    )
+    prefix: Mapped[str] = mapped_column(
+        String(16),
+        unique=True,
+        index=True,
+        nullable=False,
+    )
+    created_by: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("employees.id"),
+        nullable=True,
+    )
+    revoked_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    revoked_by: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("employees.id"),
+        nullable=True,
+    )
+    # written behind in batches, so it may lag real use by a flush interval
+    last_used_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    is_active: Mapped[bool] = mapped_column(
+        Boolean,
+        default=True,
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<Credential id={self.id} prefix={self.prefix!r}>"
+
+
+class Configuration(Base):
+    """
+    A business's chatbot settings. `version` is bumped on every edit; workers
+    cache immutable snapshots of it, see `kalamna.core.business_config`.
+    """
+
+    __tablename__ = "configurations"
+
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    version: Mapped[int] = mapped_column(
+        Integer,
+        default=1,
+        nullable=False,
+    )
+    bot_name: Mapped[str] = mapped_column(
+        String(100),
+        default="Kalamna",
+        nullable=False,
+    )
+    tone: Mapped[BotTone] = mapped_column(
+        SAEnum(BotTone, name="bot_tone_enum", native_enum=True),
+        default=BotTone.FRIENDLY,
+        nullable=False,
+    )
+    # sent instead of a bot answer outside operating hours
+    auto_reply_enabled: Mapped[bool] = mapped_column(
+        Boolean,
+        default=False,
+        nullable=False,
+    )
+    auto_reply_message: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+    # {"mon": ["09:00", "17:00"], ...}; a missing day is closed, none at all
+    # means always open
+    operating_hours: Mapped[dict] = mapped_column(
+        JSONB,
+        default=dict,
+        nullable=False,
+    )
+    timezone: Mapped[str] = mapped_column(
+        String(64),
+        default="Africa/Cairo",
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<Configuration business={self.business_id} version={self.version}>"
@@ -1,4 +1,150 @@
 """
-Authentication API routes
-Endpoints: /login, /register, /refresh, /logout, /me
+Business API routes
+Endpoints: /business/credentials (create, list, revoke widget API keys),
+/business/configuration (read, update chatbot settings),
+/business/embedding-storage (read, switch the vector storage mode)
 """
+
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.business.schemas import (
+    ConfigurationResponse,
+    ConfigurationUpdateSchema,
+    CredentialCreatedResponse,
+    CredentialResponse,
+    EmbeddingStorageResponse,
+    EmbeddingStorageSchema,
+)
+from kalamna.apps.business.services import (
+    create_credential,
+    list_credentials,
+    revoke_credential,
+    update_configuration,
+    update_embedding_storage,
+)
+from kalamna.apps.employees.models import Employee, EmployeeRole
+from kalamna.core.business_config import get_business_config
+from kalamna.core.db import get_db
+from kalamna.core.dependencies import get_current_employee
+from kalamna.core.redis import get_redis_or_none
+from kalamna.rag_infra.vector_db import get_embedding_storage
+
+router = APIRouter(prefix="/business", tags=["Business"])
+
+
+def _require_owner(employee: Employee, action: str = "manage API keys") -> None:
+    if employee.role != EmployeeRole.OWNER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Only the business owner can {action}",
+        )
+
+
+@router.post(
+    "/credentials",
+    response_model=CredentialCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a widget API key (shown only once)",
+)
+async def create_api_key(
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_owner(employee)
+    credential, api_key = await create_credential(db, employee)
+    return CredentialCreatedResponse(
+        **CredentialResponse.model_validate(credential).model_dump(),
+        api_key=api_key,
+    )
+
+
+@router.get(
+    "/credentials",
+    response_model=list[CredentialResponse],
+    summary="List the business's API keys",
+)
+async def read_api_keys(
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    return await list_credentials(db, employee.business_id)
+
+
+@router.delete(
+    "/credentials/{credential_id}",
+    response_model=CredentialResponse,
+    summary="Revoke an API key; takes effect immediately on every worker",
+)
+async def revoke_api_key(
+    credential_id: uuid.UUID,
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_owner(employee)
+    # revocation must not depend on the cache being up
+    redis = await get_redis_or_none()
+    try:
+        return await revoke_credential(db, redis, employee, credential_id)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+
+
+@router.get(
+    "/configuration",
+    response_model=ConfigurationResponse,
+    summary="The business's chatbot settings",
+)
+async def read_configuration(
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    snapshot = await get_business_config(db, employee.business_id)
+    return snapshot.as_dict()
+
+
+@router.put(
+    "/configuration",
+    response_model=ConfigurationResponse,
+    summary="Update chatbot settings; every worker sees the new version at once",
+)
+async def write_configuration(
+    data: ConfigurationUpdateSchema,
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_owner(employee, "change the chatbot settings")
+    snapshot = await update_configuration(
+        db, await get_redis_or_none(), employee.business_id, data
+    )
+    return snapshot.as_dict()
+
+
+@router.get(
+    "/embedding-storage",
+    response_model=EmbeddingStorageResponse,
+    summary="How the business's chunk vectors are stored and indexed",
+)
+async def read_embedding_storage(
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    storage = await get_embedding_storage(db, employee.business_id)
+    return EmbeddingStorageResponse(storage=storage)
+
+
+@router.put(
+    "/embedding-storage",
+    response_model=EmbeddingStorageResponse,
+    summary="Switch the vector storage mode (trades recall for index size)",
+)
+async def write_embedding_storage(
+    data: EmbeddingStorageSchema,
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_owner(employee, "change the embedding storage")
+    moved = await update_embedding_storage(db, employee.business_id, data.storage)
+    return EmbeddingStorageResponse(storage=data.storage, chunks_moved=moved)
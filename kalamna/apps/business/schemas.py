@@ -1,8 +1,16 @@
+import re
+import uuid
+from datetime import datetime
 from typing import Optional
+from zoneinfo import ZoneInfo
 
-from pydantic import BaseModel, EmailStr, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, HttpUrl, field_validator
 
-from kalamna.apps.business.models import IndustryEnum
+from kalamna.apps.business.models import BotTone, IndustryEnum
+from kalamna.apps.documents.models import EmbeddingStorage
+from kalamna.core.business_config import WEEKDAYS
+
+HOURS_PATTERN = r"^([01][0-9]|2[0-3]):[0-5][0-9]$"
 
 
 # businesses registration schema
@@ -12,3 +20,87 @@ class BusinessCreateSchema(BaseModel):
     industry: IndustryEnum
     description: Optional[str] = None
     domain_url: Optional[HttpUrl] = None
+
+
+class CredentialResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    prefix: str
+    is_active: bool
+    created_at: datetime
+    last_used_at: datetime | None = None
+    revoked_at: datetime | None = None
+
+
+class CredentialCreatedResponse(CredentialResponse):
+    # only returned when the key is created; it cannot be recovered later
+    api_key: str
+
+
+class ConfigurationUpdateSchema(BaseModel):
+    """Partial update; omitted fields keep their current value."""
+
+    bot_name: str | None = Field(None, min_length=1, max_length=100)
+    tone: BotTone | None = None
+    auto_reply_enabled: bool | None = None
+    auto_reply_message: str | None = Field(None, max_length=2000)
+    # weekday -> [opens, closes], local time; closes < opens runs overnight
+    operating_hours: dict[str, tuple[str, str]] | None = Field(
+        None, examples=[{"sun": ["09:00", "17:00"]}]
+    )
+    timezone: str | None = Field(None, examples=["Africa/Cairo"])
+
+    @field_validator(
+        "bot_name", "tone", "auto_reply_enabled", "operating_hours", "timezone"
+    )
+    @classmethod
+    def _not_null(cls, value):
+        # only `auto_reply_message` can be cleared; the others are required
+        if value is None:
+            raise ValueError("Cannot be null; omit the field to keep its value")
+        return value
+
+    @field_validator("operating_hours")
+    @classmethod
+    def _check_hours(cls, hours):
+        for day, (opens, closes) in (hours or {}).items():
+            if day not in WEEKDAYS:
+                raise ValueError(f"Unknown weekday: {day}")
+            if not (re.match(HOURS_PATTERN, opens) and re.match(HOURS_PATTERN, closes)):
+                raise ValueError(f"Hours for {day} must be HH:MM")
+            if opens == closes:
+                raise ValueError(f"Opening and closing times for {day} are equal")
+        return hours
+
+    @field_validator("timezone")
+    @classmethod
+    def _check_timezone(cls, value):
+        if value is not None:
+            try:
+                ZoneInfo(value)
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Unknown timezone: {value}") from e
+        return value
+
+
+class ConfigurationResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    version: int
+    bot_name: str
+    tone: BotTone
+    auto_reply_enabled: bool
+    auto_reply_message: str | None = None
+    operating_hours: dict[str, tuple[str, str]]
+    timezone: str
+
+
+class EmbeddingStorageSchema(BaseModel):
+    # FULL: exact vectors; HALF: halfvec index; BINARY: bit index, re-ranked
+    storage: EmbeddingStorage
+
+
+class EmbeddingStorageResponse(EmbeddingStorageSchema):
+    # chunks switched to the new mode by this update
+    chunks_moved: int = 0
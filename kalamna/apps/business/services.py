@@ -0,0 +1,128 @@
+"""
+Business logic for businesses
+Widget API-key (credential) issuing, listing and revocation, the
+business's chatbot configuration and its embedding storage mode
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.business.models import Configuration, Credential
+from kalamna.apps.business.schemas import ConfigurationUpdateSchema
+from kalamna.apps.documents.models import EmbeddingStorage
+from kalamna.apps.employees.models import Employee
+from kalamna.core.api_keys import generate_api_key, invalidate_api_key, key_digest
+from kalamna.core.business_config import ConfigSnapshot, publish_business_config
+from kalamna.rag_infra.vector_db import set_embedding_storage
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+
+async def create_credential(
+    db: AsyncSession, employee: Employee
+) -> tuple[Credential, str]:
+    """Issue a new API key for the employee's business; returns it in clear once."""
+    api_key, prefix = generate_api_key()
+    credential = Credential(
+        business_id=employee.business_id,
+        api_key_hashed=key_digest(api_key),
+        prefix=prefix,
+        created_by=employee.id,
+        is_active=True,
+    )
+    db.add(credential)
+    await db.commit()
+    await db.refresh(credential)
+    return credential, api_key
+
+
+async def list_credentials(
+    db: AsyncSession, business_id: uuid.UUID
+) -> list[Credential]:
+    result = await db.scalars(
+        select(Credential)
+        .where(Credential.business_id == business_id)
+        .order_by(Credential.created_at.desc())
+    )
+    return list(result)
+
+
+async def revoke_credential(
+    db: AsyncSession,
+    redis: Redis | None,
+    employee: Employee,
+    credential_id: uuid.UUID,
+) -> Credential:
+    """
+    Deactivate a key and evict it from every cache, so the next request with
+    it is rejected by all workers.
+    """
+    credential = await db.get(Credential, credential_id)
+    if credential is None or credential.business_id != employee.business_id:
+        raise LookupError("Credential not found")
+    if credential.revoked_at is None:
+        credential.is_active = False
+        credential.revoked_at = datetime.now(timezone.utc)
+        credential.revoked_by = employee.id
+        await db.commit()
+    # after the commit, so lookups that miss the caches see the revoked row
+    await invalidate_api_key(redis, credential.api_key_hashed)
+    return credential
+
+
+async def update_configuration(
+    db: AsyncSession,
+    redis: Redis | None,
+    business_id: uuid.UUID,
+    data: ConfigurationUpdateSchema,
+) -> ConfigSnapshot:
+    """
+    Save the given settings as the next configuration version, then push the
+    new snapshot to every worker.
+    """
+    changes = data.model_dump(exclude_unset=True)
+    stmt = insert(Configuration).values(business_id=business_id, **changes)
+    row = await db.scalar(
+        stmt.on_conflict_do_update(
+            index_elements=[Configuration.business_id],
+            set_={
+                **{name: stmt.excluded[name] for name in changes},
+                "version": Configuration.version + 1,
+                "updated_at": func.now(),
+            },
+        )
+        .returning(Configuration)
+        .execution_options(populate_existing=True)
+    )
+    await db.commit()
+    snapshot = ConfigSnapshot.from_row(row)
+    # after the commit, so a worker that misses the caches reads this version
+    try:
+        await publish_business_config(redis, snapshot)
+    except Exception as e:  # workers still pick it up within LOCAL_MAX_AGE_S
+        logger.warning("business_config_publish_failed", error=str(e))
+    return snapshot
+
+
+async def update_embedding_storage(
+    db: AsyncSession, business_id: uuid.UUID, storage: EmbeddingStorage
+) -> int:
+    """
+    Switch the business's chunks to another storage mode; returns how many
+    chunks moved. Searches use the new mode from the commit on.
+    """
+    moved = await set_embedding_storage(db, business_id, storage)
+    await db.commit()
+    logger.info(
+        "embedding_storage_changed",
+        business_id=str(business_id),
+        storage=storage.name,
+        chunks_moved=moved,
+    )
+    return moved
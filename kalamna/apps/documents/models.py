@@ -2,3 +2,314 @@
 Document database models
 Document model with filename, s3_path, status, and organization link
 """
+
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import (
+    BigInteger,
+    Computed,
+    DateTime,
+)
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy import (
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from kalamna.db.base import Base
+from kalamna.rag_infra.embedder import EMBEDDING_DIMENSIONS
+
+
+class KnowledgeBaseType(Enum):
+    FILE = "file"
+    TEXT = "text"
+
+
+class KnowledgeBaseStatus(Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class EmbeddingStorage(Enum):
+    """
+    How a business's chunk vectors are indexed. Full-precision vectors are
+    always stored; quantized modes index a smaller copy and re-rank exactly.
+    """
+
+    FULL = "full"  # float32 HNSW index
+    HALF = "half"  # float16 (halfvec) HNSW index, half the size
+    BINARY = "binary"  # 1 bit per dimension, ~32x smaller, needs re-ranking
+
+
+class KnowledgeBase(Base):
+    __tablename__ = "knowledge_bases"
+    __table_args__ = (
+        Index("ix_knowledge_bases_business_created", "business_id", "created_at", "id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        nullable=False,
+    )
+    base_type: Mapped[KnowledgeBaseType] = mapped_column(
+        SAEnum(KnowledgeBaseType, name="knowledge_base_type_enum", native_enum=True),
+        nullable=False,
+    )
+    title: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+    )
+    content_json: Mapped[dict | None] = mapped_column(
+        JSONB,
+        nullable=True,
+    )
+    file_url: Mapped[str | None] = mapped_column(
+        String(1024),
+        nullable=True,
+    )
+    file_type: Mapped[str | None] = mapped_column(
+        String(20),
+        nullable=True,
+    )
+    status: Mapped[KnowledgeBaseStatus] = mapped_column(
+        SAEnum(
+            KnowledgeBaseStatus, name="knowledge_base_status_enum", native_enum=True
+        ),
+        default=KnowledgeBaseStatus.PENDING,
+        nullable=False,
+    )
+    # document-level embedding (e.g. of a summary), optional
+    embedding_vector = mapped_column(
+        Vector(EMBEDDING_DIMENSIONS),
+        nullable=True,
+    )
+    # when the current re-index claimed it; a run that outlives
+    # `PROCESSING_LEASE_S` is presumed dead and can be taken over
+    processing_started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    # bumped on every re-upload; see KnowledgeBaseVersion
+    version: Mapped[int] = mapped_column(
+        Integer,
+        default=1,
+        server_default="1",
+        nullable=False,
+    )
+    # hash of the parsed text last indexed; an identical re-upload is a no-op
+    content_hash: Mapped[str | None] = mapped_column(
+        String(32),
+        nullable=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<KnowledgeBase id={self.id} status={self.status}>"
+
+
+class KnowledgeBaseVersion(Base):
+    """One uploaded file of a knowledge base, and what re-indexing it did."""
+
+    __tablename__ = "knowledge_base_versions"
+    __table_args__ = (
+        UniqueConstraint("kb_id", "version", name="uq_kb_versions_kb_version"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    kb_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("knowledge_bases.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    version: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+    file_url: Mapped[str | None] = mapped_column(
+        String(1024),
+        nullable=True,
+    )
+    file_type: Mapped[str | None] = mapped_column(
+        String(20),
+        nullable=True,
+    )
+    content_hash: Mapped[str | None] = mapped_column(
+        String(32),
+        nullable=True,
+    )
+    # filled in once the version is indexed
+    chunks_embedded: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    chunks_reused: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    chunks_removed: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<KnowledgeBaseVersion kb={self.kb_id} version={self.version}>"
+
+
+class KnowledgeBaseChunk(Base):
+    __tablename__ = "knowledge_base_chunks"
+    __table_args__ = (
+        # deferred: an incremental re-index shifts kept chunks' positions
+        UniqueConstraint(
+            "kb_id",
+            "chunk_index",
+            name="uq_kb_chunks_kb_index",
+            deferrable=True,
+            initially="DEFERRED",
+        ),
+        Index("ix_kb_chunks_kb_hash", "kb_id", "content_hash"),
+        # one partial HNSW index per storage mode, so quantized businesses
+        # never pay for a full-precision index (pgvector >= 0.7)
+        Index(
+            "ix_kb_chunks_embedding_hnsw",
+            "embedding_vector",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_vector": "vector_cosine_ops"},
+            postgresql_where=text("embedding_storage = 'FULL'"),
+        ),
+        Index(
+            "ix_kb_chunks_embedding_half_hnsw",
+            text(
+                f"(embedding_vector::halfvec({EMBEDDING_DIMENSIONS})) "
+                "halfvec_cosine_ops"
+            ),
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_where=text("embedding_storage = 'HALF'"),
+        ),
+        Index(
+            "ix_kb_chunks_embedding_bit_hnsw",
+            text(
+                f"(binary_quantize(embedding_vector)::bit({EMBEDDING_DIMENSIONS})) "
+                "bit_hamming_ops"
+            ),
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_where=text("embedding_storage = 'BINARY'"),
+        ),
+        Index("ix_kb_chunks_tsv", "chunk_tsv", postgresql_using="gin"),
+        # the per-business LSH index for near-duplicate detection
+        Index("ix_kb_chunks_lsh_bands", "lsh_bands", postgresql_using="gin"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    kb_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("knowledge_bases.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        index=True,
+        nullable=False,
+    )
+    chunk_index: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+    chunk_text: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+    )
+    # `chunker.content_hash`; matches unchanged chunks across re-uploads
+    content_hash: Mapped[str | None] = mapped_column(
+        String(32),
+        nullable=True,
+    )
+    # NULL for near-duplicates (`duplicate_of_id` set): searches find the
+    # chunk they duplicate instead, and pgvector indexes skip NULLs
+    embedding_vector = mapped_column(
+        Vector(EMBEDDING_DIMENSIONS),
+        nullable=True,
+    )
+    # copied from Business.embedding_storage; selects the partial index
+    embedding_storage: Mapped[EmbeddingStorage] = mapped_column(
+        SAEnum(EmbeddingStorage, name="embedding_storage_enum", native_enum=True),
+        default=EmbeddingStorage.FULL,
+        server_default=EmbeddingStorage.FULL.name,
+        nullable=False,
+    )
+    # MinHash signature and its LSH band keys (kalamna.rag_infra.dedup);
+    # set on chunks that were embedded, so only they are matched against
+    minhash: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True,
+    )
+    lsh_bands: Mapped[list[int] | None] = mapped_column(
+        ARRAY(BigInteger),
+        nullable=True,
+    )
+    duplicate_of_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("knowledge_base_chunks.id", ondelete="SET NULL"),
+        index=True,
+        nullable=True,
+    )
+    # `normalize_text(chunk_text)`, so full-text search matches every
+    # spelling the query normaliser folds together
+    search_text: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+    # "simple" config: no stemming, works for Arabic and English alike
+    chunk_tsv = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('simple', coalesce(search_text, chunk_text))", persisted=True
+        ),
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<KnowledgeBaseChunk kb={self.kb_id} index={self.chunk_index}>"
@@ -2,3 +2,146 @@
 Document API routes
 Endpoints: /documents (upload, list, delete), /documents/{id}
 """
+
+import uuid
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.documents.schemas import (
+    MAX_DOCUMENT_SIZE,
+    KnowledgeBaseResponse,
+    KnowledgeBaseVersionResponse,
+)
+from kalamna.apps.documents.services import (
+    KnowledgeBaseBusyError,
+    knowledge_bases_export,
+    list_knowledge_bases,
+    list_versions,
+    replace_document,
+)
+from kalamna.apps.employees.models import Employee
+from kalamna.core.db import get_db
+from kalamna.core.dependencies import get_current_employee
+from kalamna.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    ExportFormat,
+    Page,
+    export_response,
+)
+from kalamna.storage.s3 import get_storage
+from kalamna.workers.document_processor import process_knowledge_base
+
+router = APIRouter(prefix="/documents", tags=["Documents"])
+
+
+def _client_error(e: Exception) -> HTTPException:
+    if isinstance(e, LookupError):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    if isinstance(e, KnowledgeBaseBusyError):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def _read_document(request: Request) -> bytes:
+    """The request body, refused (413) as soon as it passes MAX_DOCUMENT_SIZE."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Document is too large",
+    )
+    declared = request.headers.get("content-length")
+    if (
+        declared is not None
+        and declared.isdigit()
+        and int(declared) > MAX_DOCUMENT_SIZE
+    ):
+        raise too_large
+    # Content-Length may be missing (chunked) or wrong, so count as it arrives
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_DOCUMENT_SIZE:
+            raise too_large
+    return bytes(body)
+
+
+@router.get(
+    "",
+    response_model=Page[KnowledgeBaseResponse],
+    summary="The business's knowledge bases, newest first",
+)
+async def read_knowledge_bases(
+    cursor: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await list_knowledge_bases(db, employee.business_id, cursor, limit)
+    except ValueError as e:
+        raise _client_error(e) from e
+
+
+@router.get("/export", summary="Stream every knowledge base as NDJSON or CSV")
+async def export_knowledge_bases(
+    fmt: ExportFormat = Query("ndjson", alias="format"),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    return export_response(
+        db, knowledge_bases_export(employee.business_id), fmt, "documents"
+    )
+
+
+@router.put(
+    "/{kb_id}/file",
+    response_model=KnowledgeBaseResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Replace a knowledge base's document (raw request body)",
+)
+async def put_document(
+    request: Request,
+    kb_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
+    file_type: str = Query(..., examples=["pdf"]),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stores the file as a new version and re-indexes in the background; only
+    chunks that changed since the previous version are embedded again.
+    """
+    data = await _read_document(request)
+    try:
+        kb = await replace_document(
+            db, get_storage(), employee.business_id, kb_id, data, file_type
+        )
+    except (LookupError, ValueError, KnowledgeBaseBusyError) as e:
+        raise _client_error(e) from e
+    background_tasks.add_task(process_knowledge_base, kb.id)
+    return kb
+
+
+@router.get(
+    "/{kb_id}/versions",
+    response_model=list[KnowledgeBaseVersionResponse],
+    summary="Uploaded versions of a knowledge base, newest first",
+)
+async def read_versions(
+    kb_id: uuid.UUID,
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await list_versions(db, employee.business_id, kb_id)
+    except LookupError as e:
+        raise _client_error(e) from e
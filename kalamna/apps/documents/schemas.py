@@ -2,3 +2,36 @@
 Document Pydantic schemas
 Request/response schemas for document upload and retrieval
 """
+
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from kalamna.apps.documents.models import KnowledgeBaseStatus, KnowledgeBaseType
+
+# hard cap for a single uploaded document
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+
+class KnowledgeBaseResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    base_type: KnowledgeBaseType
+    title: str | None = None
+    file_type: str | None = None
+    status: KnowledgeBaseStatus
+    version: int
+    created_at: datetime
+
+
+class KnowledgeBaseVersionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    version: int
+    file_type: str | None = None
+    chunks_embedded: int | None = None
+    chunks_reused: int | None = None
+    chunks_removed: int | None = None
+    created_at: datetime
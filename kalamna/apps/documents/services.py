@@ -1,4 +1,152 @@
 """
 Document business logic
 Document upload to S3, parsing, chunking trigger, metadata extraction
+
+Replacing a knowledge base's file stores it as a new version next to the
+old ones and queues an incremental re-index (see
+`kalamna.workers.document_processor`), which only embeds changed chunks.
 """
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.documents.models import (
+    KnowledgeBase,
+    KnowledgeBaseStatus,
+    KnowledgeBaseType,
+    KnowledgeBaseVersion,
+)
+from kalamna.apps.documents.schemas import MAX_DOCUMENT_SIZE, KnowledgeBaseResponse
+from kalamna.core.pagination import keyset_page, schema_columns
+from kalamna.rag_infra.parser import SUPPORTED_FILE_TYPES
+from kalamna.storage.s3 import LocalStorage, S3Storage
+
+CONTENT_TYPES = {
+    "txt": "text/plain",
+    "md": "text/markdown",
+    "html": "text/html",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# how long a re-index may hold a knowledge base before another run (or an
+# upload) takes over; its process may have been killed without a trace
+PROCESSING_LEASE_S = 30 * 60
+
+
+def document_key(kb: KnowledgeBase, version: int, file_type: str) -> str:
+    return f"knowledge_bases/{kb.business_id}/{kb.id}/v{version}.{file_type}"
+
+
+class KnowledgeBaseBusyError(RuntimeError):
+    """The knowledge base is being re-indexed."""
+
+
+def is_processing(kb: KnowledgeBase, now: datetime | None = None) -> bool:
+    """Whether a re-index holds the knowledge base's unexpired lease."""
+    if kb.status != KnowledgeBaseStatus.PROCESSING or kb.processing_started_at is None:
+        return False
+    now = now or datetime.now(timezone.utc)
+    return now - kb.processing_started_at < timedelta(seconds=PROCESSING_LEASE_S)
+
+
+async def get_knowledge_base(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    kb_id: uuid.UUID,
+    for_update: bool = False,
+) -> KnowledgeBase:
+    kb = await db.get(
+        KnowledgeBase, kb_id, with_for_update=for_update, populate_existing=for_update
+    )
+    if kb is None or kb.business_id != business_id:
+        raise LookupError("Knowledge base not found")
+    return kb
+
+
+async def replace_document(
+    db: AsyncSession,
+    storage: S3Storage | LocalStorage,
+    business_id: uuid.UUID,
+    kb_id: uuid.UUID,
+    data: bytes,
+    file_type: str,
+) -> KnowledgeBase:
+    """
+    Store `data` as the knowledge base's next version and mark it pending.
+    The caller schedules `process_knowledge_base` to re-index it. Raises
+    KnowledgeBaseBusyError while a re-index runs.
+    """
+    file_type = file_type.lower().lstrip(".")
+    if file_type not in SUPPORTED_FILE_TYPES:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    if not data:
+        raise ValueError("Empty document")
+    if len(data) > MAX_DOCUMENT_SIZE:
+        raise ValueError("Document is too large")
+
+    # held until the commit: concurrent uploads (and the re-index claiming
+    # the knowledge base) take turns
+    kb = await get_knowledge_base(db, business_id, kb_id, for_update=True)
+    if is_processing(kb):
+        raise KnowledgeBaseBusyError(
+            "Knowledge base is being processed; retry when done"
+        )
+
+    version = kb.version + 1
+    key = document_key(kb, version, file_type)
+    await storage.put_bytes(key, data, CONTENT_TYPES[file_type])
+
+    kb.base_type = KnowledgeBaseType.FILE
+    kb.version = version
+    kb.file_url = storage.url(key)
+    kb.file_type = file_type
+    kb.status = KnowledgeBaseStatus.PENDING
+    # a run whose lease expired finds it gone, and drops its results
+    kb.processing_started_at = None
+    db.add(
+        KnowledgeBaseVersion(
+            kb_id=kb.id,
+            version=version,
+            file_url=kb.file_url,
+            file_type=file_type,
+        )
+    )
+    await db.commit()
+    return kb
+
+
+async def list_versions(
+    db: AsyncSession, business_id: uuid.UUID, kb_id: uuid.UUID
+) -> list[KnowledgeBaseVersion]:
+    await get_knowledge_base(db, business_id, kb_id)
+    result = await db.scalars(
+        select(KnowledgeBaseVersion)
+        .where(KnowledgeBaseVersion.kb_id == kb_id)
+        .order_by(KnowledgeBaseVersion.version.desc())
+    )
+    return list(result)
+
+
+async def list_knowledge_bases(
+    db: AsyncSession, business_id: uuid.UUID, cursor: str | None, limit: int
+) -> dict:
+    return await keyset_page(
+        db,
+        select(KnowledgeBase).where(KnowledgeBase.business_id == business_id),
+        KnowledgeBase.created_at,
+        KnowledgeBase.id,
+        cursor,
+        limit,
+    )
+
+
+def knowledge_bases_export(business_id: uuid.UUID) -> Select:
+    return (
+        select(*schema_columns(KnowledgeBase, KnowledgeBaseResponse))
+        .where(KnowledgeBase.business_id == business_id)
+        .order_by(KnowledgeBase.created_at.desc(), KnowledgeBase.id.desc())
+    )
@@ -2,3 +2,49 @@
 Employee API routes
 Endpoints: /employees (CRUD), /employees/{id}/permissions
 """
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.employees.schemas import EmployeeResponse
+from kalamna.apps.employees.services import employees_export, list_employees
+from kalamna.core.db import get_db
+from kalamna.core.dependencies import get_current_employee
+from kalamna.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    ExportFormat,
+    Page,
+    export_response,
+)
+
+router = APIRouter(prefix="/employees", tags=["Employees"])
+
+
+@router.get(
+    "",
+    response_model=Page[EmployeeResponse],
+    summary="The business's employees, newest first",
+)
+async def read_employees(
+    cursor: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await list_employees(db, employee.business_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+
+@router.get("/export", summary="Stream every employee as NDJSON or CSV")
+async def export_employees(
+    fmt: ExportFormat = Query("ndjson", alias="format"),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    return export_response(db, employees_export(employee.business_id), fmt, "employees")
@@ -3,7 +3,12 @@ Employee Pydantic schemas
 Request/response schemas for employee CRUD and permission management
 """
 
-from pydantic import BaseModel, EmailStr, Field
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+from kalamna.apps.employees.models import EmployeeRole
 
 
 # owner registration schema
@@ -11,3 +16,14 @@ class OwnerCreateSchema(BaseModel):
     full_name: str = Field(..., min_length=2, max_length=100)
     email: EmailStr
     password: str = Field(..., min_length=8, max_length=128)
+
+
+class EmployeeResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    full_name: str
+    email: str
+    role: EmployeeRole
+    is_active: bool
+    created_at: datetime
@@ -2,3 +2,33 @@
 Employee business logic
 Employee CRUD, permission assignment, role management
 """
+
+import uuid
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.employees.schemas import EmployeeResponse
+from kalamna.core.pagination import keyset_page, schema_columns
+
+
+async def list_employees(
+    db: AsyncSession, business_id: uuid.UUID, cursor: str | None, limit: int
+) -> dict:
+    return await keyset_page(
+        db,
+        select(Employee).where(Employee.business_id == business_id),
+        Employee.created_at,
+        Employee.id,
+        cursor,
+        limit,
+    )
+
+
+def employees_export(business_id: uuid.UUID) -> Select:
+    return (
+        select(*schema_columns(Employee, EmployeeResponse))
+        .where(Employee.business_id == business_id)
+        .order_by(Employee.created_at.desc(), Employee.id.desc())
+    )
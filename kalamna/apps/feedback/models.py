@@ -2,3 +2,122 @@
 Feedback database models
 Feedback entries with ratings, comments, and response association
 """
+
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import (
+    CheckConstraint,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from kalamna.db.base import Base
+
+
+class Feedback(Base):
+    __tablename__ = "feedbacks"
+    __table_args__ = (
+        CheckConstraint("rating BETWEEN 1 AND 5", name="rating_range"),
+        # one rating per chat session, however many requests race to submit it
+        UniqueConstraint("session_id", name="uq_feedbacks_session_id"),
+        Index("ix_feedbacks_business_submitted", "business_id", "submitted_at", "id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    # denormalised from the session so tenant queries don't need a join
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        nullable=False,
+    )
+    end_user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("end_users.id"),
+        nullable=False,
+    )
+    session_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("chat_sessions.id"),
+        nullable=False,
+    )
+    rating: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+    comment: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+    submitted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<Feedback id={self.id} rating={self.rating}>"
+
+
+class FeedbackAggregate(Base):
+    """
+    Incrementally maintained feedback statistics for one business and UTC day.
+    Updated in the same transaction as every feedback insert; rows (and their
+    sketches) merge into any window or across businesses.
+    """
+
+    __tablename__ = "feedback_aggregates"
+
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        primary_key=True,
+    )
+    bucket_date: Mapped[date] = mapped_column(
+        Date,
+        primary_key=True,
+    )
+    feedback_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    rating_sum: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    # counts of ratings 1..5, exact and mergeable by element-wise sum
+    rating_histogram: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer),
+        default=lambda: [0, 0, 0, 0, 0],
+        nullable=False,
+    )
+    # serialised DDSketch of bot response times (ms) in the rated sessions
+    response_time_sketch: Mapped[dict] = mapped_column(
+        JSONB,
+        default=dict,
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<FeedbackAggregate business={self.business_id} date={self.bucket_date}>"
+        )
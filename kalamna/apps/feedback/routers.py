@@ -2,3 +2,117 @@
 Feedback API routes
 Endpoints: /feedback (create, list), /feedback/{id}
 """
+
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.analytics.services import record_feedback
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.feedback.schemas import (
+    FeedbackCreateSchema,
+    FeedbackResponse,
+    FeedbackSummary,
+)
+from kalamna.apps.feedback.services import (
+    feedback_export,
+    get_feedback_summary,
+    list_feedback,
+    submit_feedback,
+)
+from kalamna.apps.rag.models import ChatSession
+from kalamna.core.db import get_db
+from kalamna.core.dependencies import get_chat_session, get_current_employee
+from kalamna.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    ExportFormat,
+    Page,
+    export_response,
+)
+from kalamna.core.redis import get_redis
+from kalamna.utils.logger import get_logger
+
+router = APIRouter(prefix="/feedback", tags=["Feedback"])
+logger = get_logger()
+
+
+@router.post(
+    "",
+    response_model=FeedbackResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Rate the current chat session",
+)
+async def create_feedback(
+    data: FeedbackCreateSchema,
+    session: ChatSession = Depends(get_chat_session),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        feedback = await submit_feedback(db, session, data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        ) from e
+
+    # analytics rollups are best-effort; never fail the submission for them
+    try:
+        redis = await get_redis()
+        await record_feedback(
+            redis, feedback.business_id, feedback.rating, feedback.submitted_at
+        )
+    except Exception:
+        logger.warning("analytics_record_feedback_failed", feedback_id=str(feedback.id))
+
+    return feedback
+
+
+@router.get(
+    "/summary",
+    response_model=FeedbackSummary,
+    summary="Rating distribution and response-time percentiles for a period",
+)
+async def read_feedback_summary(
+    start: date | None = Query(None),
+    end: date | None = Query(None, description="inclusive"),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end",
+        )
+    return await get_feedback_summary(db, [employee.business_id], start, end)
+
+
+@router.get(
+    "",
+    response_model=Page[FeedbackResponse],
+    summary="The business's feedback, newest first",
+)
+async def read_feedback(
+    cursor: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await list_feedback(db, employee.business_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+
+@router.get("/export", summary="Stream every feedback entry as NDJSON or CSV")
+async def export_feedback(
+    fmt: ExportFormat = Query("ndjson", alias="format"),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    return export_response(db, feedback_export(employee.business_id), fmt, "feedback")
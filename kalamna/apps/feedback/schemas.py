@@ -2,3 +2,36 @@
 Feedback Pydantic schemas
 Request/response schemas for feedback submission and retrieval
 """
+
+import uuid
+from datetime import date, datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class FeedbackCreateSchema(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+    comment: str | None = Field(None, max_length=2000)
+
+
+class FeedbackResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    session_id: uuid.UUID
+    rating: int
+    comment: str | None = None
+    submitted_at: datetime
+
+
+class FeedbackSummary(BaseModel):
+    period_start: date
+    period_end: date
+    feedback_count: int
+    mean_rating: float | None = None
+    rating_histogram: dict[int, int]
+    rating_p50: float | None = None
+    rating_p90: float | None = None
+    response_time_p50_ms: float | None = None
+    response_time_p95_ms: float | None = None
+    response_time_p99_ms: float | None = None
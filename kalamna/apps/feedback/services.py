@@ -1,4 +1,212 @@
 """
 Feedback business logic
 Feedback processing, aggregation, and quality improvement insights
+
+Every feedback insert also updates the per-business, per-day
+`FeedbackAggregate` row in the same transaction (rating histogram, running
+sum, DDSketch of response times), so dashboards merge a few pre-computed rows
+instead of running AVG/percentile queries over the feedbacks table.
 """
+
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Select, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.feedback.models import Feedback, FeedbackAggregate
+from kalamna.apps.feedback.schemas import (
+    FeedbackCreateSchema,
+    FeedbackResponse,
+    FeedbackSummary,
+)
+from kalamna.apps.rag.models import ChatMessage, ChatSession
+from kalamna.core.pagination import keyset_page, schema_columns
+from kalamna.utils.sketches import DDSketch
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+
+
+def histogram_quantile(histogram: list[int], q: float) -> float | None:
+    """Exact quantile of ratings from a 1..5 histogram."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q * (total - 1)
+    cumulative = 0
+    for rating, count in zip(RATING_VALUES, histogram, strict=True):
+        cumulative += count
+        if cumulative > rank:
+            return float(rating)
+    return float(RATING_VALUES[-1])
+
+
+def apply_feedback(
+    aggregate: FeedbackAggregate, rating: int, response_times_ms: list[int]
+) -> None:
+    """Fold one feedback into an aggregate row (in place)."""
+    histogram = list(aggregate.rating_histogram or [0] * len(RATING_VALUES))
+    histogram[rating - 1] += 1
+    sketch = DDSketch.from_dict(aggregate.response_time_sketch)
+    sketch.update(response_times_ms)
+
+    aggregate.feedback_count = (aggregate.feedback_count or 0) + 1
+    aggregate.rating_sum = (aggregate.rating_sum or 0) + rating
+    # reassign (not mutate) so SQLAlchemy sees the ARRAY/JSONB change
+    aggregate.rating_histogram = histogram
+    aggregate.response_time_sketch = sketch.to_dict()
+
+
+def merge_aggregates(
+    rows: list[FeedbackAggregate], period_start: date, period_end: date
+) -> FeedbackSummary:
+    """Merge any set of aggregate rows (days and/or businesses) into one summary."""
+    count = 0
+    rating_sum = 0
+    histogram = [0] * len(RATING_VALUES)
+    sketch = DDSketch()
+    for row in rows:
+        count += row.feedback_count
+        rating_sum += row.rating_sum
+        histogram = [
+            a + b for a, b in zip(histogram, row.rating_histogram, strict=True)
+        ]
+        sketch.merge(DDSketch.from_dict(row.response_time_sketch))
+
+    return FeedbackSummary(
+        period_start=period_start,
+        period_end=period_end,
+        feedback_count=count,
+        mean_rating=round(rating_sum / count, 3) if count else None,
+        rating_histogram=dict(zip(RATING_VALUES, histogram, strict=True)),
+        rating_p50=histogram_quantile(histogram, 0.5),
+        rating_p90=histogram_quantile(histogram, 0.9),
+        response_time_p50_ms=sketch.quantile(0.5),
+        response_time_p95_ms=sketch.quantile(0.95),
+        response_time_p99_ms=sketch.quantile(0.99),
+    )
+
+
+async def _lock_aggregate(
+    db: AsyncSession, business_id: uuid.UUID, bucket_date: date
+) -> FeedbackAggregate:
+    """Get-or-create the day's aggregate row and lock it for this transaction."""
+    await db.execute(
+        insert(FeedbackAggregate)
+        .values(
+            business_id=business_id,
+            bucket_date=bucket_date,
+            feedback_count=0,
+            rating_sum=0,
+            rating_histogram=[0] * len(RATING_VALUES),
+            response_time_sketch={},
+        )
+        .on_conflict_do_nothing()
+    )
+    return await db.scalar(
+        select(FeedbackAggregate)
+        .where(
+            FeedbackAggregate.business_id == business_id,
+            FeedbackAggregate.bucket_date == bucket_date,
+        )
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+async def submit_feedback(
+    db: AsyncSession, session: ChatSession, data: FeedbackCreateSchema
+) -> Feedback:
+    """
+    Store feedback for a chat session and update the day's aggregate.
+    Raises ValueError if the session already has feedback.
+    """
+    # concurrent submissions for the session queue here; later ones then see
+    # the first one's feedback_id
+    await db.scalar(
+        select(ChatSession)
+        .where(ChatSession.id == session.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    if session.feedback_id is not None:
+        raise ValueError("Feedback already submitted for this session")
+
+    submitted_at = datetime.now(timezone.utc)
+    feedback = Feedback(
+        business_id=session.business_id,
+        end_user_id=session.end_user_id,
+        session_id=session.id,
+        rating=data.rating,
+        comment=data.comment,
+        submitted_at=submitted_at,
+    )
+    db.add(feedback)
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        await db.rollback()
+        if "uq_feedbacks_session_id" in str(e.orig):
+            raise ValueError("Feedback already submitted for this session") from e
+        raise
+    session.feedback_id = feedback.id
+
+    response_times = (
+        await db.scalars(
+            select(ChatMessage.response_time_ms).where(
+                ChatMessage.session_id == session.id,
+                ChatMessage.response_time_ms.is_not(None),
+            )
+        )
+    ).all()
+
+    aggregate = await _lock_aggregate(db, session.business_id, submitted_at.date())
+    apply_feedback(aggregate, data.rating, list(response_times))
+
+    await db.commit()
+    return feedback
+
+
+async def get_feedback_summary(
+    db: AsyncSession,
+    business_ids: list[uuid.UUID],
+    period_start: date,
+    period_end: date,
+) -> FeedbackSummary:
+    """
+    Summarise feedback for [period_start, period_end] (inclusive days) across
+    one or more businesses by merging their daily aggregates.
+    """
+    rows = (
+        await db.scalars(
+            select(FeedbackAggregate).where(
+                FeedbackAggregate.business_id.in_(business_ids),
+                FeedbackAggregate.bucket_date >= period_start,
+                FeedbackAggregate.bucket_date <= period_end,
+            )
+        )
+    ).all()
+    return merge_aggregates(list(rows), period_start, period_end)
+
+
+async def list_feedback(
+    db: AsyncSession, business_id: uuid.UUID, cursor: str | None, limit: int
+) -> dict:
+    return await keyset_page(
+        db,
+        select(Feedback).where(Feedback.business_id == business_id),
+        Feedback.submitted_at,
+        Feedback.id,
+        cursor,
+        limit,
+    )
+
+
+def feedback_export(business_id: uuid.UUID) -> Select:
+    return (
+        select(*schema_columns(Feedback, FeedbackResponse))
+        .where(Feedback.business_id == business_id)
+        .order_by(Feedback.submitted_at.desc(), Feedback.id.desc())
+    )
@@ -0,0 +1,264 @@
+"""
+Realtime chat gateway
+WebSocket connections for end users and for employees taking over a chat
+
+Any worker on any node can hold any connection. Events for a session are
+published on its Redis channel (`chat:session:<id>`); each worker subscribes
+to the channels of the sessions it has connections for, and delivers what
+arrives to them. While Redis is unreachable a worker delivers to its own
+connections only, and its listener keeps retrying.
+
+Each connection has a bounded send queue. Publishing never waits on a client:
+a frame that doesn't fit in the queue, or a write that takes longer than
+`SEND_TIMEOUT_S`, marks the client as a slow consumer and closes it with
+`CLOSE_SLOW_CONSUMER`, so it reconnects and reloads history instead of
+holding memory for a backlog. The server sends `{"type": "ping"}` every
+`HEARTBEAT_INTERVAL_S` and closes connections it has heard nothing from for
+`HEARTBEAT_TIMEOUT_S`.
+"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+
+import orjson
+from fastapi import WebSocket, WebSocketDisconnect
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from kalamna.apps.rag.models import SenderType
+from kalamna.core.config import get_settings
+from kalamna.core.redis import get_redis
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+CHANNEL_PREFIX = "chat:session"
+SEND_QUEUE_SIZE = 64
+SEND_TIMEOUT_S = 10
+HEARTBEAT_INTERVAL_S = 20
+HEARTBEAT_TIMEOUT_S = 60
+MAX_FRAME_CHARS = 8000
+LISTENER_RETRY_S = 5
+
+CLOSE_GOING_AWAY = 1001  # heartbeat timeout
+CLOSE_POLICY = 1008  # bad credentials or frames
+CLOSE_ERROR = 1011
+CLOSE_RESTART = 1012  # worker shutting down; reconnect elsewhere
+CLOSE_SLOW_CONSUMER = 1013  # "try again later"
+
+MessageHandler = Callable[["Connection", dict], Awaitable[None]]
+
+
+def channel(session_id: uuid.UUID) -> str:
+    return f"{CHANNEL_PREFIX}:{session_id}"
+
+
+class Connection:
+    """One client socket and its bounded outbound queue."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: uuid.UUID,
+        sender_type: SenderType,
+        sender_id: uuid.UUID | None = None,
+        queue_size: int = SEND_QUEUE_SIZE,
+    ):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.sender_type = sender_type
+        self.sender_id = sender_id
+        self.last_seen = time.monotonic()
+        self.close_code: int | None = None
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self._closing = asyncio.Event()
+
+    def offer(self, frame: str) -> bool:
+        """Queue a frame without waiting; a full queue closes the connection."""
+        if self._closing.is_set():
+            return False
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.close(CLOSE_SLOW_CONSUMER)
+            return False
+        return True
+
+    def close(self, code: int) -> None:
+        if not self._closing.is_set():
+            self.close_code = code
+            self._closing.set()
+
+    async def _send(self) -> None:
+        while True:
+            frame = await self._queue.get()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(frame), timeout=SEND_TIMEOUT_S
+                )
+            except asyncio.TimeoutError:
+                self.close(CLOSE_SLOW_CONSUMER)
+                return
+
+    async def _receive(self, on_message: MessageHandler) -> None:
+        while True:
+            text = await self.websocket.receive_text()
+            self.last_seen = time.monotonic()
+            if len(text) > MAX_FRAME_CHARS:
+                self.close(CLOSE_POLICY)
+                return
+            try:
+                frame = orjson.loads(text)
+            except orjson.JSONDecodeError:
+                self.close(CLOSE_POLICY)
+                return
+            if isinstance(frame, dict) and frame.get("type") != "pong":
+                await on_message(self, frame)
+
+
+class ChatGateway:
+    """Connections held by this worker, and their Redis fan-out."""
+
+    def __init__(self, max_connections: int = 10_000):
+        self.max_connections = max_connections
+        self._sessions: dict[uuid.UUID, set[Connection]] = {}
+        self._count = 0
+        self._redis: Redis | None = None
+        self._pubsub: PubSub | None = None
+        self._tasks: list[asyncio.Task] = []
+        # keeps the pubsub subscribed (so listen() runs) while no sessions are
+        self._worker_channel = f"chat:worker:{uuid.uuid4()}"
+
+    def __len__(self) -> int:
+        return self._count
+
+    def connections(self) -> list[Connection]:
+        return [conn for conns in self._sessions.values() for conn in conns]
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+
+    async def stop(self) -> None:
+        for conn in self.connections():
+            conn.close(CLOSE_RESTART)
+        for task in self._tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._pubsub = None
+
+    async def _heartbeat(self) -> None:
+        # one loop for the worker rather than a task per connection
+        ping = orjson.dumps({"type": "ping"}).decode()
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_S)
+            now = time.monotonic()
+            for conn in self.connections():
+                if now - conn.last_seen > HEARTBEAT_TIMEOUT_S:
+                    conn.close(CLOSE_GOING_AWAY)
+                else:
+                    conn.offer(ping)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                self._redis = await get_redis()
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self._worker_channel)
+                    # sessions joined from here on subscribe themselves
+                    self._pubsub = pubsub
+                    if self._sessions:
+                        await pubsub.subscribe(*map(channel, self._sessions))
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            session_id = uuid.UUID(
+                                message["channel"].rpartition(":")[2]
+                            )
+                            self.deliver(session_id, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("chat_gateway_listener_error", error=str(e))
+            self._pubsub = None
+            await asyncio.sleep(LISTENER_RETRY_S)
+
+    def deliver(self, session_id: uuid.UUID, frame: str) -> int:
+        """Queue a frame for every local connection of the session."""
+        delivered = 0
+        for conn in list(self._sessions.get(session_id, ())):
+            delivered += conn.offer(frame)
+        return delivered
+
+    async def publish(self, session_id: uuid.UUID, event: dict) -> None:
+        """Send an event to every connection of the session, on any node."""
+        # asyncpg's UUID type is not a uuid.UUID to orjson
+        frame = orjson.dumps(event, default=str).decode()
+        if self._pubsub is not None:
+            try:
+                await self._redis.publish(channel(session_id), frame)
+                return
+            except Exception as e:  # other nodes miss it; local clients don't
+                logger.warning("chat_gateway_publish_failed", error=str(e))
+        self.deliver(session_id, frame)
+
+    async def _join(self, conn: Connection) -> None:
+        connections = self._sessions.setdefault(conn.session_id, set())
+        connections.add(conn)
+        self._count += 1
+        if len(connections) == 1 and self._pubsub is not None:
+            # on failure the listener reconnects and subscribes every session
+            with suppress(Exception):
+                await self._pubsub.subscribe(channel(conn.session_id))
+
+    async def _leave(self, conn: Connection) -> None:
+        connections = self._sessions.get(conn.session_id)
+        if not connections or conn not in connections:
+            return
+        connections.discard(conn)
+        self._count -= 1
+        if not connections:
+            del self._sessions[conn.session_id]
+            if self._pubsub is not None:
+                with suppress(Exception):
+                    await self._pubsub.unsubscribe(channel(conn.session_id))
+
+    async def serve(self, conn: Connection, on_message: MessageHandler) -> None:
+        """
+        Run an accepted connection until the client leaves, stalls or times
+        out, or the worker stops; then close it with the matching code.
+        """
+        if self._count >= self.max_connections:
+            await conn.websocket.close(CLOSE_SLOW_CONSUMER)
+            return
+        await self._join(conn)
+        tasks = [
+            asyncio.create_task(conn._send()),
+            asyncio.create_task(conn._receive(on_message)),
+            asyncio.create_task(conn._closing.wait()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.warning("chat_connection_error", error=repr(error))
+                    conn.close(CLOSE_ERROR)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # not gather(): a child's CancelledError would pass as ours
+            await asyncio.wait(tasks)
+            await self._leave(conn)
+            if conn.close_code is not None:
+                with suppress(Exception):
+                    await conn.websocket.close(conn.close_code)
+
+
+gateway = ChatGateway(get_settings().ws_max_connections)
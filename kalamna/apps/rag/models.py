@@ -2,3 +2,221 @@
 RAG database models
 Query history, conversation threads, and response tracking
 """
+
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+
+from sqlalchemy import DateTime
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy import ForeignKey, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from kalamna.db.base import Base
+
+
+class SenderType(Enum):
+    USER = "user"
+    BOT = "bot"
+    EMPLOYEE = "employee"
+
+
+class ChatSessionStatus(Enum):
+    ACTIVE = "active"
+    CLOSED = "closed"
+
+
+class EndUser(Base):
+    __tablename__ = "end_users"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        index=True,
+        nullable=False,
+    )
+    external_id: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+    )
+    name: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<EndUser id={self.id} external_id={self.external_id!r}>"
+
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_business_started", "business_id", "started_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        nullable=False,
+    )
+    end_user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("end_users.id"),
+        nullable=False,
+    )
+    session_token: Mapped[str] = mapped_column(
+        String(255),
+        unique=True,
+        index=True,
+        nullable=False,
+    )
+    status: Mapped[ChatSessionStatus] = mapped_column(
+        SAEnum(ChatSessionStatus, name="chat_session_status_enum", native_enum=True),
+        default=ChatSessionStatus.ACTIVE,
+        nullable=False,
+    )
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    ended_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    # sessions and feedbacks reference each other, so this FK is added after both
+    # tables exist
+    feedback_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("feedbacks.id", use_alter=True),
+        nullable=True,
+    )
+
+    def __repr__(self) -> str:
+        return f"<ChatSession id={self.id} status={self.status}>"
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_created", "session_id", "created_at", "id"),
+        Index("ix_chat_messages_business_created", "business_id", "created_at", "id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    session_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("chat_sessions.id"),
+        nullable=False,
+    )
+    # denormalised from the session so tenant history needs no join
+    business_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("businesses.id"),
+        nullable=False,
+    )
+    sender_type: Mapped[SenderType] = mapped_column(
+        SAEnum(SenderType, name="sender_type_enum", native_enum=True),
+        nullable=False,
+    )
+    content: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+    )
+    ai_model_used: Mapped[str | None] = mapped_column(
+        String(100),
+        nullable=True,
+    )
+    emotion_detected: Mapped[str | None] = mapped_column(
+        String(50),
+        nullable=True,
+    )
+    # time taken to produce a bot reply, null for user/employee messages
+    response_time_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<ChatMessage id={self.id} sender={self.sender_type}>"
+
+
+class VoiceMessage(Base):
+    __tablename__ = "voice_messages"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    session_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("chat_sessions.id"),
+        index=True,
+        nullable=False,
+    )
+    audio_file_url: Mapped[str] = mapped_column(
+        String(1024),
+        nullable=False,
+    )
+    # transcript; null until the voice worker has processed the clip
+    content: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+    detected_emotion: Mapped[str | None] = mapped_column(
+        String(50),
+        nullable=True,
+    )
+    sender_type: Mapped[SenderType] = mapped_column(
+        SAEnum(SenderType, name="sender_type_enum", native_enum=True),
+        nullable=False,
+    )
+    ai_model_used: Mapped[str | None] = mapped_column(
+        String(100),
+        nullable=True,
+    )
+    # upload completed; transcribed_at - created_at is the processing latency
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    transcribed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+
+    def __repr__(self) -> str:
+        return f"<VoiceMessage id={self.id} session={self.session_id}>"
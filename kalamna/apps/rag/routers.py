@@ -1,4 +1,366 @@
 """
 RAG API routes
-Endpoints: /rag/query, /rag/conversations, /rag/history
+Endpoints: /rag/sessions, /rag/history, /rag/voice, /rag/ws
 """
+
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    WebSocket,
+    status,
+)
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.analytics.services import record_chat_started
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.rag.gateway import CLOSE_POLICY, Connection, gateway
+from kalamna.apps.rag.models import ChatMessage, ChatSession, SenderType, VoiceMessage
+from kalamna.apps.rag.schemas import (
+    ChatFrame,
+    ChatMessageResponse,
+    ChatSessionCreatedResponse,
+    ChatSessionCreateSchema,
+    VoiceMessageResponse,
+    VoiceUploadCreateSchema,
+    VoiceUploadStatus,
+)
+from kalamna.apps.rag.services import (
+    UploadInProgressError,
+    abort_voice_upload,
+    auto_reply_for,
+    chat_event,
+    complete_voice_upload,
+    end_takeover,
+    find_active_session,
+    find_takeover_session,
+    get_voice_upload,
+    history_export,
+    list_history,
+    message_event,
+    save_chat_message,
+    start_chat_session,
+    start_takeover,
+    start_voice_upload,
+    taken_over_by,
+    upload_voice_chunk,
+)
+from kalamna.core.api_keys import ApiKeyPrincipal
+from kalamna.core.business_config import cached_business_config, get_business_config
+from kalamna.core.db import AsyncSessionLocal, get_db
+from kalamna.core.dependencies import (
+    get_api_key_principal,
+    get_chat_session,
+    get_current_employee,
+)
+from kalamna.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    ExportFormat,
+    Page,
+    export_response,
+)
+from kalamna.core.redis import get_redis, get_redis_or_none
+from kalamna.storage.s3 import get_storage
+from kalamna.utils.logger import get_logger
+
+router = APIRouter(prefix="/rag", tags=["RAG"])
+logger = get_logger()
+
+
+def _client_error(e: Exception) -> HTTPException:
+    if isinstance(e, LookupError):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    if isinstance(e, UploadInProgressError):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def _auto_reply(
+    db: AsyncSession, session: ChatSession, message: ChatMessage, redis: Redis | None
+) -> ChatMessage | None:
+    """
+    Save the bot's auto reply to `message` if the business is closed and no
+    employee has taken the session over.
+    """
+    if redis is not None:
+        try:
+            if await taken_over_by(redis, session.id) is not None:
+                return None
+        except Exception as e:  # no takeover known; the bot answers
+            logger.warning("chat_takeover_check_failed", error=str(e))
+    # the worker's snapshot, with no I/O, on every turn after the first
+    config = cached_business_config(session.business_id)
+    if config is None:
+        config = await get_business_config(db, session.business_id, redis)
+    reply = auto_reply_for(config, message.created_at)
+    if reply is None:
+        return None
+    elapsed = datetime.now(timezone.utc) - message.created_at
+    return await save_chat_message(
+        db,
+        session.id,
+        session.business_id,
+        SenderType.BOT,
+        reply,
+        redis,
+        response_time_ms=int(elapsed.total_seconds() * 1000),
+    )
+
+
+async def _relay_messages(
+    conn: Connection, session: ChatSession, employee_id: uuid.UUID | None = None
+):
+    """
+    Save each message the client sends and publish it to the session; end
+    users' messages out of hours get the business's auto reply.
+    """
+    redis = await get_redis_or_none()
+
+    async def on_message(conn: Connection, frame: dict) -> None:
+        try:
+            content = ChatFrame.model_validate(frame).content
+        except ValidationError as e:
+            detail = e.errors(include_url=False, include_context=False)
+            conn.offer(orjson.dumps(chat_event("error", detail=detail)).decode())
+            return
+        reply = None
+        async with AsyncSessionLocal() as db:
+            message = await save_chat_message(
+                db, session.id, session.business_id, conn.sender_type, content, redis
+            )
+            if conn.sender_type == SenderType.USER:
+                reply = await _auto_reply(db, session, message, redis)
+        await gateway.publish(
+            session.id, message_event(message, employee_id=employee_id)
+        )
+        if reply is not None:
+            await gateway.publish(session.id, message_event(reply))
+        if redis is not None and employee_id is not None:
+            await start_takeover(redis, session.id, employee_id)
+
+    await gateway.serve(conn, on_message)
+
+
+@router.post(
+    "/sessions",
+    response_model=ChatSessionCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Open a chat session for a widget visitor (X-API-Key)",
+)
+async def create_chat_session(
+    data: ChatSessionCreateSchema,
+    principal: ApiKeyPrincipal = Depends(get_api_key_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    session = await start_chat_session(db, principal.business_id, data)
+
+    # analytics rollups are best-effort; never fail the session for them
+    try:
+        redis = await get_redis()
+        await record_chat_started(redis, session.business_id, session.started_at)
+    except Exception:
+        logger.warning("analytics_record_chat_failed", session_id=str(session.id))
+
+    return ChatSessionCreatedResponse(
+        session_id=session.id, session_token=session.session_token
+    )
+
+
+@router.get(
+    "/history",
+    response_model=Page[ChatMessageResponse],
+    summary="Chat messages across the business (or one session), newest first",
+)
+async def read_history(
+    session_id: uuid.UUID | None = Query(None),
+    cursor: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await list_history(db, employee.business_id, session_id, cursor, limit)
+    except ValueError as e:
+        raise _client_error(e) from e
+
+
+@router.get("/history/export", summary="Stream chat messages as NDJSON or CSV")
+async def export_history(
+    session_id: uuid.UUID | None = Query(None),
+    fmt: ExportFormat = Query("ndjson", alias="format"),
+    employee: Employee = Depends(get_current_employee),
+    db: AsyncSession = Depends(get_db),
+):
+    return export_response(
+        db, history_export(employee.business_id, session_id), fmt, "history"
+    )
+
+
+@router.websocket("/ws")
+async def chat_socket(websocket: WebSocket, token: str = Query(...)):
+    """
+    The end user's live chat; `token` is the chat session token. Send
+    `{"type": "message", "content": ...}`; answer `{"type": "ping"}` with
+    `{"type": "pong"}`. Every message of the session arrives as a
+    `{"type": "message", ...}` event.
+    """
+    async with AsyncSessionLocal() as db:
+        session = await find_active_session(db, token)
+    if session is None:
+        await websocket.close(CLOSE_POLICY)
+        return
+    await websocket.accept()
+    await _relay_messages(Connection(websocket, session.id, SenderType.USER), session)
+
+
+@router.websocket("/ws/takeover/{session_id}")
+async def takeover_socket(
+    websocket: WebSocket, session_id: uuid.UUID, token: str = Query(...)
+):
+    """
+    An employee joins a session of their business and answers in place of
+    the bot; `token` is their access token. Same frames as /rag/ws.
+    """
+    async with AsyncSessionLocal() as db:
+        found = await find_takeover_session(db, token, session_id)
+    if found is None:
+        await websocket.close(CLOSE_POLICY)
+        return
+    employee, session = found
+    await websocket.accept()
+    redis = await get_redis_or_none()
+    if redis is not None:
+        await start_takeover(redis, session.id, employee.id)
+    await gateway.publish(session.id, chat_event("takeover", employee_id=employee.id))
+    try:
+        await _relay_messages(
+            Connection(websocket, session.id, SenderType.EMPLOYEE, employee.id),
+            session,
+            employee.id,
+        )
+    finally:
+        if redis is not None:
+            await end_takeover(redis, session.id, employee.id)
+        await gateway.publish(
+            session.id, chat_event("takeover_ended", employee_id=employee.id)
+        )
+
+
+@router.post(
+    "/voice/uploads",
+    response_model=VoiceUploadStatus,
+    status_code=status.HTTP_201_CREATED,
+    summary="Start a resumable voice-message upload",
+)
+async def create_voice_upload(
+    data: VoiceUploadCreateSchema,
+    session: ChatSession = Depends(get_chat_session),
+    redis=Depends(get_redis),
+):
+    """
+    Returns the chunk size and count; PUT each chunk to
+    /rag/voice/uploads/{upload_id}/chunks/{index}, then POST .../complete.
+    """
+    try:
+        return await start_voice_upload(redis, get_storage(), session, data)
+    except ValueError as e:
+        raise _client_error(e) from e
+
+
+@router.get(
+    "/voice/uploads/{upload_id}",
+    response_model=VoiceUploadStatus,
+    summary="Which chunks of an upload were received (for resuming)",
+)
+async def read_voice_upload(
+    upload_id: str,
+    session: ChatSession = Depends(get_chat_session),
+    redis=Depends(get_redis),
+):
+    try:
+        return await get_voice_upload(redis, session, upload_id)
+    except LookupError as e:
+        raise _client_error(e) from e
+
+
+@router.put(
+    "/voice/uploads/{upload_id}/chunks/{index}",
+    response_model=VoiceUploadStatus,
+    summary="Upload (or re-upload) one chunk as the raw request body",
+)
+async def put_voice_chunk(
+    request: Request,
+    upload_id: str,
+    index: int = Path(..., ge=0),
+    session: ChatSession = Depends(get_chat_session),
+    redis=Depends(get_redis),
+):
+    try:
+        return await upload_voice_chunk(
+            redis, get_storage(), session, upload_id, index, request.stream()
+        )
+    except (LookupError, ValueError) as e:
+        raise _client_error(e) from e
+
+
+@router.post(
+    "/voice/uploads/{upload_id}/complete",
+    response_model=VoiceMessageResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Finish the upload and queue transcription",
+)
+async def finish_voice_upload(
+    upload_id: str,
+    session: ChatSession = Depends(get_chat_session),
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
+):
+    try:
+        return await complete_voice_upload(db, redis, get_storage(), session, upload_id)
+    except (LookupError, ValueError, UploadInProgressError) as e:
+        raise _client_error(e) from e
+
+
+@router.delete(
+    "/voice/uploads/{upload_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Abandon an upload and discard its chunks",
+)
+async def delete_voice_upload(
+    upload_id: str,
+    session: ChatSession = Depends(get_chat_session),
+    redis=Depends(get_redis),
+):
+    try:
+        await abort_voice_upload(redis, get_storage(), session, upload_id)
+    except LookupError as e:
+        raise _client_error(e) from e
+
+
+@router.get(
+    "/voice/messages/{voice_message_id}",
+    response_model=VoiceMessageResponse,
+    summary="Poll a voice message for its transcript",
+)
+async def read_voice_message(
+    voice_message_id: uuid.UUID,
+    session: ChatSession = Depends(get_chat_session),
+    db: AsyncSession = Depends(get_db),
+):
+    voice = await db.get(VoiceMessage, voice_message_id)
+    if voice is None or voice.session_id != session.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Voice message not found",
+        )
+    return voice
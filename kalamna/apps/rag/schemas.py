@@ -2,3 +2,72 @@
 RAG Pydantic schemas
 Request/response schemas for queries, answers, and conversations
 """
+
+import uuid
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from kalamna.apps.rag.models import SenderType
+
+# hard cap for a single voice clip
+MAX_VOICE_SIZE = 50 * 1024 * 1024
+MAX_CHAT_MESSAGE_CHARS = 4000
+
+
+class VoiceUploadCreateSchema(BaseModel):
+    content_type: str = Field(..., examples=["audio/webm"])
+    total_size: int = Field(..., gt=0, le=MAX_VOICE_SIZE)
+
+
+class VoiceUploadStatus(BaseModel):
+    upload_id: str
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int]
+    complete: bool
+
+
+class VoiceMessageResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    session_id: uuid.UUID
+    audio_file_url: str
+    content: str | None = None
+    detected_emotion: str | None = None
+    created_at: datetime
+    transcribed_at: datetime | None = None
+
+
+class ChatMessageResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    session_id: uuid.UUID
+    sender_type: SenderType
+    content: str
+    ai_model_used: str | None = None
+    emotion_detected: str | None = None
+    response_time_ms: int | None = None
+    created_at: datetime
+
+
+class ChatSessionCreateSchema(BaseModel):
+    # the business's own id for the visitor; their sessions share one end user
+    external_id: str | None = Field(None, max_length=255)
+    name: str | None = Field(None, max_length=255)
+
+
+class ChatSessionCreatedResponse(BaseModel):
+    session_id: uuid.UUID
+    # sent as X-Session-Token and as the chat WebSocket's `token`
+    session_token: str
+
+
+class ChatFrame(BaseModel):
+    """A message sent by a client over the chat WebSocket."""
+
+    type: Literal["message"]
+    content: str = Field(..., min_length=1, max_length=MAX_CHAT_MESSAGE_CHARS)
@@ -2,3 +2,721 @@
 RAG business logic
 Query embedding, vector search, context retrieval, LLM answer generation
 """
+
+import hashlib
+import math
+import re
+import secrets
+import time
+import unicodedata
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+
+from redis.asyncio import Redis
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.analytics.services import record_message
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.rag.models import (
+    ChatMessage,
+    ChatSession,
+    ChatSessionStatus,
+    EndUser,
+    SenderType,
+    VoiceMessage,
+)
+from kalamna.apps.rag.schemas import (
+    ChatMessageResponse,
+    ChatSessionCreateSchema,
+    VoiceUploadCreateSchema,
+    VoiceUploadStatus,
+)
+from kalamna.core.business_config import ConfigSnapshot
+from kalamna.core.pagination import keyset_page, schema_columns
+from kalamna.core.security import decode_token
+from kalamna.storage.s3 import MIN_PART_SIZE, LocalStorage, S3Storage
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+# ---------------------------------------------------------------------------
+# Query normalisation
+#
+# End users write the same question in Arabic script, Arabizi ("3ayez
+# a3raf"), English or a mix, with optional diacritics, elongated letters and
+# several spellings of alef, yaa and taa marbuta. `normalize_query` maps
+# those variants to one canonical text, and that text (never the raw one) is
+# what gets cached, embedded and matched lexically, so variants share cache
+# entries. Results are kept in a bounded per-process LRU.
+# ---------------------------------------------------------------------------
+
+QUERY_CACHE_SIZE = 50_000
+# longer texts are normalised uncached, which bounds the LRU's memory
+QUERY_CACHE_MAX_CHARS = 512
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# three or more of one letter ("shokraaaan", "شكراااا"); digits are kept
+_ELONGATION_RE = re.compile(r"([^\W\d_])\1{2,}")
+# an Arabizi digit inside a word or opening one before a vowel ("a3raf",
+# "7aga"), unlike "2nd", "mp3" or "iphone15"
+_ARABIZI_RE = re.compile(r"[a-z][235789]+[a-z]|^[235789][aeiouy]")
+# times ("9am") and shorter letter-digit tokens ("b2b", "7a9") are never
+# spelled out letter by letter
+_TIME_RE = re.compile(r"^\d+(am|pm)$")
+ARABIZI_MIN_GUESS_CHARS = 4
+# the article, written as its own word ("el talab"), joins the next one
+_ARTICLE_RE = re.compile(r"(?<!\S)ال (?=[\u0621-\u064a])")
+
+_ARABIC_FOLD = str.maketrans(
+    {
+        **dict.fromkeys("أإآٱ", "ا"),
+        "ى": "ي",
+        "ی": "ي",
+        "ئ": "ي",
+        "ؤ": "و",
+        "ة": "ه",
+        "ک": "ك",
+        **{chr(0x0660 + d): str(d) for d in range(10)},
+        **{chr(0x06F0 + d): str(d) for d in range(10)},
+        # diacritics, Quranic marks and tatweel
+        **dict.fromkeys(range(0x0610, 0x061B)),
+        **dict.fromkeys(range(0x064B, 0x0660)),
+        0x0670: None,
+        **dict.fromkeys(range(0x06D6, 0x06EE)),
+        0x0640: None,
+    }
+)
+
+# common Egyptian words in their usual Arabizi spellings
+# fmt: off
+_ARABIZI_WORDS = {
+    "ana": "انا", "enta": "انت", "inta": "انت", "enty": "انتي", "enti": "انتي",
+    "e7na": "احنا", "howa": "هو", "heya": "هي",
+    "3ayez": "عايز", "3ayz": "عايز", "3aiz": "عايز", "3ayza": "عايزة",
+    "3awez": "عاوز", "3awz": "عاوز", "a3raf": "اعرف", "a3rf": "اعرف",
+    "ezay": "ازاي", "ezzay": "ازاي", "izay": "ازاي", "ezai": "ازاي",
+    "fein": "فين", "feen": "فين", "fen": "فين",
+    "emta": "امتى", "emteh": "امتى", "imta": "امتى",
+    "leh": "ليه", "leih": "ليه", "eh": "ايه", "eih": "ايه",
+    "msh": "مش", "mesh": "مش", "mish": "مش", "mosh": "مش",
+    "fe": "في", "fi": "في", "fy": "في", "mn": "من", "3ala": "على", "3la": "على",
+    "ma3": "مع", "ma3lesh": "معلش", "el": "ال", "il": "ال", "lw": "لو", "kam": "كام",
+    "momken": "ممكن", "mmkn": "ممكن", "mumkin": "ممكن",
+    "sama7t": "سمحت", "shokran": "شكرا", "shukran": "شكرا", "tamam": "تمام",
+    "7aga": "حاجة", "7aja": "حاجة", "ya3ni": "يعني", "y3ni": "يعني",
+    "keda": "كده", "kda": "كده", "delwa2ti": "دلوقتي", "dlw2ty": "دلوقتي",
+    "bokra": "بكرة", "bukra": "بكرة", "bkam": "بكام", "bekam": "بكام",
+    "flos": "فلوس", "feloos": "فلوس", "fulus": "فلوس", "se3r": "سعر", "si3r": "سعر",
+    "talab": "طلب", "tawsil": "توصيل", "tawseel": "توصيل", "sha7n": "شحن",
+    "estrga3": "استرجاع", "esterga3": "استرجاع", "7esab": "حساب", "7sab": "حساب",
+    "daf3": "دفع", "wesel": "وصل", "wasal": "وصل",
+    "hayewsal": "هيوصل", "haywsal": "هيوصل",
+}
+# fmt: on
+_ARABIZI_WORDS = {k: v.translate(_ARABIC_FOLD) for k, v in _ARABIZI_WORDS.items()}
+# listed words that are also English (or common abbreviations); alone they
+# don't make a query Arabizi
+_ARABIZI_AMBIGUOUS = {"ana", "eh", "el", "fe", "fen", "fi", "il", "mesh", "mn"}
+
+# letters of other Arabizi words, two-letter sounds first; short vowels inside
+# a word are unwritten ("7agz" is حجز), long ones ("ee", "oo") are letters
+_ARABIZI_LETTER_RE = re.compile(r"sh|kh|gh|th|dh|aa|ee|ei|oo|ou|.")
+_ARABIZI_SHORT_VOWELS = frozenset("aeiou")
+# fmt: off
+_ARABIZI_LETTERS = {
+    "sh": "ش", "kh": "خ", "gh": "غ", "th": "ث", "dh": "ذ",
+    "aa": "ا", "ee": "ي", "ei": "ي", "oo": "و", "ou": "و",
+    "2": "أ", "3": "ع", "5": "خ", "6": "ط", "7": "ح", "8": "غ", "9": "ق",
+    "a": "ا", "b": "ب", "c": "ك", "d": "د", "e": "", "f": "ف", "g": "ج",
+    "h": "ه", "i": "ي", "j": "ج", "k": "ك", "l": "ل", "m": "م", "n": "ن",
+    "o": "و", "p": "ب", "q": "ق", "r": "ر", "s": "س", "t": "ت", "u": "و",
+    "v": "ف", "w": "و", "x": "كس", "y": "ي", "z": "ز",
+}
+# fmt: on
+
+
+def _transliterate(word: str) -> str:
+    letters = _ARABIZI_LETTER_RE.findall(word)
+    # a word-initial vowel is written as an alef ("enta", "a3raf")
+    head = "ا" if letters[0][0] in "aeiou" else _ARABIZI_LETTERS[letters[0]]
+    middle = [c for c in letters[1:-1] if c not in _ARABIZI_SHORT_VOWELS]
+    tail = letters[1:][-1:]
+    spelled = head + "".join(_ARABIZI_LETTERS.get(c, c) for c in middle + tail)
+    # folded like Arabic-script input ("ta2keed" and "تأكيد" are both تاكيد)
+    return spelled.translate(_ARABIC_FOLD)
+
+
+def _known_arabizi(word: str) -> str | None:
+    if word in _ARABIZI_WORDS:
+        return _ARABIZI_WORDS[word]
+    if word[:2] in ("el", "il") and word[2:] in _ARABIZI_WORDS:
+        return "ال" + _ARABIZI_WORDS[word[2:]]
+    return None
+
+
+def _is_arabizi(words: list[str]) -> bool:
+    """Whether the query has a listed Arabizi word that isn't also English."""
+    return any(
+        word not in _ARABIZI_AMBIGUOUS and _known_arabizi(word) is not None
+        for word in words
+    )
+
+
+def _arabizi(word: str) -> str:
+    """`word` (of an Arabizi query) in Arabic script; anything else unchanged."""
+    if not word.isascii():
+        return word
+    known = _known_arabizi(word)
+    if known is not None:
+        return known
+    if (
+        len(word) >= ARABIZI_MIN_GUESS_CHARS
+        and _ARABIZI_RE.search(word)
+        and not _TIME_RE.match(word)
+    ):
+        return _transliterate(word)
+    return word
+
+
+def normalize_text(text: str) -> str:
+    """`normalize_query` without the LRU, for indexing document text."""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_ARABIC_FOLD)
+    words = _TOKEN_RE.findall(_ELONGATION_RE.sub(r"\1", text))
+    # English (and Arabic-script) queries keep their Latin words as written
+    if _is_arabizi(words):
+        words = [_arabizi(word) for word in words]
+    return _ARTICLE_RE.sub("ال", " ".join(words))
+
+
+_normalize_cached = lru_cache(maxsize=QUERY_CACHE_SIZE)(normalize_text)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Canonical form of an end-user query: NFKC, casefolded, Arabic letter
+    variants unified, diacritics and tatweel removed, elongations collapsed,
+    Arabizi words transliterated (in queries with a known Arabizi word) and
+    punctuation dropped.
+    """
+    if len(text) > QUERY_CACHE_MAX_CHARS:
+        return normalize_text(text)
+    return _normalize_cached(text)
+
+
+def query_cache_key(query: str, business_id: uuid.UUID | None = None) -> str:
+    """
+    Cache key of a query's normalised text: business-wide for answers, and
+    shared by every business (`business_id=None`) for query embeddings.
+    """
+    scope = "" if business_id is None else str(business_id)
+    return hashlib.blake2b(
+        f"{scope}:{normalize_query(query)}".encode(), digest_size=16
+    ).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Resumable voice-message uploads
+#
+# The client declares the clip size, then PUTs fixed-size chunks (any order,
+# retries allowed) which stream into a storage multipart upload as they
+# arrive. Upload state lives in Redis so any worker can take any chunk; the
+# client resumes by asking which chunks were received. Completing the upload
+# creates the VoiceMessage and queues it for the voice worker, once: the
+# upload remembers its message, so a retried completion returns the same one.
+# ---------------------------------------------------------------------------
+
+VOICE_CHUNK_SIZE = MIN_PART_SIZE
+VOICE_UPLOAD_TTL = 24 * 60 * 60
+VOICE_QUEUE_STREAM = "voice:transcribe"
+VOICE_QUEUE_MAXLEN = 100_000
+# spill chunk bodies to disk beyond this so memory stays flat per request
+CHUNK_SPOOL_SIZE = 1024 * 1024
+# longest a completion may hold its upload before another request can retry
+COMPLETE_LOCK_TTL_S = 60
+
+AUDIO_EXTENSIONS = {
+    "audio/webm": "webm",
+    "audio/ogg": "ogg",
+    "audio/mpeg": "mp3",
+    "audio/mp4": "m4a",
+    "audio/aac": "aac",
+    "audio/wav": "wav",
+    "audio/x-wav": "wav",
+}
+
+
+def _upload_key(upload_id: str) -> str:
+    return f"voice:upload:{upload_id}"
+
+
+def _parts_key(upload_id: str) -> str:
+    return f"voice:upload:{upload_id}:parts"
+
+
+def _complete_lock_key(upload_id: str) -> str:
+    return f"voice:upload:{upload_id}:completing"
+
+
+class UploadInProgressError(RuntimeError):
+    """Another request is completing the upload."""
+
+
+def plan_chunks(total_size: int, chunk_size: int = VOICE_CHUNK_SIZE) -> int:
+    """Number of chunks a clip of `total_size` bytes is split into."""
+    return max(1, math.ceil(total_size / chunk_size))
+
+
+def expected_chunk_size(
+    index: int, total_size: int, chunk_size: int = VOICE_CHUNK_SIZE
+) -> int:
+    """Every chunk is `chunk_size` bytes except the last, which holds the rest."""
+    total_chunks = plan_chunks(total_size, chunk_size)
+    if not 0 <= index < total_chunks:
+        raise ValueError(f"Chunk index must be between 0 and {total_chunks - 1}")
+    if index < total_chunks - 1:
+        return chunk_size
+    return total_size - chunk_size * (total_chunks - 1)
+
+
+async def _load_upload(redis: Redis, session: ChatSession, upload_id: str) -> dict:
+    state = await redis.hgetall(_upload_key(upload_id))
+    if not state or state["session_id"] != str(session.id):
+        raise LookupError("Upload not found or expired")
+    return state
+
+
+async def _status(redis: Redis, upload_id: str, state: dict) -> VoiceUploadStatus:
+    received = sorted(int(i) for i in await redis.hkeys(_parts_key(upload_id)))
+    total_chunks = int(state["total_chunks"])
+    return VoiceUploadStatus(
+        upload_id=upload_id,
+        chunk_size=int(state["chunk_size"]),
+        total_chunks=total_chunks,
+        received_chunks=received,
+        complete=len(received) == total_chunks,
+    )
+
+
+async def start_voice_upload(
+    redis: Redis,
+    storage: S3Storage | LocalStorage,
+    session: ChatSession,
+    data: VoiceUploadCreateSchema,
+) -> VoiceUploadStatus:
+    extension = AUDIO_EXTENSIONS.get(data.content_type)
+    if extension is None:
+        raise ValueError(f"Unsupported audio type: {data.content_type}")
+
+    upload_id = uuid.uuid4().hex
+    key = f"voice/{session.business_id}/{session.id}/{upload_id}.{extension}"
+    storage_upload_id = await storage.create_multipart_upload(key, data.content_type)
+
+    state = {
+        "session_id": str(session.id),
+        "business_id": str(session.business_id),
+        "key": key,
+        "storage_upload_id": storage_upload_id,
+        "content_type": data.content_type,
+        "total_size": data.total_size,
+        "chunk_size": VOICE_CHUNK_SIZE,
+        "total_chunks": plan_chunks(data.total_size),
+    }
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(_upload_key(upload_id), mapping=state)
+    pipe.expire(_upload_key(upload_id), VOICE_UPLOAD_TTL)
+    await pipe.execute()
+
+    logger.info("voice_upload_started", upload_id=upload_id, size=data.total_size)
+    return await _status(redis, upload_id, {k: str(v) for k, v in state.items()})
+
+
+async def get_voice_upload(
+    redis: Redis, session: ChatSession, upload_id: str
+) -> VoiceUploadStatus:
+    state = await _load_upload(redis, session, upload_id)
+    return await _status(redis, upload_id, state)
+
+
+async def upload_voice_chunk(
+    redis: Redis,
+    storage: S3Storage | LocalStorage,
+    session: ChatSession,
+    upload_id: str,
+    index: int,
+    body: AsyncIterator[bytes],
+) -> VoiceUploadStatus:
+    """
+    Stream one chunk into its storage part. Re-sending a chunk overwrites it,
+    so clients can simply retry whatever the status says is missing.
+    """
+    state = await _load_upload(redis, session, upload_id)
+    if "voice_message_id" in state:
+        raise ValueError("Upload already completed")
+    expected = expected_chunk_size(
+        index, int(state["total_size"]), int(state["chunk_size"])
+    )
+
+    with SpooledTemporaryFile(max_size=CHUNK_SPOOL_SIZE) as spool:
+        size = 0
+        async for data in body:
+            size += len(data)
+            if size > expected:
+                raise ValueError(f"Chunk {index} exceeds {expected} bytes")
+            spool.write(data)
+        if size != expected:
+            raise ValueError(f"Chunk {index} must be {expected} bytes, got {size}")
+        spool.seek(0)
+        etag = await storage.upload_part(
+            state["key"], state["storage_upload_id"], index + 1, spool, size
+        )
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(_parts_key(upload_id), str(index), etag)
+    pipe.expire(_parts_key(upload_id), VOICE_UPLOAD_TTL)
+    await pipe.execute()
+    return await _status(redis, upload_id, state)
+
+
+async def complete_voice_upload(
+    db: AsyncSession,
+    redis: Redis,
+    storage: S3Storage | LocalStorage,
+    session: ChatSession,
+    upload_id: str,
+) -> VoiceMessage:
+    """
+    Assemble the clip, create its VoiceMessage and queue it for transcription.
+    Completing an upload again returns the same message; raises
+    UploadInProgressError while another request is completing it.
+    """
+    state = await _load_upload(redis, session, upload_id)
+    if "voice_message_id" in state:
+        return await _completed_voice(db, state)
+    lock_key = _complete_lock_key(upload_id)
+    if not await redis.set(lock_key, "1", nx=True, ex=COMPLETE_LOCK_TTL_S):
+        raise UploadInProgressError("Upload is being completed; retry shortly")
+    try:
+        # a completion that finished while this one waited for the lock
+        state = await _load_upload(redis, session, upload_id)
+        if "voice_message_id" in state:
+            return await _completed_voice(db, state)
+        return await _complete(db, redis, storage, session, upload_id, state)
+    finally:
+        await redis.delete(lock_key)
+
+
+async def _completed_voice(db: AsyncSession, state: dict) -> VoiceMessage:
+    voice = await db.get(VoiceMessage, uuid.UUID(state["voice_message_id"]))
+    if voice is None:
+        raise LookupError("Upload not found or expired")
+    return voice
+
+
+async def _complete(
+    db: AsyncSession,
+    redis: Redis,
+    storage: S3Storage | LocalStorage,
+    session: ChatSession,
+    upload_id: str,
+    state: dict,
+) -> VoiceMessage:
+    parts = await redis.hgetall(_parts_key(upload_id))
+    total_chunks = int(state["total_chunks"])
+    missing = sorted(set(range(total_chunks)) - {int(i) for i in parts})
+    if missing:
+        raise ValueError(f"Missing chunks: {missing}")
+
+    # a retry after a failure past this point must not assemble it twice
+    if "assembled" not in state:
+        await storage.complete_multipart_upload(
+            state["key"],
+            state["storage_upload_id"],
+            sorted((int(i) + 1, etag) for i, etag in parts.items()),
+        )
+        await redis.hset(_upload_key(upload_id), "assembled", "1")
+
+    completed_at = datetime.now(timezone.utc)
+    voice = VoiceMessage(
+        session_id=session.id,
+        audio_file_url=storage.url(state["key"]),
+        sender_type=SenderType.USER,
+        created_at=completed_at,
+    )
+    db.add(voice)
+    await db.commit()
+
+    # the upload keeps its message until it expires, for repeated completions
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(_upload_key(upload_id), "voice_message_id", str(voice.id))
+    pipe.xadd(
+        VOICE_QUEUE_STREAM,
+        {
+            "voice_message_id": str(voice.id),
+            "audio_key": state["key"],
+            "completed_at": f"{completed_at.timestamp():.6f}",
+        },
+        maxlen=VOICE_QUEUE_MAXLEN,
+        approximate=True,
+    )
+    await pipe.execute()
+
+    logger.info(
+        "voice_upload_completed",
+        upload_id=upload_id,
+        voice_message_id=str(voice.id),
+        chunks=total_chunks,
+    )
+    return voice
+
+
+async def abort_voice_upload(
+    redis: Redis,
+    storage: S3Storage | LocalStorage,
+    session: ChatSession,
+    upload_id: str,
+) -> None:
+    state = await _load_upload(redis, session, upload_id)
+    if "assembled" in state:
+        raise ValueError("Upload already completed")
+    await storage.abort_multipart_upload(state["key"], state["storage_upload_id"])
+    await redis.delete(_upload_key(upload_id), _parts_key(upload_id))
+
+
+def voice_latency_ms(completed_at: str, now: float | None = None) -> float:
+    """Milliseconds since upload completion, from the queued timestamp."""
+    return ((now or time.time()) - float(completed_at)) * 1000
+
+
+# ---------------------------------------------------------------------------
+# Conversation history
+# ---------------------------------------------------------------------------
+
+
+def _history_filter(business_id: uuid.UUID, session_id: uuid.UUID | None) -> list:
+    clauses = [ChatMessage.business_id == business_id]
+    if session_id is not None:
+        clauses.append(ChatMessage.session_id == session_id)
+    return clauses
+
+
+async def list_history(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    session_id: uuid.UUID | None,
+    cursor: str | None,
+    limit: int,
+) -> dict:
+    return await keyset_page(
+        db,
+        select(ChatMessage).where(*_history_filter(business_id, session_id)),
+        ChatMessage.created_at,
+        ChatMessage.id,
+        cursor,
+        limit,
+    )
+
+
+def history_export(business_id: uuid.UUID, session_id: uuid.UUID | None) -> Select:
+    return (
+        select(*schema_columns(ChatMessage, ChatMessageResponse))
+        .where(*_history_filter(business_id, session_id))
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    )
+
+
+# ---------------------------------------------------------------------------
+# Live chat
+#
+# The widget opens a session with its business's API key, then end users and
+# employees exchange messages over the chat WebSocket (see rag.gateway). Each
+# message is saved with a short-lived session, never one held for the life
+# of the socket. While an employee is connected to a session it is marked as
+# taken over in Redis, so the bot stays quiet. Outside the business's
+# operating hours the bot answers with its auto reply, if one is enabled.
+#
+# Saved end-user messages are queued on MESSAGE_QUEUE_STREAM for the message
+# worker (emotion detection, in batches), off the reply's path.
+# ---------------------------------------------------------------------------
+
+TAKEOVER_KEY_PREFIX = "chat:takeover"
+TAKEOVER_TTL_S = 60 * 60
+MESSAGE_QUEUE_STREAM = "chat:postprocess"
+MESSAGE_QUEUE_MAXLEN = 1_000_000
+SESSION_TOKEN_BYTES = 32
+
+
+# delete the takeover only if it is still the leaving employee's
+_END_TAKEOVER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _takeover_key(session_id: uuid.UUID) -> str:
+    return f"{TAKEOVER_KEY_PREFIX}:{session_id}"
+
+
+async def start_chat_session(
+    db: AsyncSession, business_id: uuid.UUID, data: ChatSessionCreateSchema
+) -> ChatSession:
+    """
+    Open a chat session for a widget visitor. Visitors the business
+    identifies (`external_id`) keep one end user across sessions.
+    """
+    end_user = None
+    if data.external_id is not None:
+        end_user = await db.scalar(
+            select(EndUser).where(
+                EndUser.business_id == business_id,
+                EndUser.external_id == data.external_id,
+            )
+        )
+    if end_user is None:
+        end_user = EndUser(
+            business_id=business_id, external_id=data.external_id, name=data.name
+        )
+        db.add(end_user)
+        await db.flush()
+    session = ChatSession(
+        business_id=business_id,
+        end_user_id=end_user.id,
+        session_token=secrets.token_urlsafe(SESSION_TOKEN_BYTES),
+    )
+    db.add(session)
+    await db.commit()
+    return session
+
+
+async def find_active_session(
+    db: AsyncSession, session_token: str
+) -> ChatSession | None:
+    session = await db.scalar(
+        select(ChatSession).where(ChatSession.session_token == session_token)
+    )
+    if session is None or session.status != ChatSessionStatus.ACTIVE:
+        return None
+    return session
+
+
+async def find_takeover_session(
+    db: AsyncSession, access_token: str, session_id: uuid.UUID
+) -> tuple[Employee, ChatSession] | None:
+    """The employee behind an access token and their business's active session."""
+    try:
+        employee_id = uuid.UUID(decode_token(access_token, audience="access")["sub"])
+    except Exception:
+        return None
+    employee = await db.get(Employee, employee_id)
+    session = await db.get(ChatSession, session_id)
+    if (
+        employee is None
+        or not employee.is_active
+        or session is None
+        or session.business_id != employee.business_id
+        or session.status != ChatSessionStatus.ACTIVE
+    ):
+        return None
+    return employee, session
+
+
+async def enqueue_postprocessing(redis: Redis, message: ChatMessage) -> None:
+    await redis.xadd(
+        MESSAGE_QUEUE_STREAM,
+        {
+            "message_id": str(message.id),
+            "created_at": f"{message.created_at.timestamp():.6f}",
+        },
+        maxlen=MESSAGE_QUEUE_MAXLEN,
+        approximate=True,
+    )
+
+
+async def save_chat_message(
+    db: AsyncSession,
+    session_id: uuid.UUID,
+    business_id: uuid.UUID,
+    sender_type: SenderType,
+    content: str,
+    redis: Redis | None = None,
+    response_time_ms: int | None = None,
+) -> ChatMessage:
+    """
+    Store a chat message, count it in the analytics rollups and queue user
+    messages for post-processing. Pass `response_time_ms` for bot replies.
+    """
+    message = ChatMessage(
+        session_id=session_id,
+        business_id=business_id,
+        sender_type=sender_type,
+        content=content,
+        response_time_ms=response_time_ms,
+    )
+    db.add(message)
+    await db.commit()
+    if redis is None:
+        return message
+    # analytics rollups are best-effort; never fail the message for them
+    try:
+        await record_message(
+            redis, business_id, response_time_ms, at=message.created_at
+        )
+    except Exception as e:
+        logger.warning("analytics_record_message_failed", error=str(e))
+    if sender_type == SenderType.USER:
+        try:
+            await enqueue_postprocessing(redis, message)
+        except Exception as e:  # the message stands; it just goes unlabelled
+            logger.warning("chat_postprocess_enqueue_failed", error=str(e))
+    return message
+
+
+def auto_reply_for(config: ConfigSnapshot, at: datetime | None = None) -> str | None:
+    """The business's auto reply if it is enabled and `at` is out of hours."""
+    if not config.auto_reply_enabled or not config.auto_reply_message:
+        return None
+    return None if config.is_open(at) else config.auto_reply_message
+
+
+def chat_event(event_type: str, **fields) -> dict:
+    """A gateway event; `ts` lets clients (and benchmarks) measure delivery."""
+    return {"type": event_type, "ts": time.time(), **fields}
+
+
+def message_event(message: ChatMessage, **fields) -> dict:
+    return chat_event(
+        "message",
+        message=ChatMessageResponse.model_validate(message).model_dump(mode="json"),
+        **fields,
+    )
+
+
+async def start_takeover(
+    redis: Redis, session_id: uuid.UUID, employee_id: uuid.UUID
+) -> None:
+    """Mark the session as handled by an employee; refreshed on each message."""
+    await redis.set(_takeover_key(session_id), str(employee_id), ex=TAKEOVER_TTL_S)
+
+
+async def end_takeover(
+    redis: Redis, session_id: uuid.UUID, employee_id: uuid.UUID
+) -> bool:
+    """
+    Hand the session back to the bot, unless another employee has taken it
+    over since; True if it was handed back.
+    """
+    ended = await redis.eval(
+        _END_TAKEOVER_SCRIPT, 1, _takeover_key(session_id), str(employee_id)
+    )
+    return bool(ended)
+
+
+async def taken_over_by(redis: Redis, session_id: uuid.UUID) -> uuid.UUID | None:
+    """The employee handling the session, or None if the bot is."""
+    employee_id = await redis.get(_takeover_key(session_id))
+    return uuid.UUID(employee_id) if employee_id else None
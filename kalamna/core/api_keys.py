@@ -0,0 +1,373 @@
+"""
+API-key authentication
+Verifies widget API keys from the `credentials` table on the request hot path
+
+Keys look like `klm_<prefix>_<secret>`. The prefix is stored in clear behind a
+unique index, so a lookup is a single index probe, and the key is stored as an
+HMAC-SHA256 digest under API_KEY_SECRET. The secret part carries 256 random
+bits, so a keyed digest needs no slow hash: verifying costs microseconds
+instead of the tens of milliseconds argon2 takes.
+
+Verified keys are cached in-process (`LOCAL_CACHE_TTL_S`) and in Redis
+(`REDIS_CACHE_TTL_S`). Revoking a key deletes its Redis entry, leaves a
+`revoked:` tombstone in its place and publishes its digest on
+`REVOCATION_CHANNEL`; every worker's listener evicts it from the local
+cache. A request that read the key from the database before the revoke
+committed can't put it back: the Redis write is skipped while the tombstone
+exists, and the local cache refuses entries older than the key's eviction.
+`last_used_at` is buffered per process and written by one UPDATE per flush
+instead of one per request.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import DateTime, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.business.models import Credential
+from kalamna.core.config import get_settings
+from kalamna.core.db import AsyncSessionLocal
+from kalamna.core.redis import get_redis, get_redis_or_none
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+KEY_SCHEME = "klm"
+PREFIX_BYTES = 6  # 12 hex chars
+SECRET_BYTES = 32
+
+REDIS_KEY_PREFIX = "api_key"
+REVOKED_KEY_PREFIX = "api_key_revoked"
+REVOCATION_CHANNEL = "api_key:revoked"
+# bounds staleness if a revocation message is missed (e.g. Redis restart)
+LOCAL_CACHE_TTL_S = 30
+LOCAL_CACHE_SIZE = 10_000
+REDIS_CACHE_TTL_S = 300
+LAST_USED_FLUSH_INTERVAL_S = 30
+LISTENER_RETRY_S = 5
+# outlives any database read that could still try to cache the revoked key
+REVOKED_TTL_S = REDIS_CACHE_TTL_S
+
+# cache the principal unless the key was revoked meanwhile; 0 if it was
+_CACHE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+def _hmac_key() -> bytes:
+    settings = get_settings()
+    secret = settings.api_key_secret or settings.jwt_secret
+    if not secret:
+        raise RuntimeError("API_KEY_SECRET (or JWT_SECRET) must be set")
+    return secret.encode()
+
+
+@dataclass(frozen=True)
+class ApiKeyPrincipal:
+    credential_id: uuid.UUID
+    business_id: uuid.UUID
+
+
+def generate_api_key() -> tuple[str, str]:
+    """Return a new `(api_key, prefix)`; the key is shown to its owner once."""
+    prefix = secrets.token_hex(PREFIX_BYTES)
+    return f"{KEY_SCHEME}_{prefix}_{secrets.token_urlsafe(SECRET_BYTES)}", prefix
+
+
+def parse_prefix(api_key: str) -> str | None:
+    # the urlsafe secret may itself contain "_", so split at most twice
+    scheme, _, rest = api_key.partition("_")
+    prefix, _, secret = rest.partition("_")
+    if scheme != KEY_SCHEME or len(prefix) != PREFIX_BYTES * 2 or not secret:
+        return None
+    return prefix
+
+
+def key_digest(api_key: str) -> str:
+    return hmac.new(_hmac_key(), api_key.encode(), hashlib.sha256).hexdigest()
+
+
+def redis_key(digest: str) -> str:
+    return f"{REDIS_KEY_PREFIX}:{digest}"
+
+
+def revoked_key(digest: str) -> str:
+    return f"{REVOKED_KEY_PREFIX}:{digest}"
+
+
+class LocalKeyCache:
+    """
+    Bounded LRU of verified key digests with a per-entry TTL. It remembers
+    when each key was last evicted, so a lookup that started before then
+    can't cache the key again.
+    """
+
+    def __init__(self, maxsize: int = LOCAL_CACHE_SIZE, ttl: float = LOCAL_CACHE_TTL_S):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, ApiKeyPrincipal]] = OrderedDict()
+        self._evicted: OrderedDict[str, float] = OrderedDict()
+        self._cleared_at = 0.0
+
+    def get(self, digest: str) -> ApiKeyPrincipal | None:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        expires, principal = entry
+        if expires < time.monotonic():
+            del self._entries[digest]
+            return None
+        self._entries.move_to_end(digest)
+        return principal
+
+    def set(
+        self, digest: str, principal: ApiKeyPrincipal, since: float | None = None
+    ) -> bool:
+        """
+        Cache `principal`, unless the key was evicted at or after `since`
+        (the `time.monotonic()` its lookup started at). True if cached.
+        """
+        if since is not None and (
+            since <= self._cleared_at or since <= self._evicted.get(digest, -1.0)
+        ):
+            return False
+        self._entries[digest] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return True
+
+    def evict(self, digest: str) -> None:
+        self._entries.pop(digest, None)
+        self._evicted[digest] = time.monotonic()
+        self._evicted.move_to_end(digest)
+        while len(self._evicted) > self.maxsize:
+            # forgetting the oldest eviction is as if everything was evicted then
+            _, evicted_at = self._evicted.popitem(last=False)
+            self._cleared_at = max(self._cleared_at, evicted_at)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._cleared_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LastUsedBuffer:
+    """
+    Per-process write-behind buffer for `Credential.last_used_at`. Repeated
+    uses of a key between flushes collapse to one row in the next UPDATE.
+    """
+
+    def __init__(self):
+        self._pending: dict[uuid.UUID, datetime] = {}
+
+    def touch(self, credential_id: uuid.UUID, at: datetime | None = None) -> None:
+        at = at or datetime.now(timezone.utc)
+        previous = self._pending.get(credential_id)
+        if previous is None or at > previous:
+            self._pending[credential_id] = at
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def drain(self) -> dict[uuid.UUID, datetime]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: dict[uuid.UUID, datetime]) -> None:
+        """Put back a drained batch whose write failed."""
+        for credential_id, at in pending.items():
+            self.touch(credential_id, at)
+
+
+local_cache = LocalKeyCache()
+last_used = LastUsedBuffer()
+
+
+def last_used_statement(pending: dict[uuid.UUID, datetime]):
+    """One UPDATE ... FROM (VALUES ...) for a whole batch; never moves back."""
+    used = values(
+        column("id", UUID(as_uuid=True)),
+        column("used_at", DateTime(timezone=True)),
+        name="used",
+    ).data(list(pending.items()))
+    return (
+        update(Credential)
+        .where(Credential.id == used.c.id)
+        .where(
+            (Credential.last_used_at.is_(None))
+            | (Credential.last_used_at < used.c.used_at)
+        )
+        .values(last_used_at=used.c.used_at)
+    )
+
+
+async def flush_last_used(db: AsyncSession, buffer: LastUsedBuffer = last_used) -> int:
+    """Write the buffered timestamps and commit. Returns the keys written."""
+    pending = buffer.drain()
+    if not pending:
+        return 0
+    try:
+        await db.execute(last_used_statement(pending))
+        await db.commit()
+    except Exception:
+        buffer.restore(pending)
+        raise
+    return len(pending)
+
+
+# ---------------------------------------------------------------------------
+# Verification (hot path)
+# ---------------------------------------------------------------------------
+
+
+async def _from_redis(redis: Redis, digest: str) -> ApiKeyPrincipal | None:
+    try:
+        cached = await redis.get(redis_key(digest))
+    except Exception as e:  # cache only; fall through to the database
+        logger.warning("api_key_cache_read_failed", error=str(e))
+        return None
+    if not cached:
+        return None
+    credential_id, business_id = cached.split(":")
+    return ApiKeyPrincipal(uuid.UUID(credential_id), uuid.UUID(business_id))
+
+
+async def _to_redis(redis: Redis, digest: str, principal: ApiKeyPrincipal) -> bool:
+    """Cache the principal in Redis; False if the key has been revoked."""
+    try:
+        written = await redis.eval(
+            _CACHE_SCRIPT,
+            2,
+            redis_key(digest),
+            revoked_key(digest),
+            f"{principal.credential_id}:{principal.business_id}",
+            REDIS_CACHE_TTL_S,
+        )
+    except Exception as e:
+        logger.warning("api_key_cache_write_failed", error=str(e))
+        return True
+    return bool(written)
+
+
+async def _from_db(
+    db: AsyncSession, prefix: str, digest: str
+) -> ApiKeyPrincipal | None:
+    row = (
+        await db.execute(
+            select(
+                Credential.id, Credential.business_id, Credential.api_key_hashed
+            ).where(
+                Credential.prefix == prefix,
+                Credential.is_active.is_(True),
+                Credential.revoked_at.is_(None),
+            )
+        )
+    ).first()
+    if row is None or not hmac.compare_digest(row.api_key_hashed, digest):
+        return None
+    return ApiKeyPrincipal(row.id, row.business_id)
+
+
+async def authenticate_api_key(
+    db: AsyncSession, api_key: str, redis: Redis | None = None
+) -> ApiKeyPrincipal | None:
+    """
+    Resolve an API key to its credential and business, or None if the key is
+    malformed, unknown or revoked. Checks the local cache, then Redis, then
+    the database, filling the caches on the way back.
+    """
+    prefix = parse_prefix(api_key)
+    if prefix is None:
+        return None
+    digest = key_digest(api_key)
+
+    principal = local_cache.get(digest)
+    if principal is None:
+        started = time.monotonic()
+        redis = redis or await get_redis_or_none()
+        if redis is not None:
+            principal = await _from_redis(redis, digest)
+        if principal is None:
+            principal = await _from_db(db, prefix, digest)
+            if principal is None:
+                return None
+            # revoked after our read: the tombstone says so, don't cache it
+            if redis is not None and not await _to_redis(redis, digest, principal):
+                return None
+        local_cache.set(digest, principal, since=started)
+
+    last_used.touch(principal.credential_id)
+    return principal
+
+
+# ---------------------------------------------------------------------------
+# Revocation and background tasks
+# ---------------------------------------------------------------------------
+
+
+async def invalidate_api_key(redis: Redis | None, digest: str) -> None:
+    """
+    Drop a key from every cache layer, in this process and all others.
+    Called after the revoke commits; a Redis failure is logged, and other
+    workers then stop accepting the key within the cache TTLs.
+    """
+    local_cache.evict(digest)
+    if redis is None:
+        return
+    try:
+        pipe = redis.pipeline(transaction=True)
+        pipe.set(revoked_key(digest), 1, ex=REVOKED_TTL_S)
+        pipe.delete(redis_key(digest))
+        pipe.publish(REVOCATION_CHANNEL, digest)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("api_key_invalidate_failed", error=str(e))
+
+
+async def run_revocation_listener() -> None:
+    """Evict revoked keys published by other processes; runs until cancelled."""
+    while True:
+        try:
+            redis = await get_redis()
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # revocations may have been missed while unsubscribed
+                local_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        local_cache.evict(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("api_key_listener_error", error=str(e))
+        await asyncio.sleep(LISTENER_RETRY_S)
+
+
+async def run_last_used_flusher(
+    interval: float = LAST_USED_FLUSH_INTERVAL_S,
+) -> None:
+    """Flush `last_used_at` every `interval` seconds; runs until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                await flush_last_used(db)
+        except Exception:
+            logger.exception("api_key_last_used_flush_failed")
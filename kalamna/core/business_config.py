@@ -0,0 +1,305 @@
+"""
+Business configuration cache
+Per-worker immutable snapshots of each business's chatbot settings
+
+Every chat turn needs its business's `Configuration` (bot name, tone, auto
+reply, operating hours). Each worker keeps a frozen `ConfigSnapshot` per
+business, so after the first turn the hot path reads it with no network I/O.
+
+Snapshots are versioned by `Configuration.version`. Saving a configuration
+commits the new version, then writes the snapshot to Redis and publishes
+`<business_id>:<version>` on `CHANGE_CHANNEL` in one script that refuses to
+replace a newer version. Each worker's listener reloads a snapshot it holds
+when a newer version is announced. As with API keys, the listener drops the
+whole local cache when it (re)subscribes, and entries older than
+`LOCAL_MAX_AGE_S` are reloaded in case a message was missed.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import time as dt_time
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+import orjson
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.business.models import BotTone, Configuration
+from kalamna.core.redis import get_redis, get_redis_or_none
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+REDIS_KEY_PREFIX = "business_config"
+CHANGE_CHANNEL = "business_config:changed"
+REDIS_TTL_S = 24 * 60 * 60
+LOCAL_MAX_AGE_S = 300
+LISTENER_RETRY_S = 5
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# set the snapshot only if it is newer than the stored one, and announce it
+_STORE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if ARGV[4] == '1' then
+    redis.call('PUBLISH', ARGV[5], ARGV[6])
+end
+return 1
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    business_id: uuid.UUID
+    version: int  # 0 until the business first saves its settings
+    bot_name: str = "Kalamna"
+    tone: BotTone = BotTone.FRIENDLY
+    auto_reply_enabled: bool = False
+    auto_reply_message: str | None = None
+    # (weekday 0-6, opens, closes); empty means always open
+    operating_hours: tuple[tuple[int, dt_time, dt_time], ...] = ()
+    timezone: str = "Africa/Cairo"
+
+    @classmethod
+    def from_dict(cls, business_id: uuid.UUID, data: dict) -> "ConfigSnapshot":
+        """From `as_dict()` output or the matching `Configuration` columns."""
+        return cls(
+            business_id=business_id,
+            version=data["version"],
+            bot_name=data["bot_name"],
+            tone=BotTone(data["tone"]),
+            auto_reply_enabled=data["auto_reply_enabled"],
+            auto_reply_message=data["auto_reply_message"],
+            operating_hours=tuple(
+                sorted(
+                    (
+                        WEEKDAYS.index(day),
+                        dt_time.fromisoformat(opens),
+                        dt_time.fromisoformat(closes),
+                    )
+                    for day, (opens, closes) in data["operating_hours"].items()
+                )
+            ),
+            timezone=data["timezone"],
+        )
+
+    @classmethod
+    def from_row(cls, row: Configuration) -> "ConfigSnapshot":
+        return cls.from_dict(
+            row.business_id,
+            {
+                "version": row.version,
+                "bot_name": row.bot_name,
+                "tone": row.tone,
+                "auto_reply_enabled": row.auto_reply_enabled,
+                "auto_reply_message": row.auto_reply_message,
+                "operating_hours": row.operating_hours,
+                "timezone": row.timezone,
+            },
+        )
+
+    def as_dict(self) -> dict:
+        """The settings in the API's (and the database's) shape."""
+        return {
+            "version": self.version,
+            "bot_name": self.bot_name,
+            "tone": self.tone.value,
+            "auto_reply_enabled": self.auto_reply_enabled,
+            "auto_reply_message": self.auto_reply_message,
+            "operating_hours": {
+                WEEKDAYS[day]: [opens.strftime("%H:%M"), closes.strftime("%H:%M")]
+                for day, opens, closes in self.operating_hours
+            },
+            "timezone": self.timezone,
+        }
+
+    def to_json(self) -> bytes:
+        return orjson.dumps({"business_id": str(self.business_id), **self.as_dict()})
+
+    @classmethod
+    def from_json(cls, data: str | bytes) -> "ConfigSnapshot":
+        raw = orjson.loads(data)
+        return cls.from_dict(uuid.UUID(raw["business_id"]), raw)
+
+    def is_open(self, at: datetime | None = None) -> bool:
+        """Whether `at` (default: now) falls in the business's operating hours."""
+        if not self.operating_hours:
+            return True
+        local = (at or datetime.now(dt_timezone.utc)).astimezone(
+            ZoneInfo(self.timezone)
+        )
+        now, today = local.time(), local.weekday()
+        yesterday = (today - 1) % 7
+        for day, opens, closes in self.operating_hours:
+            if opens < closes:
+                if day == today and opens <= now < closes:
+                    return True
+            # overnight hours, e.g. 20:00-02:00, spill into the next day
+            elif (day == today and now >= opens) or (day == yesterday and now < closes):
+                return True
+        return False
+
+
+class LocalConfigCache:
+    """Snapshots by business id; an older version never replaces a newer one."""
+
+    def __init__(self, max_age: float = LOCAL_MAX_AGE_S):
+        self.max_age = max_age
+        self._entries: dict[uuid.UUID, tuple[float, ConfigSnapshot]] = {}
+
+    def get(self, business_id: uuid.UUID) -> ConfigSnapshot | None:
+        entry = self._entries.get(business_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def install(self, snapshot: ConfigSnapshot) -> ConfigSnapshot:
+        """Keep `snapshot` unless a newer version is cached; return the kept one."""
+        entry = self._entries.get(snapshot.business_id)
+        if entry is not None and entry[1].version > snapshot.version:
+            return entry[1]
+        self._entries[snapshot.business_id] = (
+            time.monotonic() + self.max_age,
+            snapshot,
+        )
+        return snapshot
+
+    def version(self, business_id: uuid.UUID) -> int | None:
+        entry = self._entries.get(business_id)
+        return entry[1].version if entry else None
+
+    def evict(self, business_id: uuid.UUID) -> None:
+        self._entries.pop(business_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+local_configs = LocalConfigCache()
+
+
+def redis_key(business_id: uuid.UUID) -> str:
+    return f"{REDIS_KEY_PREFIX}:{business_id}"
+
+
+async def store_snapshot(
+    redis: Redis, snapshot: ConfigSnapshot, announce: bool = True
+) -> bool:
+    """Write `snapshot` to Redis unless it holds a newer one; True if written."""
+    written = await redis.eval(
+        _STORE_SCRIPT,
+        1,
+        redis_key(snapshot.business_id),
+        snapshot.version,
+        snapshot.to_json(),
+        REDIS_TTL_S,
+        "1" if announce else "0",
+        CHANGE_CHANNEL,
+        f"{snapshot.business_id}:{snapshot.version}",
+    )
+    return bool(written)
+
+
+async def _from_redis(redis: Redis, business_id: uuid.UUID) -> ConfigSnapshot | None:
+    try:
+        data = await redis.hget(redis_key(business_id), "data")
+    except Exception as e:  # cache only; fall through to the database
+        logger.warning("business_config_cache_read_failed", error=str(e))
+        return None
+    return ConfigSnapshot.from_json(data) if data else None
+
+
+async def _from_db(db: AsyncSession, business_id: uuid.UUID) -> ConfigSnapshot:
+    row = await db.get(Configuration, business_id)
+    return ConfigSnapshot.from_row(row) if row else ConfigSnapshot(business_id, 0)
+
+
+def cached_business_config(business_id: uuid.UUID) -> ConfigSnapshot | None:
+    """The worker's snapshot for a business, or None; never does I/O."""
+    return local_configs.get(business_id)
+
+
+async def get_business_config(
+    db: AsyncSession, business_id: uuid.UUID, redis: Redis | None = None
+) -> ConfigSnapshot:
+    """
+    The business's configuration snapshot: from this worker's cache when it
+    has one, else from Redis, else from the database (filling Redis).
+    """
+    snapshot = local_configs.get(business_id)
+    if snapshot is not None:
+        return snapshot
+    redis = redis or await get_redis_or_none()
+    if redis is not None:
+        snapshot = await _from_redis(redis, business_id)
+    if snapshot is None:
+        snapshot = await _from_db(db, business_id)
+        if redis is not None and snapshot.version:
+            try:
+                await store_snapshot(redis, snapshot, announce=False)
+            except Exception as e:
+                logger.warning("business_config_cache_write_failed", error=str(e))
+    snapshot = local_configs.install(snapshot)
+    if redis is None:
+        return snapshot
+    # a save announced before the install found nothing here to reload, so
+    # the listener skipped it; pick it up from Redis now
+    newer = await _from_redis(redis, business_id)
+    if newer is not None and newer.version > snapshot.version:
+        snapshot = local_configs.install(newer)
+    return snapshot
+
+
+async def publish_business_config(
+    redis: Redis | None, snapshot: ConfigSnapshot
+) -> None:
+    """Install a just-committed snapshot here and announce it to every worker."""
+    local_configs.install(snapshot)
+    if redis is None:
+        return
+    await store_snapshot(redis, snapshot)
+
+
+async def _apply_change(redis: Redis, message: str) -> None:
+    business_id, _, version = message.rpartition(":")
+    business_id = uuid.UUID(business_id)
+    cached = local_configs.version(business_id)
+    # businesses this worker never served are loaded on first use instead
+    if cached is None or cached >= int(version):
+        return
+    snapshot = await _from_redis(redis, business_id)
+    if snapshot is None:
+        local_configs.evict(business_id)
+    else:
+        local_configs.install(snapshot)
+
+
+async def run_config_listener() -> None:
+    """Reload snapshots other processes announce as changed; runs until cancelled."""
+    while True:
+        try:
+            redis = await get_redis()
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(CHANGE_CHANNEL)
+                # changes may have been missed while unsubscribed
+                local_configs.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await _apply_change(redis, message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("business_config_listener_error", error=str(e))
+        await asyncio.sleep(LISTENER_RETRY_S)
@@ -1,4 +1,109 @@
+"""
+Application settings
+One typed settings object, read from the environment and `.env` once
+
+Every module takes its configuration from `get_settings()` instead of calling
+`os.getenv` / `load_dotenv` itself. Field names map to the existing
+environment variables case-insensitively (`database_url` <- `DATABASE_URL`).
+"""
+
+from functools import lru_cache
+from typing import Literal
+
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
 # Re-export logging setup from utils for backwards compatibility
 from kalamna.utils.logger import setup_logging
 
-__all__ = ["setup_logging"]
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    )
+
+    # database; database_url and jwt_secret are checked by core.db and
+    # core.security, so importing models alone needs no environment
+    database_url: str | None = None
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_recycle_s: int = 1800
+    db_warmup_connections: int = 2
+
+    # auth
+    jwt_secret: str | None = None
+    jwt_algorithm: str = "HS256"
+    # HMAC key for API-key digests; falls back to JWT_SECRET when unset.
+    # Changing it invalidates every issued API key.
+    api_key_secret: str | None = None
+
+    # redis
+    redis_url: str = "redis://localhost:6379/0"
+
+    # mail; sending is disabled while EMAIL_HOST is unset
+    email_host: str | None = None
+    email_port: int = 465
+    email_use_tls: bool = False
+    email_use_ssl: bool = False
+    email_host_user: str | None = None
+    email_host_password: str | None = None
+
+    # storage
+    storage_backend: Literal["s3", "local"] = "s3"
+    s3_bucket: str = "kalamna"
+    s3_endpoint_url: str | None = None  # set for MinIO
+    s3_region: str = "us-east-1"
+    local_storage_dir: str = ".storage"
+
+    # models
+    embedder: Literal["openai", "hash"] = "openai"
+    embedding_model: str = "text-embedding-3-small"
+    openai_api_key: str | None = None
+    openai_base_url: str = "https://api.openai.com/v1"
+    voice_engine: str = "stub"
+    emotion_classifier: str = "stub"
+    llm: Literal["openai", "fake"] = "openai"
+    llm_model: str = "gpt-4o"
+    # cheaper model used while the main one is failing or slow; empty = none
+    llm_fallback_model: str | None = "gpt-4o-mini"
+    llm_timeout_s: float = 20.0
+    # memory-mapped vector snapshots of hot businesses; unset = pgvector only
+    vector_snapshot_dir: str | None = None
+    vector_snapshot_dtype: Literal["float16", "int8"] = "int8"
+
+    # serving
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: int = Field(default=1, ge=1)
+    graceful_timeout_s: int = 30
+    keepalive_timeout_s: int = 5
+    # proxies whose X-Forwarded-For/-Proto are trusted (comma-separated IPs or
+    # CIDRs, "*" = any); set to the load balancer's addresses per deployment
+    forwarded_allow_ips: str = "127.0.0.1"
+    # open pool connections and load lazy state before taking traffic
+    warmup: bool = True
+    # open chat WebSockets per worker; more are refused with close code 1013
+    ws_max_connections: int = 10_000
+
+    @field_validator(
+        "api_key_secret", "s3_endpoint_url", "vector_snapshot_dir", mode="before"
+    )
+    @classmethod
+    def _blank_as_unset(cls, value):
+        # `KEY=` (or spaces) in .env means "not set", not an empty secret
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @property
+    def mail_enabled(self) -> bool:
+        return bool(self.email_host and self.email_host_user)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+__all__ = ["Settings", "get_settings", "setup_logging"]
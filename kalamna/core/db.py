@@ -1,21 +1,101 @@
-import os
-from typing import AsyncGenerator
+"""
+Database engine and sessions
+The async engine, the session factory and per-request query statistics
 
-from dotenv import load_dotenv
+Every statement run on `engine` is timed by cursor event hooks and added to
+each QueryStats opened with `track_queries()` in the current context. The
+log_requests middleware opens one per request, so the request log carries
+its query count, total DB time and slowest statement.
+"""
+
+import time
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-load_dotenv()
+from kalamna.core.config import get_settings
+
+# maps every model, so relationships resolve in any process using the ORM
+from kalamna.db import models  # noqa: F401
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
+settings = get_settings()
+if not settings.database_url:
     raise RuntimeError("DATABASE_URL is not set")
 
 engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
+    settings.database_url,
+    echo=settings.db_echo,
     pool_pre_ping=True,
+    # reuse the most recent connection: its prepared statements are warm,
+    # and surplus connections go idle and get recycled
+    pool_use_lifo=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle_s,
+)
+
+SLOW_SQL_PREVIEW_CHARS = 200
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_sql: str | None = None
+    statements: list[str] = field(default_factory=list)
+
+    def record(self, statement: str, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.statements.append(statement)
+        if ms >= self.slowest_ms:
+            self.slowest_ms = ms
+            self.slowest_sql = statement
+
+    def log_fields(self) -> dict:
+        fields = {"db_queries": self.count, "db_ms": round(self.total_ms, 2)}
+        if self.slowest_sql is not None:
+            fields["db_slowest_ms"] = round(self.slowest_ms, 2)
+            fields["db_slowest_sql"] = " ".join(self.slowest_sql.split())[
+                :SLOW_SQL_PREVIEW_CHARS
+            ]
+        return fields
+
+
+# a tuple, so a query budget around a request sees the request's queries too
+_active_stats: ContextVar[tuple[QueryStats, ...]] = ContextVar(
+    "active_query_stats", default=()
 )
 
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the statements run in this context (and tasks started in it)."""
+    stats = QueryStats()
+    token = _active_stats.set((*_active_stats.get(), stats))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+    for stats in _active_stats.get():
+        stats.record(statement, ms)
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -26,3 +106,18 @@ AsyncSessionLocal = async_sessionmaker(
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def warm_up_pool(connections: int) -> None:
+    """Open `connections` pooled connections up front (run at startup)."""
+    held = [await engine.connect() for _ in range(connections)]
+    try:
+        for conn in held:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in held:
+            await conn.close()
+
+
+async def close_db() -> None:
+    await engine.dispose()
@@ -1 +1,90 @@
+"""
+Shared FastAPI dependencies
+"""
 
+import uuid
+
+from fastapi import Depends, Header, HTTPException, Security, status
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.rag.models import ChatSession
+from kalamna.apps.rag.services import find_active_session
+from kalamna.core.api_keys import ApiKeyPrincipal, authenticate_api_key
+from kalamna.core.db import get_db
+from kalamna.core.security import decode_token
+
+bearer_scheme = HTTPBearer(auto_error=False)
+api_key_scheme = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+async def get_current_employee(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> Employee:
+    """
+    Resolve the employee behind the bearer access token.
+    Raises 401 for a missing/invalid token or an inactive employee.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        payload = decode_token(credentials.credentials, audience="access")
+        employee_id = uuid.UUID(payload["sub"])
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        ) from e
+
+    employee = await db.get(Employee, employee_id)
+    if employee is None or not employee.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Employee not found or inactive",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return employee
+
+
+async def get_chat_session(
+    x_session_token: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+) -> ChatSession:
+    """
+    Resolve the end-user chat session from the `X-Session-Token` header
+    sent by the widget. Raises 401 for an unknown or closed session.
+    """
+    session = None
+    if x_session_token:
+        session = await find_active_session(db, x_session_token)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or closed chat session",
+        )
+    return session
+
+
+async def get_api_key_principal(
+    api_key: str | None = Security(api_key_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> ApiKeyPrincipal:
+    """
+    Resolve the business behind the widget's `X-API-Key` header.
+    Raises 401 for a missing, unknown or revoked key.
+    """
+    principal = await authenticate_api_key(db, api_key) if api_key else None
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or revoked API key",
+        )
+    return principal
@@ -0,0 +1,94 @@
+"""
+Application lifespan
+Opens shared clients once per worker process and closes them on shutdown
+
+Startup also runs optional warm-up (`WARMUP=true`), paying the one-off costs
+that would otherwise land on the first requests: ORM mapper configuration,
+database connections and dialect setup, the password-hash backend and mail
+templates.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI
+from sqlalchemy.orm import configure_mappers
+
+from kalamna.apps.rag.gateway import gateway
+from kalamna.core.api_keys import (
+    flush_last_used,
+    run_last_used_flusher,
+    run_revocation_listener,
+)
+from kalamna.core.business_config import run_config_listener
+from kalamna.core.config import get_settings
+from kalamna.core.db import AsyncSessionLocal, close_db, warm_up_pool
+from kalamna.core.redis import close_redis, init_redis
+from kalamna.core.security import pwd_context
+from kalamna.rag_infra.embedder import close_embedder, get_embedder
+from kalamna.rag_infra.llm import close_llm
+from kalamna.utils.logger import get_logger
+from kalamna.utils.mailer import env as mail_templates
+from kalamna.utils.mailer import get_mail_client
+
+logger = get_logger()
+
+
+async def warm_up() -> None:
+    settings = get_settings()
+    configure_mappers()
+    # load the argon2 backend without paying for a full hash
+    pwd_context.handler().get_backend()
+    mail_templates.get_template("mail.html")
+    try:
+        await warm_up_pool(settings.db_warmup_connections)
+    except Exception as e:  # the pool reconnects on demand; don't block boot
+        logger.warning("db_warmup_failed", error=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    start = time.perf_counter()
+
+    get_embedder()
+    if settings.mail_enabled:
+        get_mail_client()
+    try:
+        await init_redis()
+    except RuntimeError as e:  # get_redis() retries on first use
+        logger.warning("redis_unavailable_at_startup", error=str(e))
+    if settings.warmup:
+        await warm_up()
+    background = [
+        asyncio.create_task(run_revocation_listener()),
+        asyncio.create_task(run_last_used_flusher()),
+        asyncio.create_task(run_config_listener()),
+    ]
+    await gateway.start()
+
+    logger.info(
+        "app_started",
+        startup_ms=round((time.perf_counter() - start) * 1000, 2),
+        warmup=settings.warmup,
+    )
+    try:
+        yield
+    finally:
+        await gateway.stop()
+        for task in background:
+            task.cancel()
+        for task in background:
+            with suppress(asyncio.CancelledError):
+                await task
+        try:
+            async with AsyncSessionLocal() as db:
+                await flush_last_used(db)
+        except Exception:
+            logger.exception("api_key_last_used_flush_failed")
+        await close_embedder()
+        await close_llm()
+        await close_redis()
+        await close_db()
+        logger.info("app_stopped")
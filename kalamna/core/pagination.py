@@ -0,0 +1,152 @@
+"""
+List pagination and export
+Keyset (cursor) pages and streaming NDJSON/CSV exports for list endpoints
+
+Lists are ordered newest first by `(timestamp, id)`. A page's cursor holds the
+key of its last row, and the next page starts after it with one index range
+scan, so page 1,000 costs the same as page 1; OFFSET would read and discard
+every earlier row. Each listed table has an index on
+`(business_id, <timestamp>, id)` for this.
+
+Exports run the list query on a server-side cursor and stream it in batches
+of `EXPORT_BATCH_SIZE` rows, so memory stays flat however many rows match.
+"""
+
+import base64
+import csv
+import enum
+import io
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any, Generic, Literal, TypeVar
+
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 2000
+
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    # pass as `cursor` to get the next page; null on the last page
+    next_cursor: str | None = None
+
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    raw = orjson.dumps([sort_value.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = orjson.loads(raw)
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_statement(
+    stmt: Select,
+    sort_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    cursor: str | None,
+    limit: int,
+) -> Select:
+    """`stmt` narrowed to the rows after `cursor`, newest first, plus one row."""
+    if cursor is not None:
+        stmt = stmt.where(tuple_(sort_column, id_column) < decode_cursor(cursor))
+    # the extra row tells whether another page follows
+    return stmt.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+async def keyset_page(
+    db: AsyncSession,
+    stmt: Select,
+    sort_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> dict[str, Any]:
+    """
+    One page of `stmt` (a select of ORM entities, already filtered), newest
+    first. Returns `{"items", "next_cursor"}` for a `Page[...]` response.
+    Raises ValueError for a malformed cursor.
+    """
+    stmt = keyset_statement(stmt, sort_column, id_column, cursor, limit)
+    items = list(await db.scalars(stmt))
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def schema_columns(model: type, schema: type[BaseModel]) -> list:
+    """The model columns behind a response schema, for a matching export."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def export_rows(
+    db: AsyncSession, stmt: Select, fmt: ExportFormat
+) -> AsyncIterator[bytes]:
+    result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    columns: Sequence[str] = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+    async for batch in result.partitions():
+        if fmt == "ndjson":
+            # orjson writes datetimes and enums natively; asyncpg's UUID type
+            # is not a uuid.UUID, so it goes through `default`
+            yield b"".join(
+                orjson.dumps(
+                    row._asdict(), default=str, option=orjson.OPT_APPEND_NEWLINE
+                )
+                for row in batch
+            )
+        else:
+            writer.writerows([_csv_value(v) for v in row] for row in batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if fmt == "csv" and buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    db: AsyncSession, stmt: Select, fmt: ExportFormat, filename: str
+) -> StreamingResponse:
+    """
+    Stream every row of `stmt` (a select of plain columns) as NDJSON or CSV.
+    The session stays open until the last batch is sent.
+    """
+    return StreamingResponse(
+        export_rows(db, stmt, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
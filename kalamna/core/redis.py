@@ -1,17 +1,17 @@
-import os
-
 from redis.asyncio import Redis
 from redis.exceptions import ConnectionError
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+from kalamna.core.config import get_settings
+
+REDIS_URL = get_settings().redis_url
 
 _redis: Redis | None = None
 
 
 async def get_redis() -> Redis:
     """
-    Lazily initialize Redis connection on first use.
-    No FastAPI events needed.
+    Return the process-wide Redis client. The app lifespan creates it at
+    startup; workers and scripts get it lazily on first use.
     """
     global _redis
 
@@ -31,7 +31,18 @@ async def get_redis() -> Redis:
     return _redis
 
 
-# OPTIONAL: keep these for future use (but unused now)
+async def get_redis_or_none() -> Redis | None:
+    """
+    `get_redis`, or None while Redis is unreachable: for callers that only
+    use it as a cache and fall back to the database.
+    """
+    try:
+        return await get_redis()
+    except RuntimeError:
+        return None
+
+
+# called from the app lifespan
 async def init_redis():
     await get_redis()
 
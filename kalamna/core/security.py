@@ -1,17 +1,15 @@
-import os
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
 import jwt
-from dotenv import load_dotenv
 from passlib.context import CryptContext
 
-load_dotenv()
+from kalamna.core.config import get_settings
 
-JWT_SECRET = os.getenv("JWT_SECRET")
-if not JWT_SECRET:  # i have no idea what could happen if this is not set
+JWT_SECRET = get_settings().jwt_secret
+if not JWT_SECRET:  # an empty secret would make every token forgeable
     raise ValueError("JWT_SECRET environment variable must be set")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_ALGORITHM = get_settings().jwt_algorithm
 
 ACCESS_TTL = timedelta(minutes=15)
 REFRESH_TTL = timedelta(days=7)
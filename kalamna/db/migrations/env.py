@@ -1,21 +1,16 @@
 # kalamna/db/migrations/env.py
 # ruff: noqa: F401
 import asyncio
-import os
 from logging.config import fileConfig
 
 from alembic import context
-from dotenv import load_dotenv
 from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
-from kalamna.apps.business.models import Business
-from kalamna.apps.employees.models import Employee
+from kalamna.core.config import get_settings
+from kalamna.db import models  # every model, so Base.metadata is complete
 from kalamna.db.base import Base
 
-# Load environment variables
-load_dotenv()
-
 # Alembic config object
 config = context.config
 
@@ -28,7 +23,7 @@ target_metadata = Base.metadata
 
 
 # Load ASYNC database URL
-database_url = os.getenv("DATABASE_URL")
+database_url = get_settings().database_url
 if not database_url:
     raise RuntimeError("DATABASE_URL is not set")
 
@@ -0,0 +1,22 @@
+"""
+Model registry
+Every app's models, imported together
+
+Models refer to each other by name (relationship("Employee")), which only
+resolves once both classes are mapped. Importing this module maps them all
+and fills Base.metadata; kalamna.core.db does, so anything that opens a
+session (the app, workers, scripts) has the complete mapper registry.
+"""
+
+# ruff: noqa: F401
+from kalamna.apps.analytics.models import AnalyticsHourlyRollup, AnalyticsReport
+from kalamna.apps.business.models import Business, Configuration, Credential
+from kalamna.apps.documents.models import (
+    KnowledgeBase,
+    KnowledgeBaseChunk,
+    KnowledgeBaseVersion,
+)
+from kalamna.apps.employees.models import Employee
+from kalamna.apps.feedback.models import Feedback, FeedbackAggregate
+from kalamna.apps.rag.models import ChatMessage, ChatSession, EndUser, VoiceMessage
+from kalamna.db.base import Base
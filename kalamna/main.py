@@ -2,10 +2,19 @@ import time
 import uuid
 
 from fastapi import Depends, FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from structlog.contextvars import bind_contextvars, clear_contextvars
 
+from kalamna.apps.analytics.routers import router as analytics_router
 from kalamna.apps.authentication.routers import router as auth_router
+from kalamna.apps.business.routers import router as business_router
+from kalamna.apps.documents.routers import router as documents_router
+from kalamna.apps.employees.routers import router as employees_router
+from kalamna.apps.feedback.routers import router as feedback_router
+from kalamna.apps.rag.routers import router as rag_router
 from kalamna.core.config import setup_logging
+from kalamna.core.db import track_queries
+from kalamna.core.lifespan import lifespan
 from kalamna.core.redis import get_redis
 from kalamna.utils.logger import get_logger
 
@@ -16,9 +25,18 @@ app = FastAPI(
     title="Kalamna Backend API",
     description="Backend API for Kalamna - Customer Service Egyptian AI-powered platform",
     version="1.0.0",
+    lifespan=lifespan,
+    # orjson renders response bodies several times faster than json.dumps
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(auth_router, prefix="/api/v1")
+app.include_router(business_router, prefix="/api/v1")
+app.include_router(documents_router, prefix="/api/v1")
+app.include_router(employees_router, prefix="/api/v1")
+app.include_router(analytics_router, prefix="/api/v1")
+app.include_router(feedback_router, prefix="/api/v1")
+app.include_router(rag_router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -43,14 +61,17 @@ async def log_requests(request: Request, call_next):
     )
 
     start = time.perf_counter()
-    try:
-        response = await call_next(request)
-        return response
-    finally:
-        duration_ms = (time.perf_counter() - start) * 1000
-        logger.info(
-            "http_request_completed",
-            status_code=getattr(response, "status_code", None),
-            duration_ms=round(duration_ms, 2),
-        )
-        clear_contextvars()
+    response = None
+    with track_queries() as queries:
+        try:
+            response = await call_next(request)
+            return response
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            logger.info(
+                "http_request_completed",
+                status_code=getattr(response, "status_code", None),
+                duration_ms=round(duration_ms, 2),
+                **queries.log_fields(),
+            )
+            clear_contextvars()
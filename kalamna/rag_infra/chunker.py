@@ -2,3 +2,73 @@
 Text chunking service
 Splits documents into chunks for embedding and retrieval
 """
+
+import hashlib
+from collections import deque
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 150
+
+# coarsest first; "" means hard-split by length as a last resort
+SEPARATORS = ("\n\n", "\n", ". ", "؟ ", "? ", "! ", "، ", ", ", " ", "")
+
+
+def _split(text: str, separators: tuple[str, ...], chunk_size: int) -> list[str]:
+    """Split text into pieces no longer than chunk_size, on the coarsest separator."""
+    if len(text) <= chunk_size:
+        return [text]
+
+    separator, finer = separators[0], separators[1:]
+    if separator == "":
+        return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    parts = text.split(separator)
+    if len(parts) == 1:
+        return _split(text, finer, chunk_size)
+
+    pieces = []
+    for i, part in enumerate(parts):
+        # keep the separator on the left piece so joining restores the text
+        piece = part + separator if i < len(parts) - 1 else part
+        if not piece:
+            continue
+        if len(piece) <= chunk_size:
+            pieces.append(piece)
+        else:
+            pieces.extend(_split(piece, finer, chunk_size))
+    return pieces
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_CHUNK_OVERLAP,
+) -> list[str]:
+    """
+    Split text into chunks of at most `chunk_size` characters, preferring
+    paragraph, line, sentence and word boundaries, with up to `overlap`
+    characters repeated between consecutive chunks.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    chunks = []
+    window: deque[str] = deque()
+    length = 0
+    for piece in _split(text, SEPARATORS, chunk_size):
+        if window and length + len(piece) > chunk_size:
+            chunks.append("".join(window).strip())
+            # slide: keep only a tail that fits the overlap and the next piece
+            while window and (length > overlap or length + len(piece) > chunk_size):
+                length -= len(window.popleft())
+        window.append(piece)
+        length += len(piece)
+
+    if window:
+        chunks.append("".join(window).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def content_hash(text: str) -> str:
+    """Identifies unchanged chunks (and whole documents) across re-uploads."""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
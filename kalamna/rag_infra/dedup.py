@@ -0,0 +1,142 @@
+"""
+Near-duplicate chunk detection
+MinHash fingerprints and LSH banding for skipping repeated chunks at ingest
+
+Each chunk gets a MinHash signature over its word 3-shingles. The signature
+is cut into `LSH_BANDS` bands of `LSH_ROWS` values and each band is hashed to
+a 64-bit key. Two chunks become candidates when any band key matches; a
+candidate is a duplicate when the signatures agree on at least
+`DUPLICATE_THRESHOLD` of their positions (an estimate of Jaccard similarity).
+With 16 bands of 8 rows, pairs at 0.85 similarity are found 99.4% of the
+time, and pairs below 0.5 less than 7% of the time. The band keys are stored
+on each chunk, so a business's LSH index is a GIN-indexed column.
+"""
+
+import hashlib
+import re
+import uuid
+import zlib
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.85
+
+# fixed so signatures stored by one process compare with any other's
+_SEED = 0x6B616C
+_PRIME = (1 << 32) + 15
+_rng = np.random.default_rng(_SEED)
+# a < 2**31 keeps a * x + b (x < 2**32) inside uint64
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Arabic diacritics (tashkeel) and tatweel don't change the text's meaning
+_ARABIC_MARKS_RE = re.compile("[\u064b-\u0652\u0640]")
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    signature: np.ndarray  # (NUM_PERM,) uint32
+    bands: tuple[int, ...]  # LSH_BANDS signed 64-bit keys
+
+    def to_bytes(self) -> bytes:
+        return self.signature.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Fingerprint":
+        signature = np.frombuffer(data, dtype=np.uint32)
+        return cls(signature, band_keys(signature))
+
+    def similarity(self, other: "Fingerprint") -> float:
+        return float(np.mean(self.signature == other.signature))
+
+
+def shingles(text: str) -> set[int]:
+    tokens = _TOKEN_RE.findall(_ARABIC_MARKS_RE.sub("", text.lower()))
+    size = min(SHINGLE_SIZE, len(tokens))
+    return (
+        {
+            zlib.crc32(" ".join(tokens[i : i + size]).encode())
+            for i in range(len(tokens) - size + 1)
+        }
+        if size
+        else set()
+    )
+
+
+def band_keys(signature: np.ndarray) -> tuple[int, ...]:
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS : (band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(
+            rows.tobytes(), digest_size=8, person=band.to_bytes(2, "little")
+        ).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return tuple(keys)
+
+
+def fingerprint(text: str) -> Fingerprint | None:
+    """MinHash fingerprint of `text`, or None if it has no words."""
+    values = shingles(text)
+    if not values:
+        return None
+    x = np.fromiter(values, dtype=np.uint64, count=len(values))
+    hashed = (np.outer(x, _A) + _B) % _PRIME
+    signature = (hashed.min(axis=0) & 0xFFFFFFFF).astype(np.uint32)
+    return Fingerprint(signature, band_keys(signature))
+
+
+def fingerprint_chunks(chunks: Sequence[str]) -> list[Fingerprint | None]:
+    return [fingerprint(chunk) for chunk in chunks]
+
+
+class LSHIndex:
+    """In-memory LSH over fingerprints, keyed by chunk id."""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._buckets: dict[int, list[uuid.UUID]] = {}
+        self._fingerprints: dict[uuid.UUID, Fingerprint] = {}
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def add(self, key: uuid.UUID, fp: Fingerprint) -> None:
+        self._fingerprints[key] = fp
+        for band in fp.bands:
+            self._buckets.setdefault(band, []).append(key)
+
+    def query(self, fp: Fingerprint) -> uuid.UUID | None:
+        """The most similar indexed chunk at or above the threshold."""
+        best, best_score = None, self.threshold
+        seen = set()
+        for band in fp.bands:
+            for key in self._buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = fp.similarity(self._fingerprints[key])
+                if score >= best_score:
+                    best, best_score = key, score
+        return best
+
+    def assign(
+        self, ids: Sequence[uuid.UUID], fingerprints: Iterable[Fingerprint | None]
+    ) -> list[uuid.UUID | None]:
+        """
+        For each new chunk, in order, the id of the chunk it duplicates, or
+        None if it is new; new chunks are indexed so later ones can match them.
+        """
+        duplicate_of = []
+        for key, fp in zip(ids, fingerprints, strict=True):
+            match = self.query(fp) if fp is not None else None
+            if match is None and fp is not None:
+                self.add(key, fp)
+            duplicate_of.append(match)
+        return duplicate_of
@@ -1,4 +1,123 @@
 """
 Embedding service
 Generates vector embeddings using OpenAI or other models
+
+`EMBEDDER=openai` (default) calls an OpenAI-compatible /embeddings API;
+`EMBEDDER=hash` uses a deterministic, offline bag-of-words embedder for
+development, tests and benchmarks.
 """
+
+import hashlib
+import re
+from typing import Protocol
+
+import httpx
+import numpy as np
+
+from kalamna.core.config import get_settings
+
+settings = get_settings()
+EMBEDDER = settings.embedder
+EMBEDDING_MODEL = settings.embedding_model
+# fixed by the knowledge_base_chunks.embedding_vector column type
+EMBEDDING_DIMENSIONS = 1536
+EMBED_BATCH_SIZE = 128
+
+OPENAI_API_KEY = settings.openai_api_key
+OPENAI_BASE_URL = settings.openai_base_url
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class Embedder(Protocol):
+    model: str
+    dimensions: int
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """Return a (len(texts), dimensions) float32 matrix of unit vectors."""
+        ...
+
+
+class OpenAIEmbedder:
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        api_key: str | None = OPENAI_API_KEY,
+        base_url: str = OPENAI_BASE_URL,
+        batch_size: int = EMBED_BATCH_SIZE,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(30.0, connect=5.0),
+        )
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            response = await self._client.post(
+                "/embeddings",
+                json={
+                    "model": self.model,
+                    "input": batch,
+                    "dimensions": self.dimensions,
+                },
+            )
+            response.raise_for_status()
+            for item in response.json()["data"]:
+                out[start + item["index"]] = item["embedding"]
+        return out
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class HashEmbedder:
+    """
+    Feature-hashing embedder: texts sharing words get similar vectors.
+    No network or model weights, so it is fast and fully reproducible.
+    """
+
+    model = "hash-embedder"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _embed_one(self, text: str, out: np.ndarray) -> None:
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            out[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(out)
+        if norm:
+            out /= norm
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            self._embed_one(text, out[row])
+        return out
+
+
+_embedder: Embedder | None = None
+
+
+def get_embedder() -> Embedder:
+    """Return the process-wide embedder selected by `EMBEDDER`."""
+    global _embedder
+    if _embedder is None:
+        _embedder = HashEmbedder() if EMBEDDER == "hash" else OpenAIEmbedder()
+    return _embedder
+
+
+async def close_embedder() -> None:
+    """Release the embedder's HTTP connections (app shutdown)."""
+    global _embedder
+    if _embedder is not None and hasattr(_embedder, "aclose"):
+        await _embedder.aclose()
+    _embedder = None
@@ -0,0 +1,85 @@
+"""
+Emotion service
+Pluggable text emotion classifiers for chat messages
+
+A classifier is any object with a `model` name and an async
+`classify(texts) -> list[str]` that labels a whole batch at once, so a model
+can run one forward pass per batch. `EMOTION_CLASSIFIER` selects one by
+dotted path ("package.module:ClassName"); the default `stub` classifier is a
+small keyword lexicon (English, Arabic and Arabizi), offline and deterministic.
+"""
+
+import importlib
+import re
+from typing import Protocol
+
+from kalamna.core.config import get_settings
+
+EMOTION_CLASSIFIER = get_settings().emotion_classifier
+
+EMOTIONS = ("angry", "sad", "happy", "confused", "neutral")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# the first emotion with a matching word wins, so stronger ones come first
+# fmt: off
+_LEXICON = {
+    "angry": {
+        "angry", "furious", "terrible", "worst", "unacceptable", "scam",
+        "زعلان", "متضايق", "زهقت", "نصب", "مهزلة",
+        "za3lan", "zah2t", "nasb",
+    },
+    "sad": {
+        "sad", "disappointed", "unfortunately", "upset",
+        "حزين", "للاسف", "خسارة",
+        "7azeen", "lel2asaf", "5asara",
+    },
+    "confused": {
+        "confused", "how", "why", "understand", "unclear",
+        "ازاي", "ليه", "فين",
+        "ezay", "leh", "fein",
+    },
+    "happy": {
+        "thanks", "thank", "great", "perfect", "love", "awesome", "excellent",
+        "شكرا", "تمام", "جميل", "حلو", "ممتاز",
+        "shokran", "tamam", "gamed", "7elw",
+    },
+}
+# fmt: on
+
+
+class EmotionClassifier(Protocol):
+    model: str
+
+    async def classify(self, texts: list[str]) -> list[str]:
+        """One label from EMOTIONS per text, in order."""
+        ...
+
+
+class StubEmotionClassifier:
+    """Labels a text by the first lexicon word it contains; no model needed."""
+
+    model = "stub-emotion"
+
+    def _classify_one(self, text: str) -> str:
+        tokens = set(_TOKEN_RE.findall(text.lower()))
+        for emotion, words in _LEXICON.items():
+            if not tokens.isdisjoint(words):
+                return emotion
+        return "neutral"
+
+    async def classify(self, texts: list[str]) -> list[str]:
+        return [self._classify_one(text) for text in texts]
+
+
+def load_classifier(spec: str = EMOTION_CLASSIFIER) -> EmotionClassifier:
+    """Build a classifier from `stub` or a "module:ClassName" path."""
+    if spec == "stub":
+        return StubEmotionClassifier()
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(
+            f"EMOTION_CLASSIFIER must look like 'module:ClassName': {spec!r}"
+        )
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)()
@@ -1,4 +1,394 @@
 """
 LLM service
 OpenAI GPT integration for answer generation and completion
+
+`LLM=openai` (default) calls an OpenAI-compatible /chat/completions API;
+`LLM=fake` answers offline after an injectable delay, for development, tests
+and benchmarks.
+
+`LLMClient` protects tail latency across an ordered list of routes (a provider
+and a model), cheapest last:
+
+- identical concurrent requests are coalesced, so one upstream call answers
+  every waiter;
+- when the first route hasn't answered by its recent HEDGE_PERCENTILE latency,
+  the same request is also sent to the next route and the first answer wins;
+- each route has a circuit breaker: after BREAKER_FAILURES consecutive errors
+  or timeouts it is skipped for BREAKER_COOLDOWN_S, so calls go straight to the
+  next (cheaper) model, and then one probe call decides whether it is back.
+
+All HTTP calls share one pooled HTTP/2 client with strict timeouts.
 """
+
+import asyncio
+import hashlib
+import math
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Protocol
+
+import httpx
+import orjson
+
+from kalamna.core.config import get_settings
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+settings = get_settings()
+LLM = settings.llm
+LLM_MODEL = settings.llm_model
+LLM_FALLBACK_MODEL = settings.llm_fallback_model
+LLM_TIMEOUT_S = settings.llm_timeout_s
+
+OPENAI_API_KEY = settings.openai_api_key
+OPENAI_BASE_URL = settings.openai_base_url
+
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+
+HEDGE_PERCENTILE = 0.95
+# below this many samples the hedge waits HEDGE_DEFAULT_DELAY_S
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY_S = 2.0
+HEDGE_MIN_DELAY_S = 0.05
+LATENCY_WINDOW = 200
+
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN_S = 30.0
+
+Messages = list[dict[str, str]]
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every route failed or is switched off by its circuit breaker."""
+
+
+class LLMProvider(Protocol):
+    name: str
+
+    async def complete(
+        self, model: str, messages: Messages, max_tokens: int, temperature: float
+    ) -> str:
+        """Return the assistant message for `messages`; raise on any failure."""
+        ...
+
+
+@dataclass(frozen=True)
+class Completion:
+    text: str
+    model: str
+    provider: str
+    latency_ms: float
+    hedged: bool = False  # a second route was started before this one answered
+
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide HTTP/2 client every LLM call goes through."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            # waiting for a pooled connection counts against the call too
+            timeout=httpx.Timeout(LLM_TIMEOUT_S, connect=2.0, pool=1.0),
+        )
+    return _http_client
+
+
+class OpenAIProvider:
+    def __init__(
+        self,
+        api_key: str | None = OPENAI_API_KEY,
+        base_url: str = OPENAI_BASE_URL,
+        name: str = "openai",
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+
+    async def complete(
+        self, model: str, messages: Messages, max_tokens: int, temperature: float
+    ) -> str:
+        response = await get_http_client().post(
+            f"{self.base_url}/chat/completions",
+            headers=self._headers,
+            json={
+                "model": model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            },
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class FakeLLMProvider:
+    """
+    Echoes the last user message after `latency()` seconds, failing with
+    probability `error_rate`. Seeded, so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        name: str = "fake",
+        latency: Callable[[], float] = lambda: 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def complete(
+        self, model: str, messages: Messages, max_tokens: int, temperature: float
+    ) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency())
+        if self._random.random() < self.error_rate:
+            raise httpx.HTTPStatusError(
+                "503 from fake provider",
+                request=httpx.Request("POST", "http://fake/chat/completions"),
+                response=httpx.Response(503),
+            )
+        return f"[{model}] {messages[-1]['content']}"
+
+
+class CircuitBreaker:
+    """
+    Closed until `failures` consecutive errors, then open for `cooldown`
+    seconds; after that one call at a time is let through as a probe until
+    one succeeds.
+    """
+
+    def __init__(
+        self,
+        failures: int = BREAKER_FAILURES,
+        cooldown: float = BREAKER_COOLDOWN_S,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._clock = clock
+        self._consecutive = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._clock() - self._opened_at < self.cooldown:
+            return False
+        # probe; the next one waits another cooldown unless this one succeeds
+        self._opened_at = self._clock()
+        return True
+
+    def record_success(self) -> None:
+        self._consecutive = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._consecutive += 1
+        if self._consecutive >= self.failures:
+            self._opened_at = self._clock()
+
+
+class LatencyWindow:
+    """The last `size` call latencies of a route, in seconds."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+@dataclass
+class Route:
+    provider: LLMProvider
+    model: str
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    latencies: LatencyWindow = field(default_factory=LatencyWindow)
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider.name}:{self.model}"
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._calls: dict[bytes, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: bytes, call: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # one caller going away must not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+class LLMClient:
+    def __init__(
+        self,
+        routes: list[Route],
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge: bool = True,
+        coalesce: bool = True,
+        timeout: float = LLM_TIMEOUT_S,
+    ):
+        if not routes:
+            raise ValueError("LLMClient needs at least one route")
+        self.routes = routes
+        self.hedge_percentile = hedge_percentile
+        self.hedge = hedge
+        self.coalesce = coalesce
+        self.timeout = timeout
+        self._flights = SingleFlight()
+
+    async def complete(
+        self, messages: Messages, max_tokens: int = 512, temperature: float = 0.0
+    ) -> Completion:
+        """
+        Answer `messages` from the first route to succeed. Raises
+        LLMUnavailableError when every route failed or is switched off.
+        """
+        if not self.coalesce:
+            return await self._race(messages, max_tokens, temperature)
+        key = hashlib.blake2b(
+            orjson.dumps([messages, max_tokens, temperature]), digest_size=16
+        ).digest()
+        return await self._flights.do(
+            key, lambda: self._race(messages, max_tokens, temperature)
+        )
+
+    def _hedge_delay(self, route: Route) -> float:
+        recent = route.latencies.percentile(self.hedge_percentile)
+        if recent is None:
+            return HEDGE_DEFAULT_DELAY_S
+        return max(HEDGE_MIN_DELAY_S, recent)
+
+    async def _attempt(
+        self, route: Route, messages: Messages, max_tokens: int, temperature: float
+    ) -> str:
+        t0 = time.perf_counter()
+        try:
+            # a whole-call deadline; httpx's timeouts are per network operation
+            async with asyncio.timeout(self.timeout):
+                text = await route.provider.complete(
+                    route.model, messages, max_tokens, temperature
+                )
+        except Exception as e:
+            route.breaker.record_failure()
+            logger.warning("llm_call_failed", route=route.name, error=repr(e))
+            raise
+        # a call cancelled because the other route won records nothing
+        route.breaker.record_success()
+        route.latencies.add(time.perf_counter() - t0)
+        return text
+
+    async def _race(
+        self, messages: Messages, max_tokens: int, temperature: float
+    ) -> Completion:
+        start = time.perf_counter()
+        remaining = iter(self.routes)
+        pending: dict[asyncio.Task, Route] = {}
+        first: Route | None = None
+        hedge_due, hedged = self.hedge, False
+        error: Exception | None = None
+
+        def launch() -> bool:
+            nonlocal first
+            for route in remaining:
+                if route.breaker.allow():
+                    first = first or route
+                    task = asyncio.create_task(
+                        self._attempt(route, messages, max_tokens, temperature)
+                    )
+                    pending[task] = route
+                    return True
+            return False
+
+        launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(first) if hedge_due else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:  # slower than usual: race the next route
+                    hedge_due, hedged = False, launch()
+                    continue
+                for task in done:
+                    route = pending.pop(task)
+                    if task.exception() is None:
+                        return Completion(
+                            text=task.result(),
+                            model=route.model,
+                            provider=route.provider.name,
+                            latency_ms=(time.perf_counter() - start) * 1000,
+                            hedged=hedged,
+                        )
+                    error = task.exception()
+                # everything in flight failed: fall back to the next route
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise LLMUnavailableError("No LLM route is available") from error
+
+
+def default_routes() -> list[Route]:
+    if LLM == "fake":
+        provider = FakeLLMProvider()
+    else:
+        provider = OpenAIProvider()
+    models = [LLM_MODEL] + ([LLM_FALLBACK_MODEL] if LLM_FALLBACK_MODEL else [])
+    return [Route(provider, model) for model in models]
+
+
+_llm: LLMClient | None = None
+
+
+def get_llm() -> LLMClient:
+    """Return the process-wide client for the routes selected by settings."""
+    global _llm
+    if _llm is None:
+        _llm = LLMClient(default_routes())
+    return _llm
+
+
+async def close_llm() -> None:
+    """Release the shared HTTP connections (app shutdown)."""
+    global _http_client, _llm
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = _llm = None
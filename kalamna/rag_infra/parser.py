@@ -2,3 +2,88 @@
 Document parsing service
 Extracts text from PDF, DOCX, TXT, and other formats
 """
+
+import io
+import re
+from html.parser import HTMLParser
+
+SUPPORTED_FILE_TYPES = ("txt", "md", "html", "pdf", "docx")
+
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+_SKIP_TAGS = {"script", "style", "noscript"}
+
+
+class _HTMLTextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _parse_text(data: bytes) -> str:
+    return data.decode("utf-8-sig", errors="replace")
+
+
+def _parse_html(data: bytes) -> str:
+    extractor = _HTMLTextExtractor()
+    extractor.feed(_parse_text(data))
+    extractor.close()
+    return "".join(extractor.parts)
+
+
+def _parse_pdf(data: bytes) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _parse_docx(data: bytes) -> str:
+    from docx import Document
+
+    document = Document(io.BytesIO(data))
+    return "\n\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+_PARSERS = {
+    "txt": _parse_text,
+    "md": _parse_text,
+    "html": _parse_html,
+    "pdf": _parse_pdf,
+    "docx": _parse_docx,
+}
+SUPPORTED_FILE_TYPES = tuple(_PARSERS)
+
+
+def normalize_whitespace(text: str) -> str:
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def parse_document(data: bytes, file_type: str) -> str:
+    """
+    Extract plain text from raw file bytes.
+    CPU-bound: call through `asyncio.to_thread` from async code.
+    """
+    parser = _PARSERS.get(file_type.lower().lstrip("."))
+    if parser is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return normalize_whitespace(parser(data))
@@ -0,0 +1,57 @@
+"""
+Speech service
+Pluggable transcription + emotion detection engines for voice messages
+
+An engine is any object with an async `transcribe(path) -> TranscriptionResult`.
+`VOICE_ENGINE` selects one by dotted path ("package.module:ClassName");
+the default `stub` engine is offline and deterministic, for dev and tests.
+"""
+
+import importlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+
+from kalamna.core.config import get_settings
+
+VOICE_ENGINE = get_settings().voice_engine
+
+
+@dataclass(frozen=True)
+class TranscriptionResult:
+    text: str
+    emotion: str | None
+    model: str
+
+
+class TranscriptionEngine(Protocol):
+    async def transcribe(self, audio_path: Path) -> TranscriptionResult: ...
+
+
+class StubTranscriptionEngine:
+    """Returns a fixed transcript derived from the file size; no model needed."""
+
+    model = "stub-transcriber"
+
+    def __init__(self, text: str = "stub transcript", emotion: str = "neutral"):
+        self.text = text
+        self.emotion = emotion
+
+    async def transcribe(self, audio_path: Path) -> TranscriptionResult:
+        size = Path(audio_path).stat().st_size
+        return TranscriptionResult(
+            text=f"{self.text} ({size} bytes)",
+            emotion=self.emotion,
+            model=self.model,
+        )
+
+
+def load_engine(spec: str = VOICE_ENGINE) -> TranscriptionEngine:
+    """Build an engine from `stub` or a "module:ClassName" path."""
+    if spec == "stub":
+        return StubTranscriptionEngine()
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"VOICE_ENGINE must look like 'module:ClassName': {spec!r}")
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)()
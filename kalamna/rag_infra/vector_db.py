@@ -1,4 +1,546 @@
 """
 Vector database service
 pgvector integration for storing and searching embeddings
+
+Each business picks an `EmbeddingStorage` mode. Quantized modes search a
+halfvec or binary index for a shortlist of candidates, then re-rank the
+shortlist by exact cosine distance on the stored float32 vectors.
+
+Near-duplicate chunks (see `kalamna.rag_infra.dedup`) are stored without a
+vector and link to the chunk they duplicate; searches return only the latter.
 """
+
+import uuid
+from collections.abc import Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import numpy as np
+from pgvector.asyncpg import register_vector
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import (
+    Integer,
+    Select,
+    all_,
+    any_,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from kalamna.apps.business.models import Business
+from kalamna.apps.documents.models import EmbeddingStorage, KnowledgeBaseChunk
+from kalamna.apps.rag.services import normalize_query, normalize_text
+from kalamna.rag_infra.dedup import Fingerprint, LSHIndex
+from kalamna.rag_infra.embedder import EMBEDDING_DIMENSIONS
+
+# reciprocal rank fusion constant (Cormack et al.); dampens top-rank dominance
+RRF_K = 60
+# each retriever contributes this many times top_k candidates to the fusion
+HYBRID_CANDIDATE_FACTOR = 4
+# quantized modes shortlist this many times the wanted rows before re-ranking
+RERANK_FACTOR = {EmbeddingStorage.HALF: 2, EmbeddingStorage.BINARY: 8}
+# pgvector's default hnsw.ef_search; an HNSW scan returns at most this many rows
+HNSW_EF_SEARCH = 40
+
+CHUNK_COPY_COLUMNS = (
+    "id",
+    "kb_id",
+    "business_id",
+    "chunk_index",
+    "chunk_text",
+    "search_text",
+    "content_hash",
+    "embedding_vector",
+    "embedding_storage",
+    "minhash",
+    "lsh_bands",
+    "duplicate_of_id",
+    "created_at",
+)
+
+
+@dataclass(frozen=True)
+class ChunkRow:
+    kb_id: uuid.UUID
+    business_id: uuid.UUID
+    chunk_index: int
+    chunk_text: str
+    embedding_vector: np.ndarray | None
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    content_hash: str | None = None
+    fingerprint: Fingerprint | None = None
+    duplicate_of_id: uuid.UUID | None = None
+
+
+@dataclass(frozen=True)
+class ChunkHit:
+    id: uuid.UUID
+    kb_id: uuid.UUID
+    chunk_index: int
+    chunk_text: str
+    score: float
+
+
+@asynccontextmanager
+async def _binary_vector_codec(db: AsyncSession):
+    """
+    Yield the session's asyncpg connection with the binary vector codec set.
+    COPY needs it, but ORM queries bind vectors as text, so it is reset after.
+    """
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    driver = raw.driver_connection
+    await register_vector(driver)
+    try:
+        yield conn, driver
+    finally:
+        for type_name in ("vector", "halfvec", "sparsevec"):
+            try:
+                await driver.reset_type_codec(type_name, schema="public")
+            except ValueError:
+                pass
+
+
+async def get_embedding_storage(
+    db: AsyncSession, business_id: uuid.UUID
+) -> EmbeddingStorage:
+    storage = await db.scalar(
+        select(Business.embedding_storage).where(Business.id == business_id)
+    )
+    return storage or EmbeddingStorage.FULL
+
+
+async def set_embedding_storage(
+    db: AsyncSession, business_id: uuid.UUID, storage: EmbeddingStorage
+) -> int:
+    """
+    Switch a business to another storage mode. Its chunks move between the
+    partial indexes as they are updated. The caller commits.
+    """
+    await db.execute(
+        update(Business)
+        .where(Business.id == business_id)
+        .values(embedding_storage=storage)
+    )
+    result = await db.execute(
+        update(KnowledgeBaseChunk)
+        .where(
+            KnowledgeBaseChunk.business_id == business_id,
+            KnowledgeBaseChunk.embedding_storage != storage,
+        )
+        .values(embedding_storage=storage)
+    )
+    return result.rowcount
+
+
+async def copy_chunks(
+    db: AsyncSession,
+    rows: Sequence[ChunkRow],
+    storage: EmbeddingStorage = EmbeddingStorage.FULL,
+) -> int:
+    """
+    Bulk-insert chunks with COPY (binary) inside the session's transaction.
+    Much faster than INSERT for the thousands of rows one document produces.
+    Full-text search indexes each chunk's normalised text.
+    """
+    if not rows:
+        return 0
+    now = datetime.now(timezone.utc)
+    records = [
+        (
+            row.id,
+            row.kb_id,
+            row.business_id,
+            row.chunk_index,
+            row.chunk_text,
+            normalize_text(row.chunk_text),
+            row.content_hash,
+            (
+                None
+                if row.embedding_vector is None
+                else np.asarray(row.embedding_vector, dtype=np.float32)
+            ),
+            storage.name,
+            row.fingerprint.to_bytes() if row.fingerprint else None,
+            list(row.fingerprint.bands) if row.fingerprint else None,
+            row.duplicate_of_id,
+            now,
+        )
+        for row in rows
+    ]
+    async with _binary_vector_codec(db) as (conn, driver):
+        options = conn.sync_connection.get_execution_options()
+        translate = options.get("schema_translate_map") or {}
+        await driver.copy_records_to_table(
+            KnowledgeBaseChunk.__tablename__,
+            schema_name=translate.get(None),
+            columns=CHUNK_COPY_COLUMNS,
+            records=records,
+        )
+    return len(rows)
+
+
+async def load_lsh_index(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    fingerprints: Sequence[Fingerprint | None],
+) -> LSHIndex:
+    """
+    An LSH index of the business's stored chunks that share at least one
+    band key with `fingerprints`, i.e. every candidate duplicate.
+    """
+    index = LSHIndex()
+    bands = sorted({band for fp in fingerprints if fp for band in fp.bands})
+    if not bands:
+        return index
+    chunk = KnowledgeBaseChunk
+    rows = await db.execute(
+        select(chunk.id, chunk.minhash).where(
+            chunk.business_id == business_id,
+            chunk.lsh_bands.overlap(bands),
+        )
+    )
+    for chunk_id, minhash in rows:
+        index.add(chunk_id, Fingerprint.from_bytes(minhash))
+    return index
+
+
+def _uuid_array(ids: Sequence[uuid.UUID]):
+    """Bind a list of ids as one uuid[] parameter (no per-id placeholders)."""
+    return literal(list(ids), ARRAY(UUID(as_uuid=True)))
+
+
+async def promote_duplicates(db: AsyncSession, chunk_ids: Sequence[uuid.UUID]) -> int:
+    """
+    Before chunks are deleted, keep the chunks that link to them searchable:
+    the oldest surviving link to each inherits its vector and fingerprint,
+    and the other links move to that heir.
+    """
+    if not chunk_ids:
+        return 0
+    chunk = KnowledgeBaseChunk
+    canonical = aliased(KnowledgeBaseChunk)
+    doomed = _uuid_array(chunk_ids)
+    heirs = (
+        await db.execute(
+            select(chunk.id, chunk.duplicate_of_id)
+            .where(
+                chunk.duplicate_of_id == any_(doomed),
+                chunk.id != all_(doomed),
+            )
+            .order_by(chunk.duplicate_of_id, chunk.created_at, chunk.id)
+            .distinct(chunk.duplicate_of_id)
+        )
+    ).all()
+    if not heirs:
+        return 0
+
+    heir_ids = [heir for heir, _ in heirs]
+    await db.execute(
+        update(chunk)
+        .where(
+            chunk.id == any_(_uuid_array(heir_ids)),
+            chunk.duplicate_of_id == canonical.id,
+        )
+        .values(
+            embedding_vector=canonical.embedding_vector,
+            minhash=canonical.minhash,
+            lsh_bands=canonical.lsh_bands,
+            duplicate_of_id=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    moved = (
+        func.unnest(
+            _uuid_array([original for _, original in heirs]), _uuid_array(heir_ids)
+        )
+        .table_valued("original", "heir")
+        .render_derived(name="moved")
+    )
+    await db.execute(
+        update(chunk)
+        .where(chunk.duplicate_of_id == moved.c.original)
+        .values(duplicate_of_id=moved.c.heir)
+        .execution_options(synchronize_session=False)
+    )
+    return len(heirs)
+
+
+async def delete_chunks(db: AsyncSession, chunk_ids: Sequence[uuid.UUID]) -> int:
+    """Delete chunks, first promoting any duplicates that link to them."""
+    if not chunk_ids:
+        return 0
+    await promote_duplicates(db, chunk_ids)
+    result = await db.execute(
+        delete(KnowledgeBaseChunk)
+        .where(KnowledgeBaseChunk.id == any_(_uuid_array(chunk_ids)))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def move_chunks(
+    db: AsyncSession, positions: Sequence[tuple[uuid.UUID, int]]
+) -> None:
+    """Set new `chunk_index`es for kept chunks, in one UPDATE."""
+    if not positions:
+        return
+    moved = (
+        func.unnest(
+            _uuid_array([chunk_id for chunk_id, _ in positions]),
+            literal([index for _, index in positions], ARRAY(Integer)),
+        )
+        .table_valued("id", "chunk_index")
+        .render_derived(name="moved")
+    )
+    await db.execute(
+        update(KnowledgeBaseChunk)
+        .where(KnowledgeBaseChunk.id == moved.c.id)
+        .values(chunk_index=moved.c.chunk_index)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def load_chunk_vectors(
+    db: AsyncSession, business_id: uuid.UUID
+) -> tuple[list[uuid.UUID], np.ndarray]:
+    """
+    Ids and float32 vectors of every searchable chunk of a business, read
+    with the binary vector codec (text parsing would dominate at this size).
+    """
+    async with _binary_vector_codec(db) as (_, driver):
+        rows = await driver.fetch(
+            f"SELECT id, embedding_vector FROM {KnowledgeBaseChunk.__tablename__} "
+            "WHERE business_id = $1 AND embedding_vector IS NOT NULL",
+            business_id,
+        )
+    if not rows:
+        return [], np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    vectors = np.stack([row["embedding_vector"] for row in rows]).astype(np.float32)
+    return [row["id"] for row in rows], vectors
+
+
+async def fetch_hits(
+    db: AsyncSession, scored: Sequence[tuple[uuid.UUID, float]]
+) -> list[ChunkHit]:
+    """
+    ChunkHits for (chunk id, score) pairs found outside Postgres, in the
+    given order. Ids whose chunk no longer exists are dropped.
+    """
+    if not scored:
+        return []
+    chunk = KnowledgeBaseChunk
+    rows = await db.execute(
+        select(chunk.id, chunk.kb_id, chunk.chunk_index, chunk.chunk_text).where(
+            chunk.id == any_(_uuid_array([chunk_id for chunk_id, _ in scored]))
+        )
+    )
+    found = {row.id: row for row in rows}
+    return [
+        ChunkHit(
+            id=chunk_id,
+            kb_id=found[chunk_id].kb_id,
+            chunk_index=found[chunk_id].chunk_index,
+            chunk_text=found[chunk_id].chunk_text,
+            score=score,
+        )
+        for chunk_id, score in scored
+        if chunk_id in found
+    ]
+
+
+def _hits(rows) -> list[ChunkHit]:
+    return [
+        ChunkHit(
+            id=row.id,
+            kb_id=row.kb_id,
+            chunk_index=row.chunk_index,
+            chunk_text=row.chunk_text,
+            score=float(row.score),
+        )
+        for row in rows
+    ]
+
+
+def _quantized_distance(storage: EmbeddingStorage, query_vector: np.ndarray):
+    """Distance expression matching the storage mode's partial index."""
+    column = KnowledgeBaseChunk.embedding_vector
+    if storage is EmbeddingStorage.HALF:
+        half = HALFVEC(EMBEDDING_DIMENSIONS)
+        query = literal(query_vector, half)
+        return cast(column, half).cosine_distance(cast(query, half))
+
+    bits = BIT(EMBEDDING_DIMENSIONS)
+    vector = Vector(EMBEDDING_DIMENSIONS)
+    # binary_quantize is overloaded (vector, halfvec): type the parameter
+    query = cast(literal(query_vector, vector), vector)
+    return cast(func.binary_quantize(column), bits).hamming_distance(
+        cast(func.binary_quantize(query), bits)
+    )
+
+
+def nearest_chunks(
+    business_id: uuid.UUID,
+    query_vector: np.ndarray,
+    limit: int,
+    storage: EmbeddingStorage,
+) -> Select:
+    """
+    Ids and exact cosine distances of a business's `limit` nearest chunks,
+    ordered nearest first, using the index for its storage mode. Only chunks
+    stored in `storage` are searched, so it must be the business's mode.
+    """
+    chunk = KnowledgeBaseChunk
+    exact = chunk.embedding_vector.cosine_distance(query_vector)
+    # inlined, not bound: the planner can only match a partial index's
+    # predicate against a constant, and prepared statements may go generic
+    in_mode = chunk.embedding_storage == literal_column(f"'{storage.name}'")
+    scope = (
+        chunk.business_id == business_id,
+        in_mode,
+        chunk.embedding_vector.is_not(None),
+    )
+    if storage is EmbeddingStorage.FULL:
+        return (
+            select(chunk.id, exact.label("distance"))
+            .where(*scope)
+            .order_by(exact)
+            .limit(limit)
+        )
+
+    shortlist = (
+        select(chunk.id, exact.label("distance"))
+        .where(*scope)
+        .order_by(_quantized_distance(storage, query_vector))
+        .limit(limit * RERANK_FACTOR[storage])
+        .subquery("shortlist")
+    )
+    return (
+        select(shortlist.c.id, shortlist.c.distance)
+        .order_by(shortlist.c.distance)
+        .limit(limit)
+    )
+
+
+async def _widen_ef_search(
+    db: AsyncSession, storage: EmbeddingStorage, limit: int
+) -> None:
+    """Let the HNSW scan return the whole shortlist (transaction-local)."""
+    if storage is EmbeddingStorage.FULL:
+        return
+    candidates = limit * RERANK_FACTOR[storage]
+    if candidates > HNSW_EF_SEARCH:
+        await db.execute(
+            select(func.set_config("hnsw.ef_search", str(candidates), True))
+        )
+
+
+async def search_chunks(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    query_vector: np.ndarray,
+    top_k: int = 5,
+    storage: EmbeddingStorage | None = None,
+) -> list[ChunkHit]:
+    """
+    Nearest chunks by cosine similarity, within one business. `storage` is
+    the business's storage mode, looked up when not given.
+    """
+    storage = storage or await get_embedding_storage(db, business_id)
+    await _widen_ef_search(db, storage, top_k)
+    nearest = nearest_chunks(business_id, query_vector, top_k, storage).subquery(
+        "nearest"
+    )
+    stmt = (
+        select(
+            KnowledgeBaseChunk.id,
+            KnowledgeBaseChunk.kb_id,
+            KnowledgeBaseChunk.chunk_index,
+            KnowledgeBaseChunk.chunk_text,
+            (1 - nearest.c.distance).label("score"),
+        )
+        .join(nearest, nearest.c.id == KnowledgeBaseChunk.id)
+        .order_by(nearest.c.distance)
+    )
+    return _hits((await db.execute(stmt)).all())
+
+
+async def hybrid_search(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    query_vector: np.ndarray,
+    query_text: str,
+    top_k: int = 5,
+    storage: EmbeddingStorage | None = None,
+) -> list[ChunkHit]:
+    """
+    Combine vector similarity and full-text ranking with reciprocal rank
+    fusion, in a single round trip. Scores are RRF scores, not similarities.
+    `storage` is looked up when not given, as in `search_chunks`. The text
+    is normalised like the chunks' indexed text.
+    """
+    storage = storage or await get_embedding_storage(db, business_id)
+    candidates = top_k * HYBRID_CANDIDATE_FACTOR
+    chunk = KnowledgeBaseChunk
+
+    await _widen_ef_search(db, storage, candidates)
+    nearest = nearest_chunks(business_id, query_vector, candidates, storage).subquery(
+        "nearest"
+    )
+    semantic = select(
+        nearest.c.id,
+        func.row_number().over(order_by=nearest.c.distance).label("rank"),
+    ).cte("semantic")
+
+    ts_query = func.plainto_tsquery(
+        literal_column("'simple'"), normalize_query(query_text)
+    )
+    text_rank = func.ts_rank_cd(chunk.chunk_tsv, ts_query)
+    keyword = (
+        select(
+            chunk.id, func.row_number().over(order_by=text_rank.desc()).label("rank")
+        )
+        .where(
+            chunk.business_id == business_id,
+            chunk.duplicate_of_id.is_(None),
+            chunk.chunk_tsv.op("@@")(ts_query),
+        )
+        .order_by(text_rank.desc())
+        .limit(candidates)
+        .cte("keyword")
+    )
+
+    fused = (
+        select(
+            func.coalesce(semantic.c.id, keyword.c.id).label("id"),
+            (
+                func.coalesce(1.0 / (RRF_K + semantic.c.rank), 0.0)
+                + func.coalesce(1.0 / (RRF_K + keyword.c.rank), 0.0)
+            ).label("score"),
+        )
+        .select_from(semantic.join(keyword, semantic.c.id == keyword.c.id, full=True))
+        .subquery("fused")
+    )
+
+    stmt = (
+        select(
+            chunk.id,
+            chunk.kb_id,
+            chunk.chunk_index,
+            chunk.chunk_text,
+            fused.c.score,
+        )
+        .join(fused, fused.c.id == chunk.id)
+        .order_by(fused.c.score.desc())
+        .limit(top_k)
+    )
+    return _hits((await db.execute(stmt)).all())
@@ -0,0 +1,318 @@
+"""
+Vector snapshot service
+Memory-mapped, in-process vector search for hot businesses
+
+For a business with many chunks and much traffic, `export_snapshot` writes
+its chunk vectors under VECTOR_SNAPSHOT_DIR as .npy files: a unit-length
+float16 or int8 matrix (int8 rows with a float32 scale each), the chunk ids
+and, from IVF_MIN_ROWS rows, an IVF partition (k-means centroids, with the
+rows grouped by nearest centroid). API workers open the files with
+`mmap_mode="r"`, so every process on the host shares one copy through the OS
+page cache, and scan the IVF_PROBES partitions nearest the query (every row,
+below IVF_MIN_ROWS) with NumPy. Only the hits' texts come from Postgres, by
+primary key.
+
+A snapshot is named after its generation, a hash of the business's ready
+knowledge bases and their versions. Businesses that have one are queued for
+re-export after each re-index (SNAPSHOT_QUEUE_STREAM), which the snapshot
+worker does outside the API processes, and `CURRENT` is switched with a
+rename, so readers see either the old snapshot or the new one. Until then,
+hits on chunks that no longer exist are dropped. Businesses without a
+snapshot, or every business while VECTOR_SNAPSHOT_DIR is unset, are searched
+with pgvector.
+
+    python -m kalamna.workers.vector_snapshots <business_id> [--drop]
+    python -m kalamna.workers.vector_snapshots --listen
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.documents.models import (
+    EmbeddingStorage,
+    KnowledgeBase,
+    KnowledgeBaseStatus,
+)
+from kalamna.core.config import get_settings
+from kalamna.rag_infra import vector_db
+from kalamna.rag_infra.vector_db import ChunkHit
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+settings = get_settings()
+VECTOR_SNAPSHOT_DIR = settings.vector_snapshot_dir
+VECTOR_SNAPSHOT_DTYPE = settings.vector_snapshot_dtype
+
+# below this many rows a full scan costs about as much as probing partitions
+IVF_MIN_ROWS = 10_000
+IVF_PROBES = 8
+KMEANS_ITERATIONS = 6
+KMEANS_SAMPLE = 8_192
+# rows converted to float32 per matrix product while scanning
+SCAN_BLOCK_ROWS = 8_192
+CURRENT_FILE = "CURRENT"
+SNAPSHOT_QUEUE_STREAM = "vector_snapshots:export"
+SNAPSHOT_QUEUE_MAXLEN = 10_000
+
+
+def _business_dir(directory: str, business_id: uuid.UUID) -> Path:
+    return Path(directory) / str(business_id)
+
+
+async def snapshot_generation(db: AsyncSession, business_id: uuid.UUID) -> str:
+    """Hash of the business's ready knowledge bases and their versions."""
+    rows = await db.execute(
+        select(KnowledgeBase.id, KnowledgeBase.version)
+        .where(
+            KnowledgeBase.business_id == business_id,
+            KnowledgeBase.status == KnowledgeBaseStatus.READY,
+        )
+        .order_by(KnowledgeBase.id)
+    )
+    digest = hashlib.blake2b(digest_size=8)
+    for kb_id, version in rows:
+        digest.update(kb_id.bytes + version.to_bytes(8, "little"))
+    return digest.hexdigest()
+
+
+def _kmeans(vectors: np.ndarray, lists: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids, trained on a sample of unit vectors."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[
+        rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False)
+    ]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assigned = np.argmax(sample @ centroids.T, axis=1)
+        order = np.argsort(assigned, kind="stable")
+        counts = np.bincount(assigned, minlength=lists)
+        filled = counts > 0
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        centroids[filled] = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate(
+        [
+            np.argmax(vectors[i : i + SCAN_BLOCK_ROWS] @ centroids.T, axis=1)
+            for i in range(0, len(vectors), SCAN_BLOCK_ROWS)
+        ]
+    )
+
+
+def write_snapshot(
+    path: Path, ids: list[uuid.UUID], vectors: np.ndarray, dtype: str
+) -> None:
+    """Write a snapshot of `vectors` (float32, one row per id) into `path`."""
+    path.mkdir(parents=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    id_bytes = np.frombuffer(b"".join(i.bytes for i in ids), dtype=np.uint8)
+    id_bytes = id_bytes.reshape(len(ids), 16)
+
+    if len(ids) >= IVF_MIN_ROWS:
+        centroids = _kmeans(vectors, round(len(ids) ** 0.5))
+        assigned = _assign(vectors, centroids)
+        order = np.argsort(assigned, kind="stable")
+        vectors, id_bytes = vectors[order], id_bytes[order]
+        counts = np.bincount(assigned, minlength=len(centroids))
+        np.save(path / "centroids.npy", centroids.astype(np.float32))
+        np.save(path / "offsets.npy", np.concatenate(([0], np.cumsum(counts))))
+
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        np.save(path / "scales.npy", scales.astype(np.float32))
+        matrix = np.rint(vectors / scales[:, None]).astype(np.int8)
+    else:
+        matrix = vectors.astype(np.float16)
+    np.save(path / "vectors.npy", matrix)
+    np.save(path / "ids.npy", id_bytes)
+
+
+class VectorSnapshot:
+    """One exported snapshot, memory-mapped read-only."""
+
+    def __init__(self, path: Path, probes: int = IVF_PROBES):
+        self.path = path
+        self.generation = path.name
+        self.probes = probes
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.ids = np.load(path / "ids.npy", mmap_mode="r")
+        self.scales = self._optional(path / "scales.npy")
+        self.centroids = self._optional(path / "centroids.npy")
+        self.offsets = self._optional(path / "offsets.npy")
+
+    @staticmethod
+    def _optional(file: Path) -> np.ndarray | None:
+        return np.load(file, mmap_mode="r") if file.exists() else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _ranges(self, query: np.ndarray) -> list[tuple[int, int]]:
+        if self.centroids is None:
+            return [(0, len(self))]
+        probes = min(self.probes, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        return [(self.offsets[i], self.offsets[i + 1]) for i in sorted(nearest)]
+
+    def _scan(self, start: int, stop: int, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(stop - start, dtype=np.float32)
+        for i in range(start, stop, SCAN_BLOCK_ROWS):
+            end = min(i + SCAN_BLOCK_ROWS, stop)
+            block = self.vectors[i:end].astype(np.float32) @ query
+            if self.scales is not None:
+                block *= self.scales[i:end]
+            scores[i - start : end - start] = block
+        return scores
+
+    def search(
+        self, query_vector: np.ndarray, top_k: int
+    ) -> list[tuple[uuid.UUID, float]]:
+        """The `top_k` most similar chunk ids with their cosine similarity."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        ranges = [(a, b) for a, b in self._ranges(query) if b > a]
+        if not ranges:
+            return []
+        rows = np.concatenate([np.arange(a, b) for a, b in ranges])
+        scores = np.concatenate([self._scan(a, b, query) for a, b in ranges])
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            (uuid.UUID(bytes=self.ids[rows[i]].tobytes()), float(scores[i]))
+            for i in best
+        ]
+
+
+async def export_snapshot(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    directory: str | None = VECTOR_SNAPSHOT_DIR,
+    dtype: str = VECTOR_SNAPSHOT_DTYPE,
+) -> Path:
+    """
+    Write a snapshot of the business's current chunks (unless one of this
+    generation exists), make it CURRENT and remove older ones.
+    """
+    if not directory:
+        raise ValueError("VECTOR_SNAPSHOT_DIR is not set")
+    business_dir = _business_dir(directory, business_id)
+    generation = await snapshot_generation(db, business_id)
+    path = business_dir / generation
+    if not path.exists():
+        ids, vectors = await vector_db.load_chunk_vectors(db, business_id)
+        staging = business_dir / f".{generation}.{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        # seconds of NumPy (k-means, quantisation) for a large business
+        await asyncio.to_thread(write_snapshot, staging, ids, vectors, dtype)
+        try:
+            os.replace(staging, path)
+        except OSError:  # another process exported this generation meanwhile
+            shutil.rmtree(staging, ignore_errors=True)
+
+    current = business_dir / f".{CURRENT_FILE}.{os.getpid()}"
+    current.write_text(generation)
+    os.replace(current, business_dir / CURRENT_FILE)
+    # processes still reading an old snapshot keep its mapped files alive
+    for old in business_dir.iterdir():
+        if old.is_dir() and old.name != generation and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+    logger.info(
+        "vector_snapshot_exported",
+        business_id=str(business_id),
+        generation=generation,
+        dtype=dtype,
+    )
+    return path
+
+
+def drop_snapshot(
+    business_id: uuid.UUID, directory: str | None = VECTOR_SNAPSHOT_DIR
+) -> None:
+    """Stop serving the business from a snapshot (back to pgvector)."""
+    if directory:
+        business_dir = _business_dir(directory, business_id)
+        (business_dir / CURRENT_FILE).unlink(missing_ok=True)
+        shutil.rmtree(business_dir, ignore_errors=True)
+    _snapshots.pop(business_id, None)
+
+
+def has_snapshot(
+    business_id: uuid.UUID, directory: str | None = VECTOR_SNAPSHOT_DIR
+) -> bool:
+    return (
+        bool(directory)
+        and (_business_dir(directory, business_id) / CURRENT_FILE).exists()
+    )
+
+
+async def refresh_snapshot(redis: Redis, business_id: uuid.UUID) -> bool:
+    """
+    Queue the business's snapshot for re-export if it has one (after a
+    re-index); the snapshot worker exports it.
+    """
+    if not has_snapshot(business_id):
+        return False
+    await redis.xadd(
+        SNAPSHOT_QUEUE_STREAM,
+        {"business_id": str(business_id)},
+        maxlen=SNAPSHOT_QUEUE_MAXLEN,
+        approximate=True,
+    )
+    return True
+
+
+_snapshots: dict[uuid.UUID, VectorSnapshot] = {}
+
+
+def get_snapshot(
+    business_id: uuid.UUID, directory: str | None = VECTOR_SNAPSHOT_DIR
+) -> VectorSnapshot | None:
+    """The business's CURRENT snapshot, mapped once per process."""
+    if not directory:
+        return None
+    business_dir = _business_dir(directory, business_id)
+    try:
+        generation = (business_dir / CURRENT_FILE).read_text().strip()
+        snapshot = _snapshots.get(business_id)
+        if snapshot is None or snapshot.generation != generation:
+            snapshot = VectorSnapshot(business_dir / generation)
+            _snapshots[business_id] = snapshot
+    except FileNotFoundError:  # none, or replaced while we were opening it
+        _snapshots.pop(business_id, None)
+        return None
+    return snapshot
+
+
+async def search_chunks(
+    db: AsyncSession,
+    business_id: uuid.UUID,
+    query_vector: np.ndarray,
+    top_k: int = 5,
+    storage: EmbeddingStorage | None = None,
+) -> list[ChunkHit]:
+    """
+    `vector_db.search_chunks`, answered from the business's snapshot when it
+    has one. Scores are cosine similarities either way.
+    """
+    snapshot = get_snapshot(business_id)
+    if snapshot is None:
+        return await vector_db.search_chunks(
+            db, business_id, query_vector, top_k, storage
+        )
+    return await vector_db.fetch_hits(db, snapshot.search(query_vector, top_k))
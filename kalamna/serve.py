@@ -0,0 +1,51 @@
+"""
+Production server entry point
+Runs the API under uvicorn with several worker processes
+
+    python -m kalamna.serve [--workers N] [--port 8000]
+
+Each worker runs the app lifespan, so it gets its own DB pool, Redis client
+and warm-up. On SIGTERM/SIGINT uvicorn stops accepting connections and lets
+in-flight requests finish for up to GRACEFUL_TIMEOUT_S seconds, then runs the
+lifespan shutdown. Client addresses come from X-Forwarded-For only when the
+request arrives from FORWARDED_ALLOW_IPS.
+"""
+
+import argparse
+
+import uvicorn
+
+from kalamna.core.config import get_settings
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run the Kalamna API server")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "kalamna.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        # "auto" picks uvloop and httptools when installed (not on Windows)
+        loop="auto",
+        http="auto",
+        # the sans-I/O WebSocket protocol holds about half the memory per open
+        # socket of the default one; chat frames are small, so cap their size
+        ws="websockets-sansio",
+        ws_max_size=64 * 1024,
+        lifespan="on",
+        timeout_graceful_shutdown=settings.graceful_timeout_s,
+        timeout_keep_alive=settings.keepalive_timeout_s,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+        access_log=False,  # log_requests middleware already logs each request
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,215 @@
 """
 S3 storage service
 Upload, download, delete operations for S3/MinIO buckets
+
+Large objects (e.g. voice clips) are written with multipart uploads so each
+part streams to the bucket as it arrives and nothing buffers a whole file.
+`LocalStorage` mirrors the same interface on disk for development and tests;
+`get_storage()` picks the backend from `STORAGE_BACKEND`.
 """
+
+import asyncio
+import shutil
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from kalamna.core.config import get_settings
+
+settings = get_settings()
+STORAGE_BACKEND = settings.storage_backend
+S3_BUCKET = settings.s3_bucket
+S3_ENDPOINT_URL = settings.s3_endpoint_url or None  # set for MinIO
+S3_REGION = settings.s3_region
+LOCAL_STORAGE_DIR = settings.local_storage_dir
+
+# S3 rejects non-final multipart parts smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class S3Storage:
+    """S3/MinIO backend; boto3 calls run in a thread to keep the loop free."""
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        endpoint_url: str | None = S3_ENDPOINT_URL,
+        region: str = S3_REGION,
+    ):
+        # imported here: boto3 adds ~100 ms to the import of every process
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(retries={"max_attempts": 3, "mode": "standard"}),
+        )
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    async def create_multipart_upload(self, key: str, content_type: str) -> str:
+        response = await asyncio.to_thread(
+            self._client.create_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=content_type,
+        )
+        return response["UploadId"]
+
+    async def upload_part(
+        self, key: str, upload_id: str, part_number: int, body: BinaryIO, size: int
+    ) -> str:
+        response = await asyncio.to_thread(
+            self._client.upload_part,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+            ContentLength=size,
+        )
+        return response["ETag"]
+
+    async def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        await asyncio.to_thread(
+            self._client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": number, "ETag": etag} for number, etag in parts
+                ]
+            },
+        )
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await asyncio.to_thread(
+            self._client.abort_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+        )
+
+    async def download_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        await asyncio.to_thread(
+            self._client.download_fileobj, self.bucket, key, fileobj
+        )
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(
+            self._client.put_object,
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+        )
+
+    async def get_bytes(self, key: str) -> bytes:
+        response = await asyncio.to_thread(
+            self._client.get_object, Bucket=self.bucket, Key=key
+        )
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+
+class LocalStorage:
+    """Filesystem backend with the same interface, for development and tests."""
+
+    def __init__(self, root: str | Path = LOCAL_STORAGE_DIR):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _parts_dir(self, upload_id: str) -> Path:
+        return self.root / ".multipart" / upload_id
+
+    def url(self, key: str) -> str:
+        return f"local://{key}"
+
+    async def create_multipart_upload(self, key: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        self._parts_dir(upload_id).mkdir(parents=True, exist_ok=True)
+        return upload_id
+
+    async def upload_part(
+        self, key: str, upload_id: str, part_number: int, body: BinaryIO, size: int
+    ) -> str:
+        def write() -> str:
+            part_path = self._parts_dir(upload_id) / f"{part_number:05d}"
+            with open(part_path, "wb") as out:
+                shutil.copyfileobj(body, out, COPY_BUFFER_SIZE)
+            return f"{part_number}-{size}"
+
+        return await asyncio.to_thread(write)
+
+    async def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        def assemble() -> None:
+            target = self._path(key)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            parts_dir = self._parts_dir(upload_id)
+            with open(target, "wb") as out:
+                for number, _ in sorted(parts):
+                    with open(parts_dir / f"{number:05d}", "rb") as part:
+                        shutil.copyfileobj(part, out, COPY_BUFFER_SIZE)
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+        await asyncio.to_thread(assemble)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await asyncio.to_thread(
+            shutil.rmtree, self._parts_dir(upload_id), ignore_errors=True
+        )
+
+    async def download_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        def copy() -> None:
+            with open(self._path(key), "rb") as src:
+                shutil.copyfileobj(src, fileobj, COPY_BUFFER_SIZE)
+
+        await asyncio.to_thread(copy)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str) -> None:
+        def write() -> None:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+        await asyncio.to_thread(write)
+
+    async def get_bytes(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._path(key).read_bytes)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+
+def key_from_url(url: str) -> str:
+    """Object key from a URL produced by `S3Storage.url` / `LocalStorage.url`."""
+    scheme, _, rest = url.partition("://")
+    return rest.split("/", 1)[1] if scheme == "s3" else rest
+
+
+_storage: S3Storage | LocalStorage | None = None
+
+
+def get_storage() -> S3Storage | LocalStorage:
+    """Return the process-wide storage backend (created on first use)."""
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage() if STORAGE_BACKEND == "local" else S3Storage()
+    return _storage
@@ -1,14 +1,15 @@
-import os
 from pathlib import Path
 from typing import List
 
-from dotenv import load_dotenv
 from fastapi import BackgroundTasks
 from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from pydantic import EmailStr
 
-load_dotenv()
+from kalamna.core.config import get_settings
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
 
 # Compute absolute path to the templates directory
 templates_dir = Path(__file__).parent.parent / "templates"
@@ -19,18 +20,32 @@ env = Environment(
     autoescape=select_autoescape(["html", "xml"]),
 )
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("EMAIL_HOST_USER"),
-    MAIL_PASSWORD=os.getenv("EMAIL_HOST_PASSWORD"),
-    MAIL_FROM=os.getenv("EMAIL_HOST_USER"),
-    MAIL_PORT=int(os.getenv("EMAIL_PORT")),
-    MAIL_SERVER=os.getenv("EMAIL_HOST"),
-    MAIL_FROM_NAME="Kalamna Services",
-    MAIL_STARTTLS=os.getenv("EMAIL_USE_TLS", "FALSE").upper() == "TRUE",
-    MAIL_SSL_TLS=os.getenv("EMAIL_USE_SSL", "FALSE").upper() == "TRUE",
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-)
+_mail_client: FastMail | None = None
+
+
+def get_mail_client() -> FastMail | None:
+    """
+    Return the process-wide FastMail client, built on first use so a missing
+    mail config disables sending instead of breaking imports.
+    """
+    global _mail_client
+    settings = get_settings()
+    if _mail_client is None and settings.mail_enabled:
+        _mail_client = FastMail(
+            ConnectionConfig(
+                MAIL_USERNAME=settings.email_host_user,
+                MAIL_PASSWORD=settings.email_host_password or "",
+                MAIL_FROM=settings.email_host_user,
+                MAIL_PORT=settings.email_port,
+                MAIL_SERVER=settings.email_host,
+                MAIL_FROM_NAME="Kalamna Services",
+                MAIL_STARTTLS=settings.email_use_tls,
+                MAIL_SSL_TLS=settings.email_use_ssl,
+                USE_CREDENTIALS=True,
+                VALIDATE_CERTS=True,
+            )
+        )
+    return _mail_client
 
 
 async def send_email(
@@ -49,6 +64,11 @@ async def send_email(
     :param template_name: Name of the Jinja2 template file.
     :param context: Context dictionary to render the template.
     """
+    mail_client = get_mail_client()
+    if mail_client is None:
+        logger.warning("email_not_configured", subject=subject)
+        return
+
     template = env.get_template(template_name)
     html_content = template.render(context)
 
@@ -59,5 +79,4 @@ async def send_email(
         subtype=MessageType.html,
     )
 
-    fm = FastMail(conf)
-    background_tasks.add_task(fm.send_message, message)
+    background_tasks.add_task(mail_client.send_message, message)
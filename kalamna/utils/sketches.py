@@ -0,0 +1,127 @@
+"""
+Mergeable quantile sketches
+DDSketch with relative-error guarantees, serialisable to JSON for storage
+"""
+
+import math
+from collections.abc import Iterable
+
+# values at or below this are counted as zero (log is undefined there)
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch:
+    """
+    DDSketch (Masson et al., 2019) over non-negative values.
+
+    Every quantile estimate is within `relative_accuracy` of the true value
+    (as long as the lowest bins were not collapsed). Two sketches built with
+    the same accuracy merge exactly by adding their bin counts, so daily
+    sketches can be combined into any window, or across tenants.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # midpoint (in relative terms) of the bin (gamma^(i-1), gamma^i]
+        return 2 * self._gamma**index / (self._gamma + 1)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value < 0:
+            raise ValueError("DDSketch only accepts non-negative values")
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += weight
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def _collapse(self) -> None:
+        # fold the lowest bins together so the high quantiles stay accurate
+        indexes = sorted(self.bins)
+        overflow = len(indexes) - self.max_bins
+        target = indexes[overflow]
+        for index in indexes[:overflow]:
+            self.bins[target] += self.bins.pop(index)
+
+    def merge(self, other: "DDSketch") -> None:
+        if not math.isclose(self.relative_accuracy, other.relative_accuracy):
+            raise ValueError("Cannot merge sketches with different accuracies")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        cumulative = self.zero_count
+        if rank < cumulative:
+            return 0.0
+        for index in sorted(self.bins):
+            cumulative += self.bins[index]
+            if cumulative > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.relative_accuracy,
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zero": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict | None, max_bins: int = 2048) -> "DDSketch":
+        if not data:
+            return cls(max_bins=max_bins)
+        sketch = cls(relative_accuracy=data["alpha"], max_bins=max_bins)
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        sketch.zero_count = data["zero"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
@@ -0,0 +1,85 @@
+"""
+Analytics rollup worker
+Periodically flushes Redis hourly counters into Postgres, and rebuilds
+rollups from raw chat/feedback data on demand.
+
+    python -m kalamna.workers.analytics_rollup                 # flush loop
+    python -m kalamna.workers.analytics_rollup backfill \
+        --start 2025-01-01 --end 2025-02-01 [--business-id <uuid>]
+"""
+
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from kalamna.apps.analytics.services import (
+    backfill_rollups,
+    bucket_start,
+    flush_rollups,
+)
+from kalamna.core.config import setup_logging
+from kalamna.core.db import AsyncSessionLocal
+from kalamna.core.redis import get_redis
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+FLUSH_INTERVAL_SECONDS = 10
+
+
+async def run_flush_loop(interval: float = FLUSH_INTERVAL_SECONDS) -> None:
+    redis = await get_redis()
+    logger.info("analytics_rollup_worker_started", interval=interval)
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                # drain everything that is dirty before sleeping again
+                while await flush_rollups(db, redis):
+                    pass
+        except Exception:
+            logger.exception("analytics_rollup_loop_error")
+        await asyncio.sleep(interval)
+
+
+async def run_backfill(
+    start: datetime, end: datetime, business_id: uuid.UUID | None
+) -> int:
+    async with AsyncSessionLocal() as db:
+        return await backfill_rollups(db, start, end, business_id)
+
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analytics rollup worker")
+    sub = parser.add_subparsers(dest="command")
+
+    flush = sub.add_parser("flush", help="run the periodic flush loop (default)")
+    flush.add_argument("--interval", type=float, default=FLUSH_INTERVAL_SECONDS)
+
+    backfill = sub.add_parser("backfill", help="rebuild rollups from raw data")
+    backfill.add_argument("--start", type=_parse_datetime, required=True)
+    backfill.add_argument(
+        "--end",
+        type=_parse_datetime,
+        default=None,
+        help="exclusive; defaults to the start of the current hour",
+    )
+    backfill.add_argument("--business-id", type=uuid.UUID, default=None)
+
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.command == "backfill":
+        end = args.end or bucket_start()
+        asyncio.run(run_backfill(args.start, end, args.business_id))
+    else:
+        asyncio.run(run_flush_loop(getattr(args, "interval", FLUSH_INTERVAL_SECONDS)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,300 @@
 """
 Document processing worker
 Background task for parsing, chunking, and embedding documents
+
+Re-indexing is incremental: chunks are matched to the stored ones by content
+hash, so a re-upload only embeds and writes new or changed chunks, deletes
+the ones that disappeared and moves the rest, all in one transaction.
+Unchanged chunks keep their vectors.
+
+New chunks that near-duplicate one already stored for the business (or an
+earlier chunk of the same document) are not embedded either; they are stored
+with a link to the original. Each ingest logs what it embedded and saved.
+
+    python -m kalamna.workers.document_processor <knowledge_base_id>
 """
+
+import argparse
+import asyncio
+import uuid
+from collections import defaultdict, deque
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.documents.models import (
+    KnowledgeBase,
+    KnowledgeBaseChunk,
+    KnowledgeBaseStatus,
+    KnowledgeBaseVersion,
+)
+from kalamna.apps.documents.services import is_processing
+from kalamna.core.config import setup_logging
+from kalamna.core.db import AsyncSessionLocal
+from kalamna.core.redis import get_redis
+from kalamna.rag_infra.chunker import chunk_text, content_hash
+from kalamna.rag_infra.dedup import fingerprint_chunks
+from kalamna.rag_infra.embedder import Embedder, get_embedder
+from kalamna.rag_infra.parser import parse_document
+from kalamna.rag_infra.vector_db import (
+    ChunkRow,
+    copy_chunks,
+    delete_chunks,
+    get_embedding_storage,
+    load_lsh_index,
+    move_chunks,
+)
+from kalamna.rag_infra.vector_snapshot import refresh_snapshot
+from kalamna.storage.s3 import get_storage, key_from_url
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+
+@dataclass(frozen=True)
+class IngestStats:
+    chunks: int
+    duplicates: int = 0
+    reused: int = 0
+    removed: int = 0
+
+    @property
+    def embedded(self) -> int:
+        return self.chunks - self.duplicates - self.reused
+
+    @property
+    def embeddings_saved(self) -> int:
+        return self.duplicates + self.reused
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of new chunks that were near-duplicates (and not embedded)."""
+        new = self.chunks - self.reused
+        return self.duplicates / new if new else 0.0
+
+
+@dataclass(frozen=True)
+class ReindexPlan:
+    new: list[int]  # positions of chunks to embed and insert
+    moved: list[tuple[uuid.UUID, int]]  # kept chunks at a new position
+    removed: list[uuid.UUID]
+    reused: int
+
+
+def plan_reindex(
+    existing: Sequence[tuple[uuid.UUID, int, str | None]], hashes: Sequence[str]
+) -> ReindexPlan:
+    """
+    Match new chunk hashes to stored `(id, chunk_index, content_hash)` rows.
+    Repeated chunks match stored copies in document order.
+    """
+    stored: dict[str, deque[tuple[uuid.UUID, int]]] = defaultdict(deque)
+    for chunk_id, index, chunk_hash in sorted(existing, key=lambda row: row[1]):
+        if chunk_hash is not None:
+            stored[chunk_hash].append((chunk_id, index))
+
+    new, moved, reused = [], [], 0
+    for index, chunk_hash in enumerate(hashes):
+        if stored.get(chunk_hash):
+            chunk_id, old_index = stored[chunk_hash].popleft()
+            reused += 1
+            if old_index != index:
+                moved.append((chunk_id, index))
+        else:
+            new.append(index)
+
+    # rows stored before content hashes existed never match
+    removed = [chunk_id for chunk_id, _, chunk_hash in existing if chunk_hash is None]
+    removed += [chunk_id for rows in stored.values() for chunk_id, _ in rows]
+    return ReindexPlan(new=new, moved=moved, removed=removed, reused=reused)
+
+
+def _prepare(text: str) -> tuple[list[str], list[str]]:
+    chunks = chunk_text(text)
+    return chunks, [content_hash(chunk) for chunk in chunks]
+
+
+async def ingest_text(
+    db: AsyncSession, kb: KnowledgeBase, text: str, embedder: Embedder
+) -> IngestStats:
+    """
+    Bring the knowledge base's chunks in line with `text`, embedding only
+    chunks that are neither stored already nor near-duplicates. The caller
+    commits.
+    """
+    text_hash = content_hash(text)
+    if kb.content_hash == text_hash:
+        count = await db.scalar(
+            select(func.count()).where(KnowledgeBaseChunk.kb_id == kb.id)
+        )
+        return IngestStats(chunks=count, reused=count)
+
+    chunks, hashes = await asyncio.to_thread(_prepare, text)
+    existing = (
+        await db.execute(
+            select(
+                KnowledgeBaseChunk.id,
+                KnowledgeBaseChunk.chunk_index,
+                KnowledgeBaseChunk.content_hash,
+            ).where(KnowledgeBaseChunk.kb_id == kb.id)
+        )
+    ).all()
+    plan = plan_reindex(existing, hashes)
+    await delete_chunks(db, plan.removed)
+    await move_chunks(db, plan.moved)
+
+    new_chunks = [chunks[i] for i in plan.new]
+    fingerprints = await asyncio.to_thread(fingerprint_chunks, new_chunks)
+    storage = await get_embedding_storage(db, kb.business_id)
+    lsh = await load_lsh_index(db, kb.business_id, fingerprints)
+    ids = [uuid.uuid4() for _ in new_chunks]
+    duplicate_of = lsh.assign(ids, fingerprints)
+    unique = [i for i, original in enumerate(duplicate_of) if original is None]
+    vectors = await embedder.embed([new_chunks[i] for i in unique])
+    vector_of: dict[int, np.ndarray] = dict(zip(unique, vectors, strict=True))
+
+    await copy_chunks(
+        db,
+        [
+            ChunkRow(
+                kb_id=kb.id,
+                business_id=kb.business_id,
+                chunk_index=position,
+                chunk_text=new_chunks[i],
+                embedding_vector=vector_of.get(i),
+                id=ids[i],
+                content_hash=hashes[position],
+                fingerprint=fingerprints[i] if i in vector_of else None,
+                duplicate_of_id=duplicate_of[i],
+            )
+            for i, position in enumerate(plan.new)
+        ],
+        storage,
+    )
+    kb.content_hash = text_hash
+    return IngestStats(
+        chunks=len(chunks),
+        duplicates=len(new_chunks) - len(unique),
+        reused=plan.reused,
+        removed=len(plan.removed),
+    )
+
+
+async def ingest_document(
+    db: AsyncSession, kb: KnowledgeBase, data: bytes, embedder: Embedder
+) -> IngestStats:
+    text = await asyncio.to_thread(parse_document, data, kb.file_type or "txt")
+    return await ingest_text(db, kb, text, embedder)
+
+
+async def _record_version(
+    db: AsyncSession, kb: KnowledgeBase, stats: IngestStats
+) -> None:
+    await db.execute(
+        update(KnowledgeBaseVersion)
+        .where(
+            KnowledgeBaseVersion.kb_id == kb.id,
+            KnowledgeBaseVersion.version == kb.version,
+        )
+        .values(
+            content_hash=kb.content_hash,
+            chunks_embedded=stats.embedded,
+            chunks_reused=stats.reused,
+            chunks_removed=stats.removed,
+        )
+    )
+
+
+async def _holds_lease(
+    db: AsyncSession, kb: KnowledgeBase, started_at: datetime
+) -> bool:
+    """Lock the knowledge base and check no later run has taken it over."""
+    await db.refresh(kb, ["processing_started_at"], with_for_update=True)
+    return kb.processing_started_at == started_at
+
+
+async def process_knowledge_base(
+    kb_id: uuid.UUID, embedder: Embedder | None = None
+) -> IngestStats:
+    """
+    Load a knowledge base's file from storage and (re)build its chunks.
+    Skipped (zero stats) while another run holds it. A run that outlives its
+    lease (`PROCESSING_LEASE_S`) is taken over and drops its results.
+    """
+    embedder = embedder or get_embedder()
+    async with AsyncSessionLocal() as db:
+        # claimed under the row lock uploads take too, so one run at a time
+        kb = await db.get(KnowledgeBase, kb_id, with_for_update=True)
+        if kb is None:
+            raise LookupError(f"Knowledge base {kb_id} not found")
+        if is_processing(kb):
+            await db.rollback()
+            logger.info("knowledge_base_already_processing", kb_id=str(kb_id))
+            return IngestStats(chunks=0)
+        if kb.status == KnowledgeBaseStatus.PROCESSING:
+            logger.warning("knowledge_base_lease_expired", kb_id=str(kb_id))
+        started_at = datetime.now(timezone.utc)
+        kb.status = KnowledgeBaseStatus.PROCESSING
+        kb.processing_started_at = started_at
+        await db.commit()
+
+        try:
+            if kb.file_url:
+                data = await get_storage().get_bytes(key_from_url(kb.file_url))
+                stats = await ingest_document(db, kb, data, embedder)
+            else:
+                text = (kb.content_json or {}).get("text", "")
+                stats = await ingest_text(db, kb, text, embedder)
+            await _record_version(db, kb, stats)
+            if not await _holds_lease(db, kb, started_at):
+                await db.rollback()
+                logger.warning("knowledge_base_lease_lost", kb_id=str(kb_id))
+                return IngestStats(chunks=0)
+            kb.status = KnowledgeBaseStatus.READY
+            kb.processing_started_at = None
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            if await _holds_lease(db, kb, started_at):
+                kb.status = KnowledgeBaseStatus.FAILED
+                kb.processing_started_at = None
+            await db.commit()
+            logger.exception("knowledge_base_processing_failed", kb_id=str(kb_id))
+            raise
+
+        try:
+            await refresh_snapshot(await get_redis(), kb.business_id)
+        except Exception:  # stale hits are dropped until the next export
+            logger.exception(
+                "vector_snapshot_refresh_failed", business_id=str(kb.business_id)
+            )
+
+    logger.info(
+        "knowledge_base_processed",
+        kb_id=str(kb_id),
+        version=kb.version,
+        chunks=stats.chunks,
+        embedded=stats.embedded,
+        reused=stats.reused,
+        removed=stats.removed,
+        duplicates=stats.duplicates,
+        dedup_ratio=round(stats.dedup_ratio, 4),
+        embeddings_saved=stats.embeddings_saved,
+    )
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process a knowledge base")
+    parser.add_argument("kb_id", type=uuid.UUID)
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(process_knowledge_base(args.kb_id))
+
+
+if __name__ == "__main__":
+    main()
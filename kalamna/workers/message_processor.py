@@ -0,0 +1,217 @@
+"""
+Chat message worker
+Consumes saved end-user messages from a Redis stream, detects their emotion
+in batches with the configured classifier, and writes the labels back.
+
+    python -m kalamna.workers.message_processor [--consumer NAME] [--batch-size N]
+
+Each read takes up to `--batch-size` queued messages; the batch is loaded
+with one SELECT, classified in one call and written with one UPDATE ... FROM
+(VALUES ...), then acknowledged with one XACK. Each batch logs
+`chat_messages_processed` with its size, `classify_ms`, `write_ms` and the
+lag from each message's save to its label being stored (`lag_ms_max`).
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy import String, Update, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# registers Business, which the Employee model (via rag.services) refers to
+from kalamna.apps.rag.models import ChatMessage
+from kalamna.apps.rag.services import MESSAGE_QUEUE_STREAM
+from kalamna.core.config import setup_logging
+from kalamna.core.db import AsyncSessionLocal
+from kalamna.core.redis import get_redis
+from kalamna.rag_infra.emotion import EmotionClassifier, load_classifier
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+CONSUMER_GROUP = "message-workers"
+ATTEMPTS_KEY = "chat:postprocess:attempts"
+MAX_ATTEMPTS = 3
+# batches left pending this long by a dead consumer are claimed by another one
+CLAIM_IDLE_MS = 60_000
+DEFAULT_BATCH_SIZE = 256
+
+
+@dataclass(frozen=True)
+class BatchStats:
+    size: int
+    updated: int
+    classify_ms: float
+    write_ms: float
+    lags_ms: list[float]
+
+
+async def ensure_consumer_group(
+    redis: Redis, stream: str = MESSAGE_QUEUE_STREAM
+) -> None:
+    try:
+        await redis.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def read_batch(
+    redis: Redis,
+    consumer: str,
+    batch_size: int,
+    block_ms: int,
+    stream: str = MESSAGE_QUEUE_STREAM,
+) -> list[tuple[str, dict]]:
+    """Stale entries of dead consumers first, then new ones."""
+    _, claimed, _ = await redis.xautoclaim(
+        stream,
+        CONSUMER_GROUP,
+        consumer,
+        min_idle_time=CLAIM_IDLE_MS,
+        count=batch_size,
+    )
+    entries = list(claimed)
+    if not entries:
+        response = await redis.xreadgroup(
+            CONSUMER_GROUP,
+            consumer,
+            {stream: ">"},
+            count=batch_size,
+            block=block_ms,
+        )
+        entries = [e for _, stream_entries in response for e in stream_entries]
+    # entries trimmed from the stream while pending come back without fields
+    return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+
+def emotion_update(message_ids: list[uuid.UUID], emotions: list[str]) -> Update:
+    """One UPDATE ... FROM (VALUES ...) setting each message's emotion."""
+    labelled = values(
+        column("id", UUID(as_uuid=True)), column("emotion", String), name="labelled"
+    ).data(list(zip(message_ids, emotions, strict=True)))
+    return (
+        update(ChatMessage)
+        .where(ChatMessage.id == labelled.c.id)
+        .values(emotion_detected=labelled.c.emotion)
+    )
+
+
+async def label_messages(
+    db: AsyncSession, classifier: EmotionClassifier, message_ids: list[uuid.UUID]
+) -> tuple[int, float, float]:
+    """Label the not yet labelled messages; returns (updated, classify_ms, write_ms)."""
+    rows = (
+        await db.execute(
+            select(ChatMessage.id, ChatMessage.content).where(
+                ChatMessage.id.in_(message_ids),
+                ChatMessage.emotion_detected.is_(None),
+            )
+        )
+    ).all()
+    if not rows:
+        return 0, 0.0, 0.0
+
+    t0 = time.perf_counter()
+    labels = await classifier.classify([row.content for row in rows])
+    classify_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    await db.execute(emotion_update([row.id for row in rows], labels))
+    await db.commit()
+    return len(rows), classify_ms, (time.perf_counter() - t0) * 1000
+
+
+async def handle_batch(
+    redis: Redis,
+    classifier: EmotionClassifier,
+    entries: list[tuple[str, dict]],
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    stream: str = MESSAGE_QUEUE_STREAM,
+) -> BatchStats | None:
+    entry_ids = [entry_id for entry_id, _ in entries]
+    try:
+        async with session_factory() as db:
+            updated, classify_ms, write_ms = await label_messages(
+                db,
+                classifier,
+                [uuid.UUID(fields["message_id"]) for _, fields in entries],
+            )
+    except Exception:
+        pipe = redis.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.hincrby(ATTEMPTS_KEY, entry_id, 1)
+        attempts = await pipe.execute()
+        # the rest stay pending and are reclaimed after CLAIM_IDLE_MS
+        given_up = [
+            e for e, n in zip(entry_ids, attempts, strict=True) if n >= MAX_ATTEMPTS
+        ]
+        logger.exception(
+            "chat_postprocess_failed", size=len(entries), given_up=len(given_up)
+        )
+        if given_up:
+            await redis.xack(stream, CONSUMER_GROUP, *given_up)
+            await redis.hdel(ATTEMPTS_KEY, *given_up)
+        return None
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.xack(stream, CONSUMER_GROUP, *entry_ids)
+    pipe.hdel(ATTEMPTS_KEY, *entry_ids)
+    await pipe.execute()
+    now = time.time()
+    return BatchStats(
+        size=len(entries),
+        updated=updated,
+        classify_ms=classify_ms,
+        write_ms=write_ms,
+        lags_ms=[(now - float(fields["created_at"])) * 1000 for _, fields in entries],
+    )
+
+
+async def run_worker(
+    consumer: str,
+    classifier: EmotionClassifier | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    block_ms: int = 5000,
+) -> None:
+    redis = await get_redis()
+    classifier = classifier or load_classifier()
+    await ensure_consumer_group(redis)
+    logger.info("message_worker_started", consumer=consumer, model=classifier.model)
+
+    while True:
+        entries = await read_batch(redis, consumer, batch_size, block_ms)
+        if not entries:
+            continue
+        stats = await handle_batch(redis, classifier, entries)
+        if stats is not None:
+            logger.info(
+                "chat_messages_processed",
+                size=stats.size,
+                updated=stats.updated,
+                classify_ms=round(stats.classify_ms, 2),
+                write_ms=round(stats.write_ms, 2),
+                lag_ms_max=round(max(stats.lags_ms), 2),
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chat message post-processing worker")
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(run_worker(args.consumer, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
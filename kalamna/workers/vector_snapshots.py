@@ -0,0 +1,124 @@
+"""
+Vector snapshot export
+Serve hot businesses' vector search from memory-mapped snapshots
+
+    python -m kalamna.workers.vector_snapshots <business_id>... [--dtype int8]
+    python -m kalamna.workers.vector_snapshots <business_id>... --drop
+    python -m kalamna.workers.vector_snapshots --listen [--consumer NAME]
+
+Exporting a business opts it in: from then on the document worker queues it
+for re-export after each re-index, and `--listen` exports what is queued, so
+the NumPy work stays out of the API processes. Run it where the API runs,
+with the same VECTOR_SNAPSHOT_DIR.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import uuid
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from kalamna.core.config import setup_logging
+from kalamna.core.db import AsyncSessionLocal
+from kalamna.core.redis import get_redis
+from kalamna.rag_infra.vector_snapshot import (
+    SNAPSHOT_QUEUE_STREAM,
+    VECTOR_SNAPSHOT_DTYPE,
+    drop_snapshot,
+    export_snapshot,
+)
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+CONSUMER_GROUP = "vector-snapshot-workers"
+# jobs left pending this long by a dead consumer are claimed by another one
+CLAIM_IDLE_MS = 300_000
+
+
+async def export_snapshots(business_ids: list[uuid.UUID], dtype: str) -> None:
+    async with AsyncSessionLocal() as db:
+        for business_id in business_ids:
+            await export_snapshot(db, business_id, dtype=dtype)
+
+
+async def ensure_consumer_group(redis: Redis) -> None:
+    try:
+        await redis.xgroup_create(
+            SNAPSHOT_QUEUE_STREAM, CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def run_worker(
+    consumer: str, dtype: str = VECTOR_SNAPSHOT_DTYPE, block_ms: int = 5000
+) -> None:
+    redis = await get_redis()
+    await ensure_consumer_group(redis)
+    logger.info("vector_snapshot_worker_started", consumer=consumer)
+
+    while True:
+        _, claimed, _ = await redis.xautoclaim(
+            SNAPSHOT_QUEUE_STREAM,
+            CONSUMER_GROUP,
+            consumer,
+            min_idle_time=CLAIM_IDLE_MS,
+            count=100,
+        )
+        messages = list(claimed)
+        if not messages:
+            response = await redis.xreadgroup(
+                CONSUMER_GROUP,
+                consumer,
+                {SNAPSHOT_QUEUE_STREAM: ">"},
+                count=100,
+                block=block_ms,
+            )
+            messages = [m for _, stream_messages in response for m in stream_messages]
+
+        # re-indexes queued together need one export per business
+        business_ids = {uuid.UUID(f["business_id"]) for _, f in messages if f}
+        for business_id in business_ids:
+            try:
+                await export_snapshots([business_id], dtype)
+            except Exception:  # searches keep the previous snapshot
+                logger.exception(
+                    "vector_snapshot_export_failed", business_id=str(business_id)
+                )
+        if messages:
+            await redis.xack(
+                SNAPSHOT_QUEUE_STREAM, CONSUMER_GROUP, *(mid for mid, _ in messages)
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export vector snapshots")
+    parser.add_argument("business_ids", type=uuid.UUID, nargs="*")
+    parser.add_argument(
+        "--dtype", choices=["float16", "int8"], default=VECTOR_SNAPSHOT_DTYPE
+    )
+    parser.add_argument("--drop", action="store_true", help="remove the snapshots")
+    parser.add_argument(
+        "--listen", action="store_true", help="export businesses queued on re-index"
+    )
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+    if not args.listen and not args.business_ids:
+        parser.error("give business ids or --listen")
+    setup_logging()
+    if args.listen:
+        asyncio.run(run_worker(args.consumer, args.dtype))
+    elif args.drop:
+        for business_id in args.business_ids:
+            drop_snapshot(business_id)
+    else:
+        asyncio.run(export_snapshots(args.business_ids, args.dtype))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Voice processing worker
+Consumes completed voice uploads from a Redis stream, transcribes them and
+detects emotion with the configured engine, and stores the result.
+
+    python -m kalamna.workers.voice_processor [--consumer NAME]
+
+Each transcript logs `voice_transcript_ready` with the latency from upload
+completion: `queue_wait_ms` (completion -> picked up), `transcribe_ms`
+(engine time) and `latency_ms` (completion -> transcript stored).
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from kalamna.apps.rag.models import VoiceMessage
+from kalamna.apps.rag.services import VOICE_QUEUE_STREAM, voice_latency_ms
+from kalamna.core.config import setup_logging
+from kalamna.core.db import AsyncSessionLocal
+from kalamna.core.redis import get_redis
+from kalamna.rag_infra.speech import TranscriptionEngine, load_engine
+from kalamna.storage.s3 import LocalStorage, S3Storage, get_storage
+from kalamna.utils.logger import get_logger
+
+logger = get_logger()
+
+CONSUMER_GROUP = "voice-workers"
+ATTEMPTS_KEY = "voice:transcribe:attempts"
+MAX_ATTEMPTS = 3
+# jobs left pending this long by a dead consumer are claimed by another one
+CLAIM_IDLE_MS = 60_000
+
+
+async def ensure_consumer_group(redis: Redis) -> None:
+    try:
+        await redis.xgroup_create(
+            VOICE_QUEUE_STREAM, CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def process_job(
+    db: AsyncSession,
+    storage: S3Storage | LocalStorage,
+    engine: TranscriptionEngine,
+    fields: dict,
+) -> None:
+    picked_up = time.time()
+    voice = await db.get(VoiceMessage, uuid.UUID(fields["voice_message_id"]))
+    if voice is None:
+        logger.warning("voice_message_missing", **fields)
+        return
+
+    key = fields["audio_key"]
+    with tempfile.NamedTemporaryFile(suffix=Path(key).suffix) as audio:
+        await storage.download_fileobj(key, audio)
+        audio.flush()
+        t0 = time.perf_counter()
+        result = await engine.transcribe(Path(audio.name))
+        transcribe_ms = (time.perf_counter() - t0) * 1000
+
+    voice.content = result.text
+    voice.detected_emotion = result.emotion
+    voice.ai_model_used = result.model
+    voice.transcribed_at = datetime.now(timezone.utc)
+    await db.commit()
+
+    logger.info(
+        "voice_transcript_ready",
+        voice_message_id=str(voice.id),
+        queue_wait_ms=round(voice_latency_ms(fields["completed_at"], picked_up), 2),
+        transcribe_ms=round(transcribe_ms, 2),
+        latency_ms=round(voice_latency_ms(fields["completed_at"]), 2),
+    )
+
+
+async def _handle(redis, storage, engine, message_id: str, fields: dict) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await process_job(db, storage, engine, fields)
+    except Exception:
+        attempts = await redis.hincrby(ATTEMPTS_KEY, message_id, 1)
+        if attempts < MAX_ATTEMPTS:
+            # left pending; reclaimed after CLAIM_IDLE_MS
+            logger.exception("voice_transcription_failed", attempts=attempts, **fields)
+            return
+        logger.exception("voice_transcription_gave_up", attempts=attempts, **fields)
+
+    await redis.xack(VOICE_QUEUE_STREAM, CONSUMER_GROUP, message_id)
+    await redis.hdel(ATTEMPTS_KEY, message_id)
+
+
+async def run_worker(
+    consumer: str,
+    engine: TranscriptionEngine | None = None,
+    batch_size: int = 10,
+    block_ms: int = 5000,
+) -> None:
+    redis = await get_redis()
+    storage = get_storage()
+    engine = engine or load_engine()
+    await ensure_consumer_group(redis)
+    logger.info("voice_worker_started", consumer=consumer)
+
+    while True:
+        _, claimed, _ = await redis.xautoclaim(
+            VOICE_QUEUE_STREAM,
+            CONSUMER_GROUP,
+            consumer,
+            min_idle_time=CLAIM_IDLE_MS,
+            count=batch_size,
+        )
+        messages = list(claimed)
+        if not messages:
+            response = await redis.xreadgroup(
+                CONSUMER_GROUP,
+                consumer,
+                {VOICE_QUEUE_STREAM: ">"},
+                count=batch_size,
+                block=block_ms,
+            )
+            messages = [m for _, stream_messages in response for m in stream_messages]
+
+        await asyncio.gather(
+            *(_handle(redis, storage, engine, mid, f) for mid, f in messages if f)
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Voice transcription worker")
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--batch-size", type=int, default=10)
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(run_worker(args.consumer, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
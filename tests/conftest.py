@@ -1,4 +1,270 @@
 """
 Test configuration
 Pytest fixtures and test database setup
+
+The tests never touch the database DATABASE_URL (or TEST_DATABASE_URL)
+names; they use clones of it on the same server:
+
+- `<name>_template` is built once from `Base.metadata` and stamped with the
+  Alembic head. It is rebuilt only when the schema's DDL changes.
+- each pytest process (every pytest-xdist worker) clones it into
+  `<name>_test_<worker>` the first time a test asks for the database (the
+  `test_database` fixture) and drops the clone at the end of the session.
+- the `db` fixture runs a test in a transaction that is rolled back, with
+  the session's commits turned into SAVEPOINTs; `client` calls the app with
+  `get_db` overridden to that session.
+
+DATABASE_URL is pointed at the worker's clone before anything from kalamna is
+imported, so the app's engine and settings use it too. Tests that don't use
+the database never connect; those that do are skipped when no database is
+configured or its server can't be reached.
 """
+
+# ruff: noqa: E402
+import os
+
+from sqlalchemy.engine import make_url
+
+_database_url = os.getenv("TEST_DATABASE_URL") or os.getenv("DATABASE_URL")
+_server_url = make_url(_database_url) if _database_url else None
+WORKER = os.getenv("PYTEST_XDIST_WORKER", "main")
+if _server_url is not None:
+    TEMPLATE_DATABASE = f"{_server_url.database}_template"
+    TEST_DATABASE = f"{_server_url.database}_test_{WORKER}"
+    # kept in the environment, so pytest-xdist workers see the original URL too
+    os.environ["TEST_DATABASE_URL"] = _database_url
+    os.environ["DATABASE_URL"] = _server_url.set(
+        database=TEST_DATABASE
+    ).render_as_string(hide_password=False)
+
+import asyncio
+import hashlib
+import re
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import httpx
+import pytest
+import pytest_asyncio
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from kalamna.apps.business.models import Business
+from kalamna.apps.employees.models import Employee, EmployeeRole
+from kalamna.core.security import create_access_token
+from kalamna.db import models  # noqa: F401  every table, for the template
+from kalamna.db.base import Base
+
+if TYPE_CHECKING:
+    from kalamna.core.db import QueryStats
+
+ROOT = Path(__file__).resolve().parent.parent
+# any fixed key; holds template (re)builds and clones to one process at a time
+TEMPLATE_LOCK_KEY = 4_212_001
+# statements the `db` fixture's savepoints add, which a real request doesn't run
+_SAVEPOINT_SQL = re.compile(r"^\s*(RELEASE |ROLLBACK TO )?SAVEPOINT\b", re.I)
+
+
+def _alembic_script() -> ScriptDirectory:
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "kalamna/db/migrations"))
+    return ScriptDirectory.from_config(config)
+
+
+def schema_fingerprint() -> str:
+    """Hash of the schema's DDL and the Alembic head(s)."""
+    dialect = postgresql.dialect()
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)))
+    ddl.extend(sorted(_alembic_script().get_heads()))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()[:16]
+
+
+async def _template_fingerprint(admin: AsyncConnection) -> str | None:
+    return await admin.scalar(
+        text(
+            "SELECT shobj_description(oid, 'pg_database') FROM pg_database "
+            "WHERE datname = :name"
+        ),
+        {"name": TEMPLATE_DATABASE},
+    )
+
+
+async def _build_template(admin: AsyncConnection, fingerprint: str) -> None:
+    await admin.execute(text(f'DROP DATABASE IF EXISTS "{TEMPLATE_DATABASE}"'))
+    await admin.execute(text(f'CREATE DATABASE "{TEMPLATE_DATABASE}"'))
+    template = create_async_engine(_server_url.set(database=TEMPLATE_DATABASE))
+    try:
+        async with template.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(
+                lambda sync_conn: MigrationContext.configure(sync_conn).stamp(
+                    _alembic_script(), "heads"
+                )
+            )
+    finally:
+        await template.dispose()
+    # only a complete template gets its fingerprint
+    await admin.execute(
+        text(f"COMMENT ON DATABASE \"{TEMPLATE_DATABASE}\" IS '{fingerprint}'")
+    )
+
+
+async def create_test_database() -> None:
+    admin_engine = create_async_engine(
+        _server_url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
+    try:
+        async with admin_engine.connect() as admin:
+            await admin.execute(
+                text("SELECT pg_advisory_lock(:key)"), {"key": TEMPLATE_LOCK_KEY}
+            )
+            fingerprint = schema_fingerprint()
+            if await _template_fingerprint(admin) != fingerprint:
+                await _build_template(admin, fingerprint)
+            await admin.execute(
+                text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}" WITH (FORCE)')
+            )
+            await admin.execute(
+                text(
+                    f'CREATE DATABASE "{TEST_DATABASE}" TEMPLATE "{TEMPLATE_DATABASE}"'
+                )
+            )
+            await admin.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": TEMPLATE_LOCK_KEY}
+            )
+    finally:
+        await admin_engine.dispose()
+
+
+async def drop_test_database() -> None:
+    admin_engine = create_async_engine(
+        _server_url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
+    try:
+        async with admin_engine.connect() as admin:
+            await admin.execute(
+                text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}" WITH (FORCE)')
+            )
+    finally:
+        await admin_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def test_database() -> Iterator[str]:
+    """
+    This process's clone of the template, created on first use and dropped
+    at the end of the session. Skips its tests when there's no database.
+    """
+    if _server_url is None:
+        pytest.skip("no database configured (DATABASE_URL or TEST_DATABASE_URL)")
+    try:
+        asyncio.run(create_test_database())
+    except OSError as e:
+        pytest.skip(f"database server unreachable: {e}")
+    yield TEST_DATABASE
+    asyncio.run(drop_test_database())
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def db(test_database: str) -> AsyncIterator[AsyncSession]:
+    """
+    A session whose work is rolled back after the test. Its commits only
+    release a SAVEPOINT, so code under test can commit as usual. Tests using
+    it run on the session's event loop (`loop_scope="session"`).
+    """
+    # the app's engine needs DATABASE_URL, so kalamna.core.db is imported late
+    from kalamna.core.db import engine
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(
+            bind=conn,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def client(db: AsyncSession) -> AsyncIterator[httpx.AsyncClient]:
+    """The app over ASGI, with `get_db` handing out the test's `db` session."""
+    from kalamna.core.db import get_db
+    from kalamna.main import app
+
+    async def test_db():
+        yield db
+
+    app.dependency_overrides[get_db] = test_db
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as http:
+            yield http
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def owner(db: AsyncSession) -> Employee:
+    """A new business and its owner."""
+    suffix = uuid.uuid4().hex
+    business = Business(name="Test Business", email=f"{suffix}@test.example.com")
+    db.add(business)
+    await db.flush()
+    employee = Employee(
+        full_name="Test Owner",
+        email=f"owner-{suffix}@test.example.com",
+        password="not-a-hash",
+        business_id=business.id,
+        role=EmployeeRole.OWNER,
+    )
+    db.add(employee)
+    await db.flush()
+    return employee
+
+
+@pytest.fixture
+def owner_headers(owner: Employee) -> dict[str, str]:
+    token = create_access_token(str(owner.id), owner.role.value)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def query_budget() -> Callable[[int], AbstractContextManager["QueryStats"]]:
+    """
+    `with query_budget(n):` fails the test when the block (an endpoint call
+    included) runs more than `n` SQL statements, listing them. The `db`
+    fixture's SAVEPOINT statements don't count.
+    """
+    from kalamna.core.db import track_queries
+
+    @contextmanager
+    def budget(max_queries: int) -> Iterator["QueryStats"]:
+        with track_queries() as stats:
+            yield stats
+        ran = [sql for sql in stats.statements if not _SAVEPOINT_SQL.match(sql)]
+        if len(ran) > max_queries:
+            listed = "\n".join(f"  {' '.join(sql.split())}" for sql in ran)
+            pytest.fail(
+                f"{len(ran)} queries over a budget of {max_queries}:\n{listed}",
+                pytrace=False,
+            )
+
+    return budget
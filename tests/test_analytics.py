@@ -0,0 +1,98 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from kalamna.apps.analytics.services import (
+    _upsert_statement,
+    bucket_start,
+    parse_rollup_key,
+    rollup_key,
+)
+from kalamna.apps.rag.models import SenderType
+from kalamna.apps.rag.schemas import ChatSessionCreateSchema
+from kalamna.apps.rag.services import save_chat_message, start_chat_session
+
+
+# 1 Test timestamps are truncated to their UTC hour
+def test_bucket_start_truncates_to_utc_hour():
+    cairo = timezone(timedelta(hours=2))
+    at = datetime(2025, 3, 1, 1, 45, 12, tzinfo=cairo)
+
+    assert bucket_start(at) == datetime(2025, 2, 28, 23, 0, tzinfo=timezone.utc)
+
+
+# 2 Test rollup keys round-trip to business id and bucket
+def test_rollup_key_round_trip():
+    business_id = uuid.uuid4()
+    bucket = bucket_start(datetime(2025, 1, 1, 10, 30, tzinfo=timezone.utc))
+
+    assert parse_rollup_key(rollup_key(business_id, bucket)) == (business_id, bucket)
+
+
+# 3 Test the flush upsert adds to existing counters instead of overwriting
+def test_flush_upsert_is_additive():
+    row = {
+        "business_id": uuid.uuid4(),
+        "bucket_start": bucket_start(),
+        "total_chats": 1,
+        "total_messages": 2,
+        "response_count": 1,
+        "response_time_ms_sum": 900,
+        "feedback_count": 0,
+        "rating_sum": 0,
+    }
+    sql = str(_upsert_statement([row]).compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (business_id, bucket_start) DO UPDATE" in sql
+    assert (
+        "total_chats = (analytics_hourly_rollups.total_chats + excluded.total_chats)"
+        in sql
+    )
+
+
+class _CountingRedis:
+    """Keeps the rollup counters; accepts the post-processing enqueue."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, int]] = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def hincrby(self, key, field, amount):
+        counters = self.hashes.setdefault(key, {})
+        counters[field] = counters.get(field, 0) + amount
+
+    def expire(self, *args):
+        pass
+
+    def sadd(self, *args):
+        pass
+
+    async def execute(self):
+        pass
+
+    async def xadd(self, *args, **kwargs):
+        pass
+
+
+# 4 Test saved chat messages are counted, with bot replies' response times
+@pytest.mark.asyncio(loop_scope="session")
+async def test_saved_messages_are_counted(db, owner):
+    redis = _CountingRedis()
+    session = await start_chat_session(db, owner.business_id, ChatSessionCreateSchema())
+    for sender, response_time_ms in ((SenderType.USER, None), (SenderType.BOT, 850)):
+        message = await save_chat_message(
+            db, session.id, owner.business_id, sender, "hi", redis, response_time_ms
+        )
+
+    counters = redis.hashes[
+        rollup_key(owner.business_id, bucket_start(message.created_at))
+    ]
+    assert counters == {
+        "total_messages": 2,
+        "response_count": 1,
+        "response_time_ms_sum": 850,
+    }
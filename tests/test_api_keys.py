@@ -0,0 +1,101 @@
+"""
+API-key authentication tests
+Key format, digest, in-process cache and last_used_at write-behind
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.dialects import postgresql
+
+from kalamna.core.api_keys import (
+    ApiKeyPrincipal,
+    LastUsedBuffer,
+    LocalKeyCache,
+    generate_api_key,
+    invalidate_api_key,
+    key_digest,
+    last_used_statement,
+    parse_prefix,
+)
+
+
+# 1 Test generated keys carry their prefix and digest deterministically
+def test_generate_and_parse_key():
+    api_key, prefix = generate_api_key()
+
+    assert parse_prefix(api_key) == prefix
+    assert key_digest(api_key) == key_digest(api_key)
+    assert key_digest(api_key) != key_digest(api_key + "x")
+    assert parse_prefix("klm_short_secret") is None
+    assert parse_prefix(f"xyz_{prefix}_secret") is None
+    assert parse_prefix(f"klm_{prefix}_") is None
+
+
+# 2 Test the local cache expires, evicts and stays bounded
+def test_local_cache_ttl_and_eviction():
+    principal = ApiKeyPrincipal(uuid.uuid4(), uuid.uuid4())
+    cache = LocalKeyCache(maxsize=2, ttl=60)
+    cache.set("a", principal)
+    cache.set("b", principal)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", principal)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == principal
+    cache.evict("a")
+    assert cache.get("a") is None
+
+    expired = LocalKeyCache(ttl=-1)
+    expired.set("a", principal)
+    assert expired.get("a") is None
+
+
+# 3 Test last_used_at writes collapse per key into one forward-only UPDATE
+def test_last_used_buffer_batches_updates():
+    key_a, key_b = uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    buffer = LastUsedBuffer()
+    buffer.touch(key_a, now)
+    buffer.touch(key_a, now - timedelta(minutes=1))
+    buffer.touch(key_b, now)
+
+    pending = buffer.drain()
+    assert pending == {key_a: now, key_b: now}
+    assert len(buffer) == 0
+
+    sql = str(last_used_statement(pending).compile(dialect=postgresql.dialect()))
+    assert sql.count("UPDATE credentials") == 1
+    assert "FROM (VALUES" in sql
+    assert "credentials.last_used_at < used.used_at" in sql
+
+
+# 4 Test a lookup that started before a revocation can't re-cache the key
+def test_local_cache_refuses_entries_older_than_eviction():
+    principal = ApiKeyPrincipal(uuid.uuid4(), uuid.uuid4())
+    cache = LocalKeyCache(maxsize=2, ttl=60)
+    started = time.monotonic()
+    cache.evict("a")  # the revocation lands while the lookup reads the DB
+    assert not cache.set("a", principal, since=started)
+    assert cache.get("a") is None
+    assert cache.set("a", principal, since=time.monotonic())
+
+    # evictions forgotten beyond maxsize still refuse older lookups
+    started = time.monotonic()
+    for digest in "bcd":
+        cache.evict(digest)
+    assert not cache.set("b", principal, since=started)
+
+
+class _DownRedis:
+    def pipeline(self, transaction=True):
+        raise RedisConnectionError("Redis is down")
+
+
+# 5 Test a Redis failure after the revoke commits doesn't fail the revoke
+@pytest.mark.asyncio
+async def test_invalidate_survives_redis_errors():
+    await invalidate_api_key(_DownRedis(), key_digest(generate_api_key()[0]))
@@ -2,3 +2,33 @@
 Authentication tests
 Test user registration, login, JWT tokens, and permissions
 """
+
+import uuid
+
+import pytest
+
+# the app's engine pools connections, so its tests share one event loop
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+# 1 Test registering a business stays within its query budget
+async def test_register_query_budget(client, query_budget):
+    suffix = uuid.uuid4().hex
+    payload = {
+        "business": {
+            "name": "Budget Test",
+            "email": f"business-{suffix}@test.example.com",
+            "industry": "Retail",
+        },
+        "owner": {
+            "full_name": "Budget Owner",
+            "email": f"owner-{suffix}@test.example.com",
+            "password": "Budget-Password-123!",
+        },
+    }
+
+    # one uniqueness check, then the business and owner inserts
+    with query_budget(3):
+        response = await client.post("/api/v1/auth/register", json=payload)
+
+    assert response.status_code == 201
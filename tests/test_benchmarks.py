@@ -0,0 +1,28 @@
+from benchmarks.runner import Report, compare, percentile
+
+
+def _results(**values) -> dict:
+    report = Report()
+    for name, (value, higher_is_better) in values.items():
+        report.add(name, value, "x", higher_is_better)
+    return report.to_dict([])
+
+
+# 1 Test nearest-rank percentiles
+def test_percentile():
+    samples = list(range(1, 101))
+
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.95) == 95
+    assert percentile([7.0], 0.99) == 7.0
+
+
+# 2 Test regressions honour the metric direction and the threshold
+def test_compare_flags_regressions():
+    base = _results(latency=(10.0, False), throughput=(100.0, True), noise=(5.0, False))
+    head = _results(latency=(12.0, False), throughput=(130.0, True), noise=(5.2, False))
+
+    rows, regressions = compare(base, head, threshold=0.10)
+
+    assert regressions == ["latency"]
+    assert {r["name"]: r["status"] for r in rows}["throughput"] == "improved"
@@ -0,0 +1,136 @@
+import uuid
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import pytest
+
+from kalamna.apps.business.models import BotTone, Configuration
+from kalamna.apps.rag.services import auto_reply_for
+from kalamna.core import business_config
+from kalamna.core.business_config import (
+    ConfigSnapshot,
+    LocalConfigCache,
+    get_business_config,
+)
+
+BUSINESS_ID = uuid.uuid4()
+
+
+def _snapshot(version: int = 1, **hours) -> ConfigSnapshot:
+    row = Configuration(
+        business_id=BUSINESS_ID,
+        version=version,
+        bot_name="Nour",
+        tone=BotTone.FORMAL,
+        auto_reply_enabled=True,
+        auto_reply_message="We're closed",
+        operating_hours=hours,
+        timezone="Africa/Cairo",
+    )
+    return ConfigSnapshot.from_row(row)
+
+
+# 1 Test operating hours use local time and overnight ranges spill past midnight
+def test_is_open_in_business_timezone():
+    snapshot = _snapshot(thu=["09:00", "17:00"], fri=["20:00", "02:00"])
+
+    # Thursday 2 Jan 2025; Cairo is UTC+2
+    assert snapshot.is_open(datetime(2025, 1, 2, 7, 30, tzinfo=timezone.utc))
+    assert not snapshot.is_open(datetime(2025, 1, 2, 15, 0, tzinfo=timezone.utc))
+    # Friday 23:00 and Saturday 01:00 local
+    assert snapshot.is_open(datetime(2025, 1, 3, 21, 0, tzinfo=timezone.utc))
+    assert snapshot.is_open(datetime(2025, 1, 3, 23, 0, tzinfo=timezone.utc))
+    assert not snapshot.is_open(datetime(2025, 1, 4, 1, 0, tzinfo=timezone.utc))
+    assert _snapshot().is_open()
+
+
+# 2 Test the local cache never swaps a newer version for an older one
+def test_local_cache_keeps_newest_version():
+    cache = LocalConfigCache()
+    newer, older = _snapshot(3), _snapshot(2)
+
+    assert cache.install(newer) is newer
+    assert cache.install(older) is newer
+    assert cache.get(BUSINESS_ID) is newer
+
+    expired = LocalConfigCache(max_age=-1)
+    expired.install(newer)
+    assert expired.get(BUSINESS_ID) is None
+
+
+# 3 Test snapshots survive the round trip through Redis unchanged
+def test_snapshot_json_round_trip():
+    snapshot = _snapshot(5, sun=["09:00", "17:00"], mon=["22:00", "06:00"])
+
+    assert ConfigSnapshot.from_json(snapshot.to_json()) == snapshot
+    assert snapshot.as_dict()["operating_hours"] == {
+        "mon": ["22:00", "06:00"],
+        "sun": ["09:00", "17:00"],
+    }
+
+
+# 4 Test the auto reply goes out only when enabled and the business is closed
+def test_auto_reply_only_out_of_hours():
+    snapshot = _snapshot(thu=["09:00", "17:00"])
+    opening_hours = datetime(2025, 1, 2, 7, 30, tzinfo=timezone.utc)
+    evening = datetime(2025, 1, 2, 16, 0, tzinfo=timezone.utc)
+
+    assert auto_reply_for(snapshot, opening_hours) is None
+    assert auto_reply_for(snapshot, evening) == "We're closed"
+    disabled = replace(snapshot, auto_reply_enabled=False)
+    assert auto_reply_for(disabled, evening) is None
+    assert auto_reply_for(_snapshot(), evening) is None
+
+
+class _NoConfigDb:
+    async def get(self, model, key):
+        return None
+
+
+class _SavedMeanwhileRedis:
+    """Has nothing on the first read; a save lands before the second."""
+
+    def __init__(self, saved: ConfigSnapshot):
+        self.reads = [None, saved.to_json()]
+
+    async def hget(self, key, field):
+        return self.reads.pop(0)
+
+
+# 5 Test a configuration saved while one loads from the database isn't lost
+@pytest.mark.asyncio
+async def test_config_saved_during_load_is_installed(monkeypatch):
+    monkeypatch.setattr(business_config, "local_configs", LocalConfigCache())
+    saved = _snapshot(4)
+
+    snapshot = await get_business_config(
+        _NoConfigDb(), BUSINESS_ID, _SavedMeanwhileRedis(saved)
+    )
+
+    assert snapshot == saved
+    assert business_config.local_configs.get(BUSINESS_ID) == saved
+
+
+# 6 Test explicit nulls are refused, except to clear the auto reply message
+@pytest.mark.asyncio(loop_scope="session")
+async def test_configuration_update_nulls(client, owner_headers):
+    url = "/api/v1/business/configuration"
+
+    for field in (
+        "bot_name",
+        "tone",
+        "auto_reply_enabled",
+        "operating_hours",
+        "timezone",
+    ):
+        response = await client.put(url, json={field: None}, headers=owner_headers)
+        assert response.status_code == 422, field
+
+    await client.put(
+        url, json={"auto_reply_message": "Back soon"}, headers=owner_headers
+    )
+    response = await client.put(
+        url, json={"auto_reply_message": None}, headers=owner_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["auto_reply_message"] is None
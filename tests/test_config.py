@@ -0,0 +1,51 @@
+import asyncio
+
+from fastapi import BackgroundTasks
+
+from kalamna.core.config import Settings
+from kalamna.utils import mailer
+
+
+# 1 Test env values parse into typed fields, with the old spellings
+def test_settings_parse_environment(monkeypatch):
+    monkeypatch.setenv("EMAIL_PORT", "587")
+    monkeypatch.setenv("EMAIL_USE_TLS", "TRUE")
+    monkeypatch.setenv("EMAIL_USE_SSL", "FALSE")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.delenv("FORWARDED_ALLOW_IPS", raising=False)
+
+    settings = Settings(_env_file=None)
+
+    assert settings.email_port == 587
+    assert settings.email_use_tls is True and settings.email_use_ssl is False
+    assert settings.web_concurrency == 4
+    # forwarded headers are trusted from the local proxy only unless configured
+    assert settings.forwarded_allow_ips == "127.0.0.1"
+
+
+# 2 Test mail is disabled, not crashing, when the mail env is unset
+def test_send_email_without_mail_config(monkeypatch):
+    for name in ("EMAIL_HOST", "EMAIL_PORT", "EMAIL_HOST_USER"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(mailer, "get_settings", lambda: Settings(_env_file=None))
+    monkeypatch.setattr(mailer, "_mail_client", None)
+    tasks = BackgroundTasks()
+
+    asyncio.run(mailer.send_email(tasks, "Hi", ["a@example.com"], "mail.html", {}))
+
+    assert mailer.get_mail_client() is None
+    assert tasks.tasks == []
+
+
+# 3 Test empty optional settings are unset (an empty API key secret falls back
+# to JWT_SECRET; an empty snapshot dir leaves snapshots off)
+def test_blank_optional_settings_are_unset(monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "   ")
+    monkeypatch.setenv("VECTOR_SNAPSHOT_DIR", "")
+    monkeypatch.setenv("S3_ENDPOINT_URL", "")
+
+    settings = Settings(_env_file=None)
+
+    assert settings.api_key_secret is None
+    assert settings.vector_snapshot_dir is None
+    assert settings.s3_endpoint_url is None
@@ -1,11 +1,20 @@
+import os
+import uuid
+
 import pytest
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from kalamna.core.db import get_db
+from kalamna.apps.business.models import Business
+from kalamna.core.db import AsyncSessionLocal, get_db, track_queries
+
+# the app's engine pools connections, so its tests share one event loop
+pytestmark = [
+    pytest.mark.asyncio(loop_scope="session"),
+    pytest.mark.usefixtures("test_database"),
+]
 
 
-@pytest.mark.asyncio
 async def test_raw_session_works():
     # Directly test get_db dependency logic
     async for session in get_db():
@@ -13,3 +22,40 @@ async def test_raw_session_works():
         result = await session.execute(text("SELECT 1"))
         assert result.scalar_one() == 1
         break  # exit after first yield
+
+
+# 2 Test statements are counted, timed and the slowest one is kept
+async def test_track_queries_records_statements():
+    with track_queries() as stats:
+        async for session in get_db():
+            await session.execute(text("SELECT pg_sleep(0.02)"))
+            await session.execute(text("SELECT 1"))
+            break
+
+    assert stats.count == 2
+    assert stats.slowest_sql == "SELECT pg_sleep(0.02)"
+    assert stats.total_ms >= stats.slowest_ms >= 20
+    assert stats.log_fields()["db_queries"] == 2
+
+
+# 3 Test going over a query budget fails and lists the statements that ran
+async def test_query_budget_fails_when_exceeded(query_budget):
+    with pytest.raises(pytest.fail.Exception, match="3 queries over a budget of 2"):
+        with query_budget(2):
+            async for session in get_db():
+                for n in range(3):
+                    await session.execute(text(f"SELECT {n}"))
+                break
+
+
+# 4 Test the db fixture's commits stay inside the test's rolled-back transaction
+async def test_db_fixture_commits_are_not_visible_outside(db):
+    business = Business(name="Isolated", email=f"{uuid.uuid4().hex}@test.example.com")
+    db.add(business)
+    await db.commit()
+
+    assert await db.get(Business, business.id) is not None
+    async with AsyncSessionLocal() as other:
+        assert await other.get(Business, business.id) is None
+        database = await other.scalar(text("SELECT current_database()"))
+    assert database.endswith(f"_test_{os.getenv('PYTEST_XDIST_WORKER', 'main')}")
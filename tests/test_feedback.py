@@ -0,0 +1,82 @@
+import random
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from kalamna.apps.feedback.models import Feedback, FeedbackAggregate
+from kalamna.apps.feedback.services import (
+    apply_feedback,
+    histogram_quantile,
+    merge_aggregates,
+)
+from kalamna.apps.rag.schemas import ChatSessionCreateSchema
+from kalamna.apps.rag.services import start_chat_session
+from kalamna.utils.sketches import DDSketch
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+# 1 Test DDSketch quantiles stay within the relative accuracy
+def test_ddsketch_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 1) for _ in range(20_000)]
+    sketch = DDSketch(relative_accuracy=0.01)
+    sketch.update(values)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = _exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact + 1e-9
+
+
+# 2 Test merging two sketches equals sketching all values, and survives JSON
+def test_ddsketch_merge_and_round_trip():
+    left, right, combined = DDSketch(), DDSketch(), DDSketch()
+    left.update(range(1, 500))
+    right.update(range(500, 1000))
+    combined.update(range(1, 1000))
+
+    merged = DDSketch.from_dict(left.to_dict())
+    merged.merge(DDSketch.from_dict(right.to_dict()))
+
+    assert merged.count == combined.count
+    assert merged.quantile(0.95) == combined.quantile(0.95)
+
+
+# 3 Test feedback folds into aggregates that merge across days/businesses
+def test_aggregates_merge_into_summary():
+    day_one = FeedbackAggregate(rating_histogram=[0] * 5, response_time_sketch={})
+    day_two = FeedbackAggregate(rating_histogram=[0] * 5, response_time_sketch={})
+    apply_feedback(day_one, 5, [800, 1200])
+    apply_feedback(day_one, 4, [])
+    apply_feedback(day_two, 1, [3000])
+
+    summary = merge_aggregates([day_one, day_two], date(2025, 1, 1), date(2025, 1, 2))
+
+    assert summary.feedback_count == 3
+    assert summary.mean_rating == round(10 / 3, 3)
+    assert summary.rating_histogram == {1: 1, 2: 0, 3: 0, 4: 1, 5: 1}
+    assert histogram_quantile([1, 0, 0, 1, 1], 0.5) == 4.0
+    assert summary.response_time_p99_ms is not None
+
+
+# 4 Test a session is rated once; a second submission is a conflict
+@pytest.mark.asyncio(loop_scope="session")
+async def test_feedback_submitted_once_per_session(client, db, owner):
+    session = await start_chat_session(db, owner.business_id, ChatSessionCreateSchema())
+    headers = {"X-Session-Token": session.session_token}
+
+    first = await client.post("/api/v1/feedback", json={"rating": 5}, headers=headers)
+    second = await client.post("/api/v1/feedback", json={"rating": 1}, headers=headers)
+
+    assert first.status_code == 201
+    assert second.status_code == 409
+    ratings = (
+        await db.scalars(
+            select(Feedback.rating).where(Feedback.session_id == session.id)
+        )
+    ).all()
+    assert ratings == [5]
@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from kalamna.apps.rag.gateway import (
+    CLOSE_POLICY,
+    CLOSE_SLOW_CONSUMER,
+    ChatGateway,
+    Connection,
+)
+from kalamna.apps.rag.models import SenderType
+
+
+def _echo_app(gateway: ChatGateway) -> FastAPI:
+    app = FastAPI()
+
+    @app.websocket("/ws/{session_id}")
+    async def socket(websocket: WebSocket, session_id: uuid.UUID):
+        await websocket.accept()
+
+        async def on_message(conn: Connection, frame: dict) -> None:
+            await gateway.publish(conn.session_id, frame)
+
+        await gateway.serve(
+            Connection(websocket, session_id, SenderType.USER), on_message
+        )
+
+    return app
+
+
+# 1 Test a client that can't keep up is closed instead of buffering without bound
+def test_full_send_queue_closes_slow_consumer():
+    async def scenario():
+        conn = Connection(None, uuid.uuid4(), SenderType.USER, queue_size=2)
+        accepted = [conn.offer(f"frame {i}") for i in range(3)]
+        return accepted, conn.close_code, conn.offer("later")
+
+    accepted, close_code, later = asyncio.run(scenario())
+
+    assert accepted == [True, True, False]
+    assert close_code == CLOSE_SLOW_CONSUMER
+    assert later is False
+
+
+# 2 Test a published event reaches every connection of its session, and only those
+def test_publish_fans_out_to_session_connections():
+    session_id, other_id = uuid.uuid4(), uuid.uuid4()
+    with (
+        TestClient(_echo_app(ChatGateway())) as client,  # one event loop for all
+        client.websocket_connect(f"/ws/{session_id}") as sender,
+        client.websocket_connect(f"/ws/{session_id}") as watcher,
+        client.websocket_connect(f"/ws/{other_id}") as stranger,
+    ):
+        sender.send_json({"type": "message", "content": "hello"})
+        assert sender.receive_json()["content"] == "hello"
+        assert watcher.receive_json()["content"] == "hello"
+
+        stranger.send_json({"type": "message", "content": "own"})
+        assert stranger.receive_json()["content"] == "own"
+
+
+# 3 Test a frame that isn't JSON closes the connection with the policy code
+def test_malformed_frame_closes_connection():
+    client = TestClient(_echo_app(ChatGateway()))
+
+    with client.websocket_connect(f"/ws/{uuid.uuid4()}") as ws:
+        ws.send_text("not json")
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert closed.value.code == CLOSE_POLICY
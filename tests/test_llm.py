@@ -0,0 +1,67 @@
+import asyncio
+
+from kalamna.rag_infra.llm import (
+    CircuitBreaker,
+    FakeLLMProvider,
+    LLMClient,
+    Route,
+)
+
+
+def _ask(text: str) -> list[dict]:
+    return [{"role": "user", "content": text}]
+
+
+# 1 Test identical concurrent prompts share one upstream call
+def test_identical_prompts_are_coalesced():
+    provider = FakeLLMProvider(latency=lambda: 0.05)
+    client = LLMClient([Route(provider, "main")])
+
+    async def scenario():
+        return await asyncio.gather(
+            *(client.complete(_ask("opening hours?")) for _ in range(10)),
+            client.complete(_ask("delivery fees?")),
+        )
+
+    answers = asyncio.run(scenario())
+
+    assert provider.calls == 2
+    assert {a.text for a in answers[:10]} == {"[main] opening hours?"}
+
+
+# 2 Test a call slower than the route's recent p95 is hedged to the next route
+def test_slow_call_is_hedged():
+    slow = FakeLLMProvider("slow", latency=lambda: 1.0)
+    fast = FakeLLMProvider("fast", latency=lambda: 0.0)
+    primary = Route(slow, "main")
+    for _ in range(50):
+        primary.latencies.add(0.01)
+    client = LLMClient([primary, Route(fast, "cheap")])
+
+    answer = asyncio.run(client.complete(_ask("hi")))
+
+    assert (answer.provider, answer.model, answer.hedged) == ("fast", "cheap", True)
+    assert answer.latency_ms < 500
+
+
+# 3 Test a failing route trips its breaker and calls fall back without trying it
+def test_breaker_falls_back_to_cheaper_model():
+    now = [0.0]
+    failing = FakeLLMProvider("main", error_rate=1.0)
+    backup = FakeLLMProvider("backup")
+    primary = Route(failing, "main", CircuitBreaker(failures=2, clock=lambda: now[0]))
+    client = LLMClient([primary, Route(backup, "cheap")], hedge=False)
+
+    async def ask_all():
+        return [(await client.complete(_ask(f"q{i}"))).model for i in range(5)]
+
+    models = asyncio.run(ask_all())
+
+    assert models == ["cheap"] * 5
+    assert failing.calls == 2 and primary.breaker.is_open
+
+    # after the cooldown a single probe goes through, and its success closes it
+    failing.error_rate = 0.0
+    now[0] += primary.breaker.cooldown
+    assert asyncio.run(client.complete(_ask("again"))).model == "main"
+    assert not primary.breaker.is_open
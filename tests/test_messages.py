@@ -0,0 +1,40 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from kalamna.rag_infra.emotion import StubEmotionClassifier, load_classifier
+from kalamna.workers.message_processor import emotion_update
+
+
+# 1 Test the stub classifier labels English, Arabic and Arabizi in one batch
+def test_stub_classifier_labels_batch():
+    texts = [
+        "This is the worst service",
+        "شكرا جدا",
+        "ezay a3mel order?",
+        "order number 1234",
+    ]
+
+    labels = asyncio.run(StubEmotionClassifier().classify(texts))
+
+    assert labels == ["angry", "happy", "confused", "neutral"]
+
+
+# 2 Test the classifier is chosen by setting, stub by default
+def test_load_classifier():
+    assert isinstance(load_classifier("stub"), StubEmotionClassifier)
+    with pytest.raises(ValueError):
+        load_classifier("not-a-path")
+
+
+# 3 Test a batch of labels is written with one UPDATE ... FROM (VALUES ...)
+def test_emotion_update_is_one_statement():
+    ids = [uuid.uuid4() for _ in range(3)]
+    stmt = emotion_update(ids, ["happy", "sad", "neutral"])
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("UPDATE chat_messages SET emotion_detected=labelled.emotion")
+    assert "FROM (VALUES" in sql and sql.count("::UUID") == 3
+    assert "WHERE chat_messages.id = labelled.id" in sql
@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from kalamna.apps.feedback.models import Feedback
+from kalamna.apps.feedback.schemas import FeedbackResponse
+from kalamna.core.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_statement,
+    schema_columns,
+)
+
+
+# 1 Test a cursor round-trips its timestamp (with microseconds) and id
+def test_cursor_round_trip():
+    at = datetime(2025, 3, 1, 12, 30, 5, 123456, tzinfo=timezone.utc)
+    row_id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(at, row_id)) == (at, row_id)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+# 2 Test the next page seeks past the cursor's key instead of using OFFSET
+def test_keyset_statement_seeks_after_cursor():
+    at, row_id = datetime.now(timezone.utc), uuid.uuid4()
+    stmt = keyset_statement(
+        select(Feedback),
+        Feedback.submitted_at,
+        Feedback.id,
+        encode_cursor(at, row_id),
+        20,
+    )
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "(feedbacks.submitted_at, feedbacks.id) < (" in sql
+    assert "ORDER BY feedbacks.submitted_at DESC, feedbacks.id DESC" in sql
+    assert "OFFSET" not in sql
+    assert 21 in stmt.compile().params.values()  # one row past the page
+
+
+# 3 Test exports select exactly the columns of the list response
+def test_schema_columns_match_response():
+    columns = schema_columns(Feedback, FeedbackResponse)
+
+    assert [c.key for c in columns] == list(FeedbackResponse.model_fields)
@@ -2,3 +2,493 @@
 RAG functionality tests
 Test query processing, embedding, retrieval, and answer generation
 """
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, time, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from kalamna.apps.business.models import Business, Configuration
+from kalamna.apps.documents import routers as documents_routers
+from kalamna.apps.documents.models import (
+    EmbeddingStorage,
+    KnowledgeBase,
+    KnowledgeBaseStatus,
+    KnowledgeBaseType,
+)
+from kalamna.apps.documents.services import PROCESSING_LEASE_S, is_processing
+from kalamna.apps.rag import routers as rag_routers
+from kalamna.apps.rag import services as rag_services
+from kalamna.apps.rag.models import ChatSession, SenderType
+from kalamna.apps.rag.schemas import ChatSessionCreateSchema
+from kalamna.apps.rag.services import normalize_query, query_cache_key
+from kalamna.core import business_config
+from kalamna.core.business_config import ConfigSnapshot, LocalConfigCache
+from kalamna.rag_infra import vector_db, vector_snapshot
+from kalamna.rag_infra.chunker import chunk_text, content_hash
+from kalamna.rag_infra.dedup import (
+    DUPLICATE_THRESHOLD,
+    LSHIndex,
+    fingerprint,
+    fingerprint_chunks,
+)
+from kalamna.rag_infra.embedder import HashEmbedder
+from kalamna.rag_infra.parser import parse_document
+from kalamna.rag_infra.vector_db import (
+    RERANK_FACTOR,
+    ChunkRow,
+    copy_chunks,
+    fetch_hits,
+    get_embedding_storage,
+    nearest_chunks,
+)
+from kalamna.rag_infra.vector_snapshot import (
+    VectorSnapshot,
+    export_snapshot,
+    get_snapshot,
+    write_snapshot,
+)
+from kalamna.workers import document_processor
+from kalamna.workers.document_processor import plan_reindex
+
+
+# 1 Test chunks respect the size limit and overlap their neighbours
+def test_chunk_text_size_and_overlap():
+    text = "\n\n".join(" ".join(f"word{p}_{i}." for i in range(40)) for p in range(10))
+    chunks = chunk_text(text, chunk_size=200, overlap=50)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:], strict=False):
+        assert current.split()[0] in previous
+
+
+# 2 Test HTML parsing drops scripts and keeps block structure
+def test_parse_html():
+    html = b"<html><script>var x = 1;</script><h1>Title</h1><p>Hello</p><p>World</p>"
+
+    assert parse_document(html, "html") == "Title\n\nHello\n\nWorld"
+
+
+# 3 Test hash embeddings are unit vectors and similar texts score higher
+def test_hash_embedder_similarity():
+    vectors = asyncio.run(
+        HashEmbedder(dimensions=256).embed(
+            ["refund my order", "refund the order please", "opening hours of branch"]
+        )
+    )
+
+    assert vectors.shape == (3, 256)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+# 4 Test binary mode shortlists by hamming distance, then re-ranks exactly
+def test_binary_search_reranks_with_full_vectors():
+    stmt = nearest_chunks(
+        uuid.uuid4(), np.ones(1536, dtype=np.float32), 10, EmbeddingStorage.BINARY
+    )
+    sql = str(
+        stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    inner, outer = sql.split(") AS shortlist")
+    shortlist = 10 * RERANK_FACTOR[EmbeddingStorage.BINARY]
+
+    assert "embedding_storage = 'BINARY'" in inner
+    assert "binary_quantize" in inner and "<~>" in inner
+    assert f"LIMIT {shortlist}" in inner
+    assert "ORDER BY shortlist.distance" in outer and "LIMIT 10" in outer
+
+
+# 5 Test MinHash rates a one-word edit as a near-duplicate, other text not
+def test_fingerprint_similarity():
+    text = " ".join(f"word{i}" for i in range(150))
+    edited = text.replace("word75", "changed")
+    other = " ".join(f"term{i}" for i in range(150))
+
+    assert fingerprint(text).similarity(fingerprint(edited)) >= DUPLICATE_THRESHOLD
+    assert fingerprint(text).similarity(fingerprint(other)) < 0.2
+    assert fingerprint("مَرْحَبًا بِكُم").bands == fingerprint("مرحبا بكم").bands
+    assert fingerprint("---") is None
+
+
+# 6 Test duplicates link to the first chunk seen, within one batch too
+def test_lsh_index_assigns_duplicates_in_order():
+    a = " ".join(f"alpha{i}" for i in range(100))
+    b = " ".join(f"beta{i}" for i in range(100))
+    ids = [uuid.uuid4() for _ in range(4)]
+    index = LSHIndex()
+
+    duplicate_of = index.assign(ids, fingerprint_chunks([a, b, a, b + " extra"]))
+
+    assert duplicate_of == [None, None, ids[0], ids[1]]
+    assert len(index) == 2
+
+
+# 7 Test content hashes are stable and change with any edit
+def test_content_hash_is_stable():
+    assert content_hash("مرحبا بكم") == content_hash("مرحبا بكم")
+    assert content_hash("hello world") != content_hash("hello world.")
+    assert len(content_hash("x")) == 32
+
+
+# 8 Test a re-index keeps unchanged chunks, moves shifted ones, drops the rest
+def test_plan_reindex_reuses_unchanged_chunks():
+    ids = [uuid.uuid4() for _ in range(5)]
+    existing = [
+        (ids[0], 0, "a"),
+        (ids[1], 1, "b"),
+        (ids[2], 2, "c"),
+        (ids[3], 3, "a"),
+        (ids[4], 4, None),
+    ]
+
+    # "b" edited to "x", a chunk inserted in front, one "a" dropped
+    plan = plan_reindex(existing, ["n", "a", "x", "c"])
+
+    assert plan.new == [0, 2]
+    assert plan.moved == [(ids[0], 1), (ids[2], 3)]
+    assert sorted(plan.removed) == sorted([ids[4], ids[1], ids[3]])
+    assert plan.reused == 2
+
+
+def _unit_vectors(count: int, seed: int = 0, clusters: int = 16) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, 1536), dtype=np.float32)
+    vectors = centres[rng.integers(0, clusters, count)]
+    vectors += 0.5 * rng.standard_normal((count, 1536), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# 9 Test a scanned snapshot ranks like exact cosine search, in float16 and int8
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_snapshot_scan_matches_exact_search(tmp_path, dtype):
+    vectors = _unit_vectors(500)
+    ids = [uuid.uuid4() for _ in vectors]
+    write_snapshot(tmp_path / "snap", ids, vectors, dtype)
+    snapshot = VectorSnapshot(tmp_path / "snap")
+    query = vectors[7] + 0.1 * _unit_vectors(1, seed=1)[0]
+
+    hits = snapshot.search(query, 5)
+
+    exact = np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:5]
+    assert snapshot.centroids is None
+    assert [chunk_id for chunk_id, _ in hits] == [ids[i] for i in exact]
+    assert hits[0][1] == pytest.approx(
+        float(vectors[7] @ query) / np.linalg.norm(query), abs=0.01
+    )
+
+
+# 10 Test an IVF snapshot partitions every row and finds the nearest ones
+def test_snapshot_ivf_probes_nearest_partitions(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_snapshot, "IVF_MIN_ROWS", 1000)
+    vectors = _unit_vectors(3000)
+    ids = [uuid.uuid4() for _ in vectors]
+    write_snapshot(tmp_path / "snap", ids, vectors, "float16")
+    snapshot = VectorSnapshot(tmp_path / "snap")
+
+    found = [snapshot.search(vectors[i], 1)[0][0] == ids[i] for i in range(0, 3000, 30)]
+
+    assert len(snapshot.centroids) == round(3000**0.5)
+    assert snapshot.offsets[0] == 0 and snapshot.offsets[-1] == 3000
+    assert sum(found) / len(found) >= 0.95
+
+
+# 11 Test a business's snapshot is replaced when a knowledge base version changes
+@pytest.mark.asyncio(loop_scope="session")
+async def test_snapshot_follows_knowledge_base_version(db, tmp_path):
+    business = Business(name="Snapshot", email=f"{uuid.uuid4().hex}@test.example.com")
+    db.add(business)
+    await db.flush()
+    kb = KnowledgeBase(
+        business_id=business.id,
+        base_type=KnowledgeBaseType.TEXT,
+        status=KnowledgeBaseStatus.READY,
+    )
+    db.add(kb)
+    await db.flush()
+    vectors = _unit_vectors(20)
+    rows = [
+        ChunkRow(kb.id, business.id, i, f"chunk {i}", vectors[i]) for i in range(20)
+    ]
+    await copy_chunks(db, rows)
+
+    first = await export_snapshot(db, business.id, str(tmp_path))
+    snapshot = get_snapshot(business.id, str(tmp_path))
+    hits = await fetch_hits(db, snapshot.search(vectors[3], 2))
+    assert hits[0].chunk_text == "chunk 3"
+    assert hits[0].score == pytest.approx(1.0, abs=0.01)
+
+    kb.version += 1
+    await db.flush()
+    second = await export_snapshot(db, business.id, str(tmp_path))
+    assert second != first and not first.exists()
+    assert get_snapshot(business.id, str(tmp_path)).generation == second.name
+
+
+# 12 Test Arabic spelling variants, diacritics and tatweel normalise alike
+def test_normalize_query_unifies_arabic_variants():
+    canonical = normalize_query("عايز اعرف الطلب فين")
+    for variant in (
+        "عايز أعرف الطلب فين؟",
+        "عَايِز اعْرَف الـطـلب فيـــن",
+        "عايز إعرف الطلب  فين!!",
+    ):
+        assert normalize_query(variant) == canonical
+    assert normalize_query("المرتجع رقم ١٢٣ على") == "المرتجع رقم 123 علي"
+
+
+# 13 Test Arabizi is transliterated to match Arabic script; English is kept
+def test_normalize_query_transliterates_arabizi():
+    arabic = normalize_query("عايز اعرف الطلب فين؟")
+    assert normalize_query("3ayez a3raf el talab fein?") == arabic
+    assert normalize_query("3AAAYEZ a3raf eltalab feeeen") == arabic
+    assert normalize_query("Shokraaan") == normalize_query("شكراااا")
+    assert normalize_query("My iPhone 15 order, 2nd mp3") == (
+        "my iphone 15 order 2nd mp3"
+    )
+
+
+# 14 Test normalised queries share cache keys and the LRU stays bounded
+def test_query_cache_key_and_bounded_lru(monkeypatch):
+    business_id = uuid.uuid4()
+    assert query_cache_key("3ayez a3raf", business_id) == query_cache_key(
+        "عايز أعرف؟", business_id
+    )
+    assert query_cache_key("3ayez a3raf", business_id) != query_cache_key("3ayez a3raf")
+
+    monkeypatch.setattr(rag_services, "QUERY_CACHE_MAX_CHARS", 20)
+    rag_services._normalize_cached.cache_clear()
+    normalize_query("x" * 50)
+    assert rag_services._normalize_cached.cache_info().currsize == 0
+    for i in range(rag_services.QUERY_CACHE_SIZE + 10):
+        normalize_query(str(i))
+    info = rag_services._normalize_cached.cache_info()
+    assert info.currsize == rag_services.QUERY_CACHE_SIZE
+
+
+# 15 Test the owner switches the storage mode, and searches follow it
+@pytest.mark.asyncio(loop_scope="session")
+async def test_embedding_storage_setting(client, db, owner, owner_headers, monkeypatch):
+    url = "/api/v1/business/embedding-storage"
+    response = await client.get(url, headers=owner_headers)
+    assert response.json() == {"storage": "full", "chunks_moved": 0}
+
+    response = await client.put(url, json={"storage": "half"}, headers=owner_headers)
+    assert response.status_code == 200
+    assert response.json()["storage"] == "half"
+    assert await get_embedding_storage(db, owner.business_id) is EmbeddingStorage.HALF
+
+    # without `storage`, search uses the business's mode, not FULL
+    searched = []
+
+    def nearest(business_id, query_vector, limit, storage):
+        searched.append(storage)
+        return nearest_chunks(business_id, query_vector, limit, EmbeddingStorage.FULL)
+
+    monkeypatch.setattr(vector_db, "nearest_chunks", nearest)
+    query = np.ones(1536, dtype=np.float32)
+    assert await vector_db.search_chunks(db, owner.business_id, query) == []
+    assert searched == [EmbeddingStorage.HALF]
+
+
+# 16 Test the widget opens sessions with its API key, reusing known visitors
+@pytest.mark.asyncio(loop_scope="session")
+async def test_widget_opens_chat_session(client, db, owner, owner_headers):
+    response = await client.post("/api/v1/business/credentials", headers=owner_headers)
+    headers = {"X-API-Key": response.json()["api_key"]}
+
+    first = await client.post(
+        "/api/v1/rag/sessions", json={"external_id": "visitor-1"}, headers=headers
+    )
+    second = await client.post(
+        "/api/v1/rag/sessions", json={"external_id": "visitor-1"}, headers=headers
+    )
+    rejected = await client.post(
+        "/api/v1/rag/sessions", json={}, headers={"X-API-Key": "kal_wrong"}
+    )
+
+    assert first.status_code == second.status_code == 201
+    assert rejected.status_code == 401
+    sessions = [
+        await db.get(ChatSession, uuid.UUID(r.json()["session_id"]))
+        for r in (first, second)
+    ]
+    assert sessions[0].business_id == owner.business_id
+    assert sessions[0].end_user_id == sessions[1].end_user_id
+    assert sessions[0].session_token == first.json()["session_token"]
+    assert sessions[0].session_token != sessions[1].session_token
+
+
+# 17 Test English queries, times and short letter-digit tokens stay as written
+def test_normalize_query_keeps_english_and_codes():
+    assert normalize_query("Are you open at 9am?") == "are you open at 9am"
+    assert normalize_query("b2b or p2p delivery, code 7a9") == (
+        "b2b or p2p delivery code 7a9"
+    )
+    assert normalize_query("Is the mesh router in stock?") == (
+        "is the mesh router in stock"
+    )
+    # in an Arabizi query they are kept too, around transliterated words
+    assert normalize_query("3ayez a3raf el b2b 9am") == "عايز اعرف ال b2b 9am"
+    # guessed words drop short vowels and fold like Arabic-script spellings
+    assert normalize_query("momken ta2keed el 7agz") == "ممكن تاكيد الحجز"
+    assert normalize_query("momken ta2keed el 7agz") == normalize_query(
+        "مُمكن تأكيد الحجز؟"
+    )
+
+
+# 18 Test uploads are refused while re-indexing, and oversized before reading
+@pytest.mark.asyncio(loop_scope="session")
+async def test_document_upload_conflicts_and_size_cap(
+    client, db, owner, owner_headers, monkeypatch
+):
+    kb = KnowledgeBase(
+        business_id=owner.business_id,
+        base_type=KnowledgeBaseType.FILE,
+        status=KnowledgeBaseStatus.PROCESSING,
+        processing_started_at=datetime.now(timezone.utc),
+    )
+    db.add(kb)
+    await db.flush()
+    url = f"/api/v1/documents/{kb.id}/file?file_type=txt"
+
+    busy = await client.put(url, content=b"new text", headers=owner_headers)
+    monkeypatch.setattr(documents_routers, "MAX_DOCUMENT_SIZE", 4)
+    too_large = await client.put(url, content=b"12345", headers=owner_headers)
+
+    async def chunked():
+        for _ in range(3):
+            yield b"12"
+
+    streamed = await client.put(url, content=chunked(), headers=owner_headers)
+
+    assert busy.status_code == 409
+    assert too_large.status_code == streamed.status_code == 413
+
+
+# 19 Test end users writing out of hours get the business's auto reply
+@pytest.mark.asyncio(loop_scope="session")
+async def test_auto_reply_out_of_hours(db, owner, monkeypatch):
+    monkeypatch.setattr(business_config, "local_configs", LocalConfigCache())
+    db.add(
+        Configuration(
+            business_id=owner.business_id,
+            version=1,
+            auto_reply_enabled=True,
+            auto_reply_message="Back at 9",
+            # open one minute a week
+            operating_hours={"mon": ["03:00", "03:01"]},
+        )
+    )
+    session = await rag_services.start_chat_session(
+        db, owner.business_id, ChatSessionCreateSchema()
+    )
+    message = await rag_services.save_chat_message(
+        db, session.id, owner.business_id, SenderType.USER, "hello?"
+    )
+
+    reply = await rag_routers._auto_reply(db, session, message, None)
+
+    assert reply.sender_type == SenderType.BOT
+    assert reply.content == "Back at 9"
+    assert reply.response_time_ms >= 0
+
+
+class _TakenOverRedis:
+    def __init__(self, employee_id: uuid.UUID):
+        self.employee_id = employee_id
+
+    async def get(self, key):
+        return str(self.employee_id)
+
+
+# 20 Test the bot stays quiet while an employee has taken the session over
+@pytest.mark.asyncio(loop_scope="session")
+async def test_no_auto_reply_during_takeover(db, owner, monkeypatch):
+    closed = ConfigSnapshot(
+        owner.business_id,
+        1,
+        auto_reply_enabled=True,
+        auto_reply_message="Back at 9",
+        operating_hours=((0, time(3, 0), time(3, 1)),),
+    )
+    monkeypatch.setattr(rag_routers, "cached_business_config", lambda _: closed)
+    session = await rag_services.start_chat_session(
+        db, owner.business_id, ChatSessionCreateSchema()
+    )
+    message = await rag_services.save_chat_message(
+        db, session.id, owner.business_id, SenderType.USER, "hello?"
+    )
+
+    redis = _TakenOverRedis(owner.id)
+    assert await rag_routers._auto_reply(db, session, message, redis) is None
+    assert await rag_routers._auto_reply(db, session, message, None) is not None
+
+
+# 21 Test hybrid search matches chunk text written in another spelling
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hybrid_search_matches_normalised_spellings(db):
+    business = Business(name="Hybrid", email=f"{uuid.uuid4().hex}@test.example.com")
+    db.add(business)
+    await db.flush()
+    kb = KnowledgeBase(
+        business_id=business.id,
+        base_type=KnowledgeBaseType.TEXT,
+        status=KnowledgeBaseStatus.READY,
+    )
+    db.add(kb)
+    await db.flush()
+    texts = ["ممكن تأكيد الحجز قبل الموعد", "مواعيد العمل", "Shipping policy"]
+    vectors = _unit_vectors(len(texts))
+    await copy_chunks(
+        db,
+        [ChunkRow(kb.id, business.id, i, t, vectors[i]) for i, t in enumerate(texts)],
+    )
+
+    # the nearest vector is another chunk; the keyword match outranks it
+    for query in ("momken ta2keed el 7agz", "تأكيد الحَجز"):
+        hits = await vector_db.hybrid_search(db, business.id, vectors[2], query)
+        assert hits[0].chunk_text == texts[0]
+
+
+# 22 Test a re-index whose lease expired (its worker died) is taken over
+@pytest.mark.asyncio(loop_scope="session")
+async def test_expired_processing_lease_is_taken_over(db, owner, monkeypatch):
+    @asynccontextmanager
+    async def session():
+        yield db
+
+    monkeypatch.setattr(document_processor, "AsyncSessionLocal", session)
+    started = datetime.now(timezone.utc)
+    kb = KnowledgeBase(
+        business_id=owner.business_id,
+        base_type=KnowledgeBaseType.TEXT,
+        content_json={"text": "Orders ship within two days."},
+        status=KnowledgeBaseStatus.PROCESSING,
+        processing_started_at=started,
+    )
+    db.add(kb)
+    await db.commit()
+    embedder = HashEmbedder()
+
+    skipped = await document_processor.process_knowledge_base(kb.id, embedder)
+    assert skipped.chunks == 0
+    await db.refresh(kb)
+    assert is_processing(kb)
+
+    expired = started + timedelta(seconds=PROCESSING_LEASE_S)
+    assert not is_processing(kb, expired)
+    kb.processing_started_at = started - timedelta(seconds=PROCESSING_LEASE_S)
+    await db.commit()
+
+    stats = await document_processor.process_knowledge_base(kb.id, embedder)
+    assert stats.chunks == 1
+    assert kb.status == KnowledgeBaseStatus.READY
+    assert kb.processing_started_at is None
@@ -0,0 +1,136 @@
+import asyncio
+import io
+
+import pytest
+
+from kalamna.apps.rag.schemas import ChatSessionCreateSchema, VoiceUploadCreateSchema
+from kalamna.apps.rag.services import (
+    complete_voice_upload,
+    expected_chunk_size,
+    plan_chunks,
+    start_chat_session,
+    start_voice_upload,
+    upload_voice_chunk,
+)
+from kalamna.rag_infra.speech import StubTranscriptionEngine, load_engine
+from kalamna.storage.s3 import LocalStorage
+
+
+# 1 Test chunk planning: fixed-size chunks, remainder in the last one
+def test_chunk_plan():
+    assert plan_chunks(10, chunk_size=4) == 3
+    assert [expected_chunk_size(i, 10, chunk_size=4) for i in range(3)] == [4, 4, 2]
+    assert plan_chunks(3, chunk_size=4) == 1
+
+    with pytest.raises(ValueError):
+        expected_chunk_size(3, 10, chunk_size=4)
+
+
+# 2 Test parts uploaded out of order (with a retry) assemble in order
+def test_local_multipart_upload_assembles_parts(tmp_path):
+    storage = LocalStorage(tmp_path)
+
+    async def scenario():
+        upload_id = await storage.create_multipart_upload("voice/a.webm", "audio/webm")
+        parts = []
+        for number, data in [(2, b"world"), (1, b"hxllo "), (1, b"hello ")]:
+            etag = await storage.upload_part(
+                "voice/a.webm", upload_id, number, io.BytesIO(data), len(data)
+            )
+            parts = [p for p in parts if p[0] != number] + [(number, etag)]
+        await storage.complete_multipart_upload("voice/a.webm", upload_id, parts)
+
+        out = io.BytesIO()
+        await storage.download_fileobj("voice/a.webm", out)
+        return out.getvalue()
+
+    assert asyncio.run(scenario()) == b"hello world"
+
+
+# 3 Test the stub engine is the default and works offline
+def test_stub_engine(tmp_path):
+    clip = tmp_path / "clip.webm"
+    clip.write_bytes(b"\x00" * 42)
+
+    engine = load_engine("stub")
+    result = asyncio.run(engine.transcribe(clip))
+
+    assert isinstance(engine, StubTranscriptionEngine)
+    assert result.text == "stub transcript (42 bytes)"
+    assert result.emotion == "neutral"
+
+
+class _Done:
+    def __await__(self):
+        return iter(())
+
+
+class _MemoryRedis:
+    """The hash, string and stream commands voice uploads use, in memory."""
+
+    def __init__(self):
+        self.data: dict = {}
+        self.queued: list[dict] = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    async def execute(self):
+        pass
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.data.setdefault(key, {})
+        fields.update({k: str(v) for k, v in (mapping or {field: value}).items()})
+        # awaited outside a pipeline, ignored inside one
+        return _Done()
+
+    def expire(self, key, seconds):
+        pass
+
+    def xadd(self, stream, fields, **kwargs):
+        self.queued.append(fields)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def hkeys(self, key):
+        return list(self.data.get(key, {}))
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+# 4 Test completing an upload twice returns the first message and queues it once
+@pytest.mark.asyncio(loop_scope="session")
+async def test_complete_voice_upload_is_idempotent(db, owner, tmp_path):
+    redis, storage = _MemoryRedis(), LocalStorage(tmp_path)
+    session = await start_chat_session(db, owner.business_id, ChatSessionCreateSchema())
+    clip = b"\x1aE\xdf\xa3 voice"
+    upload = await start_voice_upload(
+        redis,
+        storage,
+        session,
+        VoiceUploadCreateSchema(content_type="audio/webm", total_size=len(clip)),
+    )
+    await upload_voice_chunk(redis, storage, session, upload.upload_id, 0, _body(clip))
+
+    first = await complete_voice_upload(db, redis, storage, session, upload.upload_id)
+    again = await complete_voice_upload(db, redis, storage, session, upload.upload_id)
+
+    assert again.id == first.id
+    assert [job["voice_message_id"] for job in redis.queued] == [str(first.id)]
+    with pytest.raises(ValueError, match="already completed"):
+        await upload_voice_chunk(
+            redis, storage, session, upload.upload_id, 0, _body(clip)
+        )
+
+
+async def _body(data: bytes):
+    yield data